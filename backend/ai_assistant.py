@@ -1,89 +1,66 @@
-import subprocess
-import json
+from contextlib import nullcontext
 from datetime import datetime, timedelta
+from ai_config import is_emergency_situation
+from ollama_client import OllamaClient
+from response_cache import ResponseCache
+from prompt_builder import PromptBuilder
+from reminder_scheduler import reminder_message
+from session_store import SessionStore
+from emergency import emergency_matcher
 
 class ElderlyAIAssistant:
-    def __init__(self):
-        self.context = {
-            "last_interaction": None,
-            "daily_routines": {},
-            "medication_schedule": {},
-            "health_alerts": [],
-            "mood_history": [],
-            "social_interactions": []
-        }
+    def __init__(self, client=None, cache=None, scheduler=None, prompts=None, sessions=None):
+        self.client = client or OllamaClient()
+        self.cache = cache or ResponseCache()
+        self.prompts = prompts or PromptBuilder()
+        # ReminderScheduler answering which reminders are due and what's next
+        self.scheduler = scheduler
+        # Per-user turns, alerts and Ollama context, bounded and evicted when idle
+        self.sessions = sessions or SessionStore()
     
-    def get_prompt_for_situation(self, user_data, query, health_data=None):
-        base_prompt = f"""You are ElderCare AI, a compassionate and intelligent assistant specifically designed for elderly care.
-Current Time: {datetime.now().strftime('%I:%M %p')}
-Date: {datetime.now().strftime('%B %d, %Y')}
-
-User Profile:
-- Name: {user_data.get('name', 'User')}
-- Age: {user_data.get('age', 'Not specified')}
-- Medical History: {user_data.get('medical_history', 'Not available')}
-
-Recent Health Status:
-{self._format_health_data(health_data) if health_data else 'No recent health data available'}
-
-Your capabilities include:
-1. Medication reminders and adherence tracking
-2. Daily routine management and gentle reminders
-3. Health monitoring and emergency alerts
-4. Emotional support and companionship
-5. Social interaction encouragement
-6. Memory assistance and cognitive exercises
-7. Family connection facilitation
-8. Emergency response guidance
-9. Nutrition and exercise advice
-10. Sleep quality monitoring
-
-User Query: {query}
-
-Please provide a caring, clear, and helpful response. If you detect any health concerns or emergency situations, highlight them prominently."""
-
-        return base_prompt
-
-    def _format_health_data(self, health_data):
-        if not health_data:
-            return "No health data available"
-        
-        return f"""Latest Vital Signs:
-- Heart Rate: {health_data.get('heart_rate', 'N/A')} BPM
-- Blood Pressure: {health_data.get('blood_pressure', 'N/A')}
-- Oxygen Level: {health_data.get('oxygen_level', 'N/A')}%
-- Temperature: {health_data.get('temperature', 'N/A')}°F
-- Pain Level: {health_data.get('pain_level', 'N/A')}/10
-- Mood: {health_data.get('mood', 'N/A')}/5"""
+    def get_prompt_for_situation(self, user_data, query, health_data=None, session=None):
+        """
+        (system, prompt, context) for a query. A conversation with an Ollama
+        context continues it: no system prompt, only what is new. Otherwise
+        the full prompt is built, with the recent turns if there are any.
+        """
+        emergency = self.prompts.situation(query, health_data) == "emergency"
+        if session is not None and session.ollama_context and not emergency:
+            vitals = health_data if health_data != session.last_vitals else None
+            return None, self.prompts.follow_up(query, vitals), session.ollama_context
+        turns = list(session.turns) if session is not None else None
+        system, prompt = self.prompts.build(user_data, query, health_data, turns)
+        return system, prompt, None
+
+    def _session(self, user_data):
+        user_id = user_data.get("user_id")
+        return self.sessions.get(user_id) if user_id is not None else None
 
     def generate_response(self, user_data, query, health_data=None):
-        prompt = self.get_prompt_for_situation(user_data, query, health_data)
-        
         try:
-            # Call Ollama with mistral
-            result = subprocess.run(
-                ["ollama", "run", "llama3", prompt],
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
-            
-            response = result.stdout.strip()
-            
-            # Add contextual awareness
-            self.context["last_interaction"] = datetime.now()
-            
-            # Check for health-related keywords and generate alerts
-            health_keywords = ["pain", "dizzy", "fell", "emergency", "help"]
-            if any(keyword in query.lower() for keyword in health_keywords):
-                self.context["health_alerts"].append({
-                    "timestamp": datetime.now().isoformat(),
-                    "query": query,
-                    "alert_level": "high"
-                })
+            session = self._session(user_data)
+            with session.lock if session is not None else nullcontext():
+                cache_key = self._cache_key(user_data, query, health_data, session)
+                response = self.cache.get(cache_key) if cache_key else None
+                cached = response is not None
+                ollama_context = ollama_model = None
+
+                if not cached:
+                    system, prompt, context = self.get_prompt_for_situation(user_data, query, health_data, session)
+                    # A continued conversation has to stay on the model that produced its context
+                    result = self.client.generate(prompt, system=system, context=context,
+                                                  model=session.ollama_model if context else None)
+                    response = result.get("response", "").strip()
+                    ollama_context = result.get("context")
+                    ollama_model = result.get("model")
+                    if cache_key and response:
+                        self.cache.set(cache_key, response)
+
+                self._record_interaction(session, query, response, health_data, ollama_context, ollama_model)
             
             return {
                 "response": response,
+                "cached": cached,
                 "alerts": self._generate_alerts(user_data, health_data),
                 "recommendations": self._generate_recommendations(user_data, health_data),
                 "next_actions": self._get_next_actions(user_data)
@@ -95,20 +72,98 @@ Please provide a caring, clear, and helpful response. If you detect any health c
                 "fallback_response": "I apologize, but I'm having trouble responding right now. If this is an emergency, please contact your emergency services or caregiver immediately."
             }
 
+    def stream_response(self, user_data, query, health_data=None):
+        """
+        Generator version of generate_response. Yields (event, data) pairs:
+        one "meta" event with alerts, recommendations and next actions,
+        then a "token" event per generated chunk and a final "done" event.
+        """
+        try:
+            yield "meta", {
+                "alerts": self._generate_alerts(user_data, health_data),
+                "recommendations": self._generate_recommendations(user_data, health_data),
+                "next_actions": self._get_next_actions(user_data)
+            }
+
+            session = self._session(user_data)
+            with session.lock if session is not None else nullcontext():
+                cache_key = self._cache_key(user_data, query, health_data, session)
+                cached = self.cache.get(cache_key) if cache_key else None
+                ollama_context = ollama_model = None
+                if cached is not None:
+                    response = cached
+                    yield "token", {"token": cached}
+                    yield "done", {"cached": True}
+                else:
+                    tokens = []
+                    system, prompt, context = self.get_prompt_for_situation(user_data, query, health_data, session)
+                    for frame in self.client.generate_stream(prompt, system=system, context=context,
+                                                             model=session.ollama_model if context else None):
+                        if frame.get("response"):
+                            tokens.append(frame["response"])
+                            yield "token", {"token": frame["response"]}
+                        if frame.get("done"):
+                            ollama_context = frame.get("context")
+                            ollama_model = frame.get("model")
+                            yield "done", {
+                                "cached": False,
+                                "continued": context is not None,
+                                "prompt_eval_count": frame.get("prompt_eval_count"),
+                                "prompt_eval_duration": frame.get("prompt_eval_duration"),
+                                "eval_count": frame.get("eval_count"),
+                                "eval_duration": frame.get("eval_duration")
+                            }
+                    response = "".join(tokens).strip()
+                    if cache_key and response:
+                        self.cache.set(cache_key, response)
+
+                self._record_interaction(session, query, response, health_data, ollama_context, ollama_model)
+
+        except Exception as e:
+            yield "error", {
+                "error": f"Failed to generate response: {str(e)}",
+                "fallback_response": "I apologize, but I'm having trouble responding right now. If this is an emergency, please contact your emergency services or caregiver immediately."
+            }
+
+    def _cache_key(self, user_data, query, health_data, session=None):
+        # Emergencies always go to the model. So does a turn that continues
+        # an Ollama context: its answer depends on that context, and a cached
+        # answer would leave the context without the turn
+        if is_emergency_situation(query, health_data):
+            return None
+        if session is not None and session.ollama_context:
+            return None
+        return self.cache.make_key(query, user_data, health_data,
+                                   list(session.turns) if session is not None else None)
+
+    def _record_interaction(self, session, query, response, health_data, ollama_context, ollama_model=None):
+        if session is None:
+            return
+
+        # Flag health concerns with the same matcher that detects emergencies
+        if emergency_matcher.is_concern(query):
+            session.add_alert({
+                "timestamp": datetime.now().isoformat(),
+                "query": query,
+                "alert_level": "critical" if emergency_matcher.categories(query) else "high"
+            })
+
+        session.add_turn(query, response, ollama_context, ollama_model)
+        session.last_vitals = health_data
+        self.sessions.save(session)
+
     def _generate_alerts(self, user_data, health_data):
         alerts = []
         current_time = datetime.now()
 
-        # Medication alerts
-        if "medication_schedule" in user_data:
-            for med in user_data["medication_schedule"]:
-                next_dose = datetime.fromisoformat(med["next_dose"])
-                if next_dose <= current_time + timedelta(minutes=30):
-                    alerts.append({
-                        "type": "medication",
-                        "priority": "high",
-                        "message": f"Time to take {med['name']} in {(next_dose - current_time).minutes} minutes"
-                    })
+        # Reminders due within the next half hour, from the scheduler's per-user heaps
+        if self.scheduler and user_data.get("user_id") is not None:
+            for reminder in self.scheduler.due_within(user_data["user_id"], timedelta(minutes=30), current_time):
+                alerts.append({
+                    "type": reminder.reminder_type or "reminder",
+                    "priority": "high" if reminder.reminder_type == "medication" else "normal",
+                    "message": reminder_message(reminder, current_time)
+                })
 
         # Health alerts
         if health_data:
@@ -126,29 +181,6 @@ Please provide a caring, clear, and helpful response. If you detect any health c
                     "message": "High pain level reported - Consider pain management measures"
                 })
 
-        # Daily routine alerts
-        routine_schedule = {
-            "morning_meds": "08:00",
-            "breakfast": "09:00",
-            "exercise": "10:00",
-            "lunch": "13:00",
-            "afternoon_meds": "14:00",
-            "social": "15:00",
-            "dinner": "18:00",
-            "evening_meds": "20:00",
-            "sleep": "22:00"
-        }
-
-        current_hour = current_time.hour
-        for activity, time in routine_schedule.items():
-            hour = int(time.split(":")[0])
-            if current_hour == hour:
-                alerts.append({
-                    "type": "routine",
-                    "priority": "normal",
-                    "message": f"Time for your {activity.replace('_', ' ').title()}"
-                })
-
         return alerts
 
     def _generate_recommendations(self, user_data, health_data):
@@ -163,7 +195,7 @@ Please provide a caring, clear, and helpful response. If you detect any health c
             })
 
         # Social recommendations
-        if "social_interactions" in self.context and len(self.context["social_interactions"]) < 2:
+        if len(user_data.get("social_interactions", [])) < 2:
             recommendations.append({
                 "type": "social",
                 "message": "Try to increase social interaction",
@@ -180,45 +212,25 @@ Please provide a caring, clear, and helpful response. If you detect any health c
         return recommendations
 
     def _get_next_actions(self, user_data):
-        current_time = datetime.now()
         next_actions = []
+        if not self.scheduler or user_data.get("user_id") is None:
+            return next_actions
 
-        # Get next medication time
-        if "medication_schedule" in user_data:
-            next_med = min(
-                user_data["medication_schedule"],
-                key=lambda x: abs(datetime.fromisoformat(x["next_dose"]) - current_time)
-            )
+        # Earliest open medication and routine reminder: heap peeks, no scan
+        next_med = self.scheduler.next_due(user_data["user_id"], "medication")
+        if next_med:
             next_actions.append({
                 "type": "medication",
-                "time": next_med["next_dose"],
-                "action": f"Take {next_med['name']}"
+                "time": next_med.due.isoformat(),
+                "action": f"Take {next_med.title}"
             })
 
-        # Next meal time
-        meal_times = {
-            "breakfast": "09:00",
-            "lunch": "13:00",
-            "dinner": "18:00"
-        }
-        
-        next_meal = min(
-            meal_times.items(),
-            key=lambda x: abs(datetime.strptime(x[1], "%H:%M").hour - current_time.hour)
-        )
-        next_actions.append({
-            "type": "meal",
-            "time": next_meal[1],
-            "action": f"Have {next_meal[0]}"
-        })
+        next_routine = self.scheduler.next_due(user_data["user_id"], "routine")
+        if next_routine:
+            next_actions.append({
+                "type": "routine",
+                "time": next_routine.due.strftime("%H:%M"),
+                "action": next_routine.title
+            })
 
         return next_actions
-
-    def update_context(self, user_data):
-        """Update the AI's context with new user data"""
-        self.context.update({
-            "last_interaction": datetime.now(),
-            "daily_routines": user_data.get("daily_routines", {}),
-            "medication_schedule": user_data.get("medication_schedule", {}),
-            "mood_history": user_data.get("mood_history", [])
-        }) 
\ No newline at end of file
@@ -1,6 +1,7 @@
 """
 Configuration for AI chat functionality
 """
+import os
 
 SYSTEM_PROMPTS = {
     "health_assistant": """You are an AI health assistant for elderly care monitoring. Your role is to:
@@ -47,25 +48,242 @@ ALERT_THRESHOLDS = {
     }
 }
 
-EMERGENCY_KEYWORDS = [
-    "fall", "fallen", "chest pain", "breathing", "unconscious",
-    "unresponsive", "emergency", "help", "ambulance", "critical"
+OLLAMA_CONFIG = {
+    "base_url": os.getenv("OLLAMA_HOST", "http://localhost:11434"),
+    "model": os.getenv("OLLAMA_MODEL", "llama3"),
+    # How long Ollama keeps the model loaded after a request ("30m", "-1" = forever)
+    "keep_alive": os.getenv("OLLAMA_KEEP_ALIVE", "30m"),
+    "connect_timeout": float(os.getenv("OLLAMA_CONNECT_TIMEOUT", "3")),
+    "read_timeout": float(os.getenv("OLLAMA_READ_TIMEOUT", "30")),
+    "pool_size": int(os.getenv("OLLAMA_POOL_SIZE", "8"))
+}
+
+LLM_GATEWAY = {
+    # Comma-separated Ollama instances to spread chat across, each "url" or
+    # "url=model"; empty means just OLLAMA_HOST with OLLAMA_MODEL
+    "backends": os.getenv("OLLAMA_BACKENDS", ""),
+    # How often every instance's /api/tags is checked in the background
+    "probe_interval": float(os.getenv("OLLAMA_PROBE_INTERVAL", "15")),
+    # How long an instance that failed a request is skipped
+    "failure_cooldown": float(os.getenv("OLLAMA_FAILURE_COOLDOWN", "30"))
+}
+
+CHAT_CONCURRENCY = {
+    # Generations allowed to run at once against a single model
+    "max_concurrent": int(os.getenv("CHAT_MAX_CONCURRENT", "2")),
+    # Requests allowed to wait for a slot before new ones get HTTP 429
+    "max_queue": int(os.getenv("CHAT_MAX_QUEUE", "8")),
+    # Longest a request may wait for its turn plus generation, in seconds
+    "request_timeout": float(os.getenv("CHAT_REQUEST_TIMEOUT", "60"))
+}
+
+RESPONSE_CACHE = {
+    "max_entries": int(os.getenv("RESPONSE_CACHE_SIZE", "512")),
+    "ttl": float(os.getenv("RESPONSE_CACHE_TTL", "600"))  # seconds
+}
+
+PROMPT_BUDGET = {
+    # Upper bound on system + prompt tokens sent per request
+    "max_tokens": int(os.getenv("PROMPT_MAX_TOKENS", "1024")),
+    "chars_per_token": 4
+}
+
+SESSION_CONFIG = {
+    # Conversation turns and health alerts kept per user
+    "max_turns": int(os.getenv("SESSION_MAX_TURNS", "10")),
+    "max_alerts": 20,
+    # Sessions idle this long are dropped from memory
+    "idle_ttl": int(os.getenv("SESSION_IDLE_SECONDS", "1800")),
+    "max_sessions": int(os.getenv("SESSION_MAX_USERS", "1000")),
+    # Past this many tokens the Ollama context is dropped and the next turn
+    # starts over from the recent turns
+    "max_context_tokens": int(os.getenv("SESSION_MAX_CONTEXT_TOKENS", "3072")),
+    # SQLite file to persist sessions in; unset keeps them in memory only
+    "db_path": os.getenv("SESSION_DB")
+}
+
+STORAGE_CONFIG = {
+    # What an acknowledged write survives: "full" (power loss), "normal"
+    # (process crash; a power cut may lose the last commits) or "off" (no
+    # fsync at all, for throwaway databases)
+    "durability": os.getenv("STORAGE_DURABILITY", "normal"),
+    # How long the writer waits for more writes to join a commit, in ms
+    "commit_window_ms": float(os.getenv("STORAGE_COMMIT_WINDOW_MS", "1")),
+    "max_batch": int(os.getenv("STORAGE_MAX_BATCH", "256")),
+    # How long a request waits for its write to be committed
+    "write_timeout": float(os.getenv("STORAGE_WRITE_TIMEOUT", "10")),
+    # Pooled connections shared by the ORM and the raw-SQL routes
+    "pool_size": int(os.getenv("STORAGE_POOL_SIZE", "10")),
+    "max_overflow": int(os.getenv("STORAGE_POOL_OVERFLOW", "10")),
+    "busy_timeout_ms": int(os.getenv("STORAGE_BUSY_TIMEOUT_MS", "5000")),
+    "cache_size_kb": int(os.getenv("STORAGE_CACHE_KB", "16384")),
+    "mmap_size": int(os.getenv("STORAGE_MMAP_BYTES", str(256 * 1024 * 1024)))
+}
+
+SHARD_CONFIG = {
+    # Database files the residents are spread over; 1 keeps everything in DATABASE_URL
+    "count": int(os.getenv("SHARD_COUNT", "1")),
+    # URL of shard n > 0, with {n} for the number; by default DATABASE_URL
+    # with ".shard<n>" before its extension
+    "url_template": os.getenv("SHARD_URL_TEMPLATE")
+}
+
+# Days rollup buckets are kept, per resolution (None: for good). The cold
+# tiering job prunes older ones; charts over older ranges use coarser buckets
+ROLLUP_RETENTION_DAYS = {
+    "1m": float(os.getenv("ROLLUP_RETENTION_1M_DAYS", "7")),
+    "1h": float(os.getenv("ROLLUP_RETENTION_1H_DAYS", "365")),
+    "1d": None
+}
+
+COLD_STORAGE_CONFIG = {
+    # Where the Parquet files of the cold tier are kept
+    "root": os.getenv("COLD_STORAGE_DIR", "cold_storage"),
+    # Readings older than this many days move out of SQLite
+    "after_days": float(os.getenv("COLD_AFTER_DAYS", "90")),
+    # Seconds between tiering runs; 0 runs it only on POST /api/admin/cold-storage
+    "interval": float(os.getenv("COLD_TIER_INTERVAL", "86400")),
+    # Rows moved per SQLite transaction
+    "batch_rows": int(os.getenv("COLD_TIER_BATCH", "50000")),
+    "compression": os.getenv("COLD_STORAGE_COMPRESSION", "zstd")
+}
+
+METRICS_CONFIG = {
+    # METRICS_ENABLED=0 turns every timer into a no-op and hides /api/metrics
+    "enabled": os.getenv("METRICS_ENABLED", "1") != "0",
+    # Histogram bucket upper bounds, in seconds
+    "latency_buckets": (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+    "throughput_buckets": (1, 2.5, 5, 10, 20, 40, 80, 160, 320)
+}
+
+# Phrase -> (category, severity). An "emergency" phrase answers straight
+# from EMERGENCY_ACTIONS and raises a critical alert; a "concern" phrase only
+# flags the conversation. Phrases match whole words, after contractions are
+# expanded ("can't" -> "can not"). "fall" and "falling" alone are too common
+# in other senses ("afraid of falling"), so only event wording is an emergency.
+EMERGENCY_PATTERNS = {
+    "fell": ("fall", "emergency"),
+    "fallen": ("fall", "emergency"),
+    "had a fall": ("fall", "emergency"),
+    "took a fall": ("fall", "emergency"),
+    "bad fall": ("fall", "emergency"),
+    "am falling": ("fall", "emergency"),
+    "keep falling": ("fall", "emergency"),
+    "can not stop falling": ("fall", "emergency"),
+    "can not get up": ("fall", "emergency"),
+    "chest pain": ("cardiac", "emergency"),
+    "chest pains": ("cardiac", "emergency"),
+    "chest tightness": ("cardiac", "emergency"),
+    "heart attack": ("cardiac", "emergency"),
+    "trouble breathing": ("breathing", "emergency"),
+    "difficulty breathing": ("breathing", "emergency"),
+    "not breathing": ("breathing", "emergency"),
+    "can not breathe": ("breathing", "emergency"),
+    "hard to breathe": ("breathing", "emergency"),
+    "short of breath": ("breathing", "emergency"),
+    "shortness of breath": ("breathing", "emergency"),
+    "choking": ("breathing", "emergency"),
+    "unconscious": ("unresponsive", "emergency"),
+    "unresponsive": ("unresponsive", "emergency"),
+    "passed out": ("unresponsive", "emergency"),
+    "fainted": ("unresponsive", "emergency"),
+    "stroke": ("stroke", "emergency"),
+    "face drooping": ("stroke", "emergency"),
+    "slurred speech": ("stroke", "emergency"),
+    "emergency": ("general", "emergency"),
+    "ambulance": ("general", "emergency"),
+    "call 911": ("general", "emergency"),
+    "need help": ("general", "emergency"),
+    "send help": ("general", "emergency"),
+    "call for help": ("general", "emergency"),
+    "someone help": ("general", "emergency"),
+    "somebody help": ("general", "emergency"),
+    "heavy bleeding": ("general", "emergency"),
+    "fall": ("fall", "concern"),
+    "falling": ("fall", "concern"),
+    "help": ("general", "concern"),
+    "pain": ("general", "concern"),
+    "dizzy": ("general", "concern"),
+    "dizziness": ("general", "concern"),
+    "breathing": ("breathing", "concern"),
+    "bleeding": ("general", "concern"),
+    "critical": ("general", "concern"),
+    "confused": ("general", "concern")
+}
+
+# Phrases that contain a pattern without meaning it
+EMERGENCY_EXCLUSIONS = [
+    "fall asleep", "fell asleep", "falling asleep", "in the fall", "this fall", "last fall",
+    "fall risk", "fall prevention", "emergency contact", "emergency contacts"
 ]
 
+# A pattern right after one of these ("I did not fall", "no chest pain") doesn't
+# count. Up to NEGATION_WINDOW filler words may sit in between ("never had a
+# fall"); any other word ends the negation, so "not moving and falling" stands.
+# Patterns that are negations themselves ("not breathing") are never negated.
+NEGATION_CUES = ["no", "not", "never", "without", "denies", "nothing"]
+NEGATION_FILLERS = ["a", "an", "any", "the", "have", "had", "has", "been", "ever"]
+NEGATION_WINDOW = 3
+
+# An emergency phrase (other than a call for help) in a clause that asks
+# about it ("Is chest pain a sign of a heart attack?") or reports it is over
+# ("my chest pains are gone") only flags the conversation. A question clause
+# starts with one of QUESTION_WORDS and ends with "?"; a resolution cue has to
+# follow the phrase within NEGATION_WINDOW words, before "and"/"then".
+QUESTION_WORDS = ["how", "what", "why", "when", "where", "which", "who", "is", "are", "am",
+                  "was", "were", "do", "does", "did", "can", "could", "should", "would",
+                  "will", "may", "might", "have", "has"]
+RESOLUTION_CUES = ["gone", "stopped", "passed", "eased", "resolved", "better"]
+
+# Immediate steps per emergency category, in the emergency prompt's style
+EMERGENCY_ACTIONS = {
+    "fall": [
+        "[URGENT] Stay still for a moment and check yourself for pain or injury before moving",
+        "[URGENT] If you hit your head, cannot get up, or have severe pain, call emergency services (911)",
+        "If you feel able, roll onto your side and get up slowly using a sturdy chair"
+    ],
+    "cardiac": [
+        "[URGENT] Call emergency services (911) now",
+        "[URGENT] Stop what you are doing and sit or lie down; loosen tight clothing",
+        "Unlock the door if you can so help can reach you"
+    ],
+    "breathing": [
+        "[URGENT] Call emergency services (911) if you cannot speak in full sentences",
+        "[URGENT] Sit upright and use your prescribed inhaler or oxygen if you have one",
+        "Loosen tight clothing and breathe slowly in through the nose, out through the mouth"
+    ],
+    "unresponsive": [
+        "[URGENT] Call emergency services (911) now",
+        "[URGENT] Check for breathing; if there is none, start CPR if you are trained",
+        "If they are breathing, roll them onto their side and stay with them"
+    ],
+    "stroke": [
+        "[URGENT] Call emergency services (911) now",
+        "[URGENT] Note the time the symptoms started",
+        "Do not give food, drink or medication"
+    ],
+    "general": [
+        "[URGENT] If you are in danger or feel very unwell, call emergency services (911) now",
+        "Stay where you are and keep your phone close"
+    ]
+}
+
 def is_emergency_situation(message, health_data=None):
     """
     Check if the current situation is an emergency based on the message
     and optional health data
     """
-    # Check message for emergency keywords
-    message_lower = message.lower()
-    if any(keyword in message_lower for keyword in EMERGENCY_KEYWORDS):
+    # Check message for emergency phrases; the matcher is compiled from the
+    # tables above, so it's imported here rather than at module load
+    from emergency import emergency_matcher
+    if emergency_matcher.categories(message):
         return True
     
     # Check health data if provided
     if health_data:
         hr = health_data.get('heart_rate')
-        o2 = health_data.get('oxygen_saturation')
+        # Readings store SpO2 as oxygen_level
+        o2 = health_data.get('oxygen_level', health_data.get('oxygen_saturation'))
         
         if hr and (hr < ALERT_THRESHOLDS['heart_rate']['critical_low'] or 
                   hr > ALERT_THRESHOLDS['heart_rate']['critical_high']):
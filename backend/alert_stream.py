@@ -0,0 +1,69 @@
+"""
+In-process pub/sub for pushing alerts to caregiver sessions over SSE.
+
+Each user id is a topic. Subscribers get a bounded queue; a subscriber that
+falls too far behind is disconnected rather than allowed to grow memory, and
+its client reconnects with Last-Event-ID to replay what it missed from the
+alert table.
+"""
+import json
+import queue
+import threading
+
+SUBSCRIBER_QUEUE_SIZE = 256
+HEARTBEAT_SECONDS = 15
+
+
+class Subscription:
+    def __init__(self, user_ids):
+        self.user_ids = frozenset(user_ids)
+        self.queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.closed = False
+
+    def get(self, timeout=HEARTBEAT_SECONDS):
+        """Next event dict, or None if nothing arrived within the timeout"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class AlertBroker:
+    def __init__(self):
+        self._topics = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_ids):
+        subscription = Subscription(user_ids)
+        with self._lock:
+            for user_id in subscription.user_ids:
+                self._topics.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for user_id in subscription.user_ids:
+                subscribers = self._topics.get(user_id)
+                if subscribers:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._topics[user_id]
+
+    def publish(self, user_id, event):
+        with self._lock:
+            subscribers = list(self._topics.get(user_id, ()))
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait(event)
+            except queue.Full:
+                # Too slow to keep up; it will catch up through replay
+                subscription.closed = True
+                self.unsubscribe(subscription)
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._topics.values())
+
+
+def format_sse(event, event_type='alert'):
+    return f"id: {event['id']}\nevent: {event_type}\ndata: {json.dumps(event)}\n\n"
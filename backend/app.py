@@ -1,19 +1,39 @@
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, Response, stream_with_context
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.security import generate_password_hash, check_password_hash
+import base64
 import datetime
-import subprocess
 import os
 from dotenv import load_dotenv
 import json
-from ai_config import get_prompt_for_situation, is_emergency_situation
-import pandas as pd
-import numpy as np
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.preprocessing import StandardScaler
-import joblib
+import threading
+import time
+from ai_config import get_prompt_for_situation, is_emergency_situation, CHAT_CONCURRENCY, COLD_STORAGE_CONFIG
 from ai_assistant import ElderlyAIAssistant
+from risk_model import LazyRiskModel
+from migrations import migrate
+from safety_stream import SafetyProcessor, parse_event
+from reminder_scheduler import (ReminderScheduler, ScheduledReminder, RECURRENCE_INTERVALS,
+                                next_occurrence, reminder_message, routine_schedule)
+from alert_stream import AlertBroker, format_sse
+from user_context import (UserContextCache, MOOD_HISTORY_LENGTH, partition_reminders,
+                          format_medications, format_routines, format_appointments,
+                          format_mood_history)
+from baselines import BaselineStore, apply_deviations, save_baselines
+from rollups import (ROLLUP_METRICS, RESOLUTIONS, DEFAULT_MAX_POINTS, bucket_start,
+                     choose_resolution, prune_rollups, update_rollups)
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+import metrics
+from metrics import stage
+from chat_executor import ChatExecutor, ChatQueueFull
+from llm_gateway import LLMGateway
+from emergency import emergency_matcher, emergency_response
+import storage
+import sharding
+from cold_storage import ColdStore, TIERED_TABLES, arrow_schema, history as tiered_history, tier
+from concurrent.futures import TimeoutError as FuturesTimeout
 
 # Load environment variables
 load_dotenv()
@@ -22,9 +42,20 @@ app = Flask(__name__)
 CORS(app)
 
 # Database configuration
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///elderly_care.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///elderly_care.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db = SQLAlchemy(app)
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = storage.engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
+# Shards 1 and up are binds; DATABASE_URL is shard 0
+app.config['SQLALCHEMY_BINDS'] = sharding.binds(app.config['SQLALCHEMY_DATABASE_URI'])
+db = SQLAlchemy(app, session_options={'class_': sharding.ShardedSession})
+with app.app_context():
+    # WAL and tuned pragmas on every pooled connection
+    for engine in db.engines.values():
+        storage.tune_engine(engine)
+
+# Finds each user's shard; writes from the request paths are group-committed
+# by one writer thread per shard
+shards = sharding.ShardRouter(app, db)
 
 # Models
 class User(db.Model):
@@ -58,6 +89,40 @@ class HealthData(db.Model):
     alert_level = db.Column(db.String(20))
     health_score = db.Column(db.Float)
 
+    __table_args__ = (
+        # Serves the per-user, newest-first keyset pagination in get_health_data
+        db.Index('ix_health_data_user_timestamp', 'user_id', 'timestamp', 'id'),
+    )
+
+class HealthRollup(db.Model):
+    """Min/max/sum/count/last of one metric for one user over one time bucket"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    metric = db.Column(db.String(30), nullable=False)
+    resolution = db.Column(db.String(4), nullable=False)
+    bucket_start = db.Column(db.DateTime, nullable=False)
+    count = db.Column(db.Integer, nullable=False)
+    sum_value = db.Column(db.Float, nullable=False)
+    min_value = db.Column(db.Float, nullable=False)
+    max_value = db.Column(db.Float, nullable=False)
+    last_value = db.Column(db.Float, nullable=False)
+    last_timestamp = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'metric', 'resolution', 'bucket_start',
+                            name='uq_health_rollup_bucket'),
+    )
+
+class HealthBaseline(db.Model):
+    """Running statistics of one metric for one user; see baselines.py"""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    metric = db.Column(db.String(30), primary_key=True)
+    count = db.Column(db.Integer, nullable=False)
+    mean = db.Column(db.Float, nullable=False)
+    m2 = db.Column(db.Float, nullable=False)
+    ewma = db.Column(db.Float)
+    window = db.Column(db.LargeBinary)
+
 class Reminder(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -67,6 +132,13 @@ class Reminder(db.Model):
     completed = db.Column(db.Boolean, default=False)
     reminder_type = db.Column(db.String(20))  # medication, appointment, etc.
     priority = db.Column(db.String(20), default='normal')
+    recurrence = db.Column(db.String(10))  # hourly, daily, weekly or None
+    last_fired_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        # Open reminders for a user in due order, read by load_user_context
+        db.Index('ix_reminder_user_open', 'user_id', 'completed', 'due_date'),
+    )
 
 class Alert(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -78,236 +150,267 @@ class Alert(db.Model):
     acknowledged = db.Column(db.Boolean, default=False)
 
 def init_db():
-    """Initialize the database and create tables"""
+    """
+    Bring every shard's schema up to date and create the demo user if it's
+    missing. Safe to run on every start: existing data is kept.
+    """
     with app.app_context():
-        # Drop all tables
-        db.drop_all()
-        # Create all tables
-        db.create_all()
+        for shard in range(shards.count):
+            raw = shards.engine(shard).raw_connection()
+            try:
+                applied = migrate(raw.driver_connection)
+            finally:
+                raw.close()
+            if applied:
+                print(f"Applied schema migrations to shard {shard}: {applied}")
+        shards.check_directory()
         
         # Create a default user if none exists
-        if not User.query.filter_by(username='demo').first():
-            default_user = User(
-                username='demo',
-                password=generate_password_hash('demo123'),
-                name='Demo User',
-                email='demo@example.com',
-                age=65,
-                gender='Not specified',
-                emergency_contact='Emergency Contact: 911',
-                medical_history='No pre-existing conditions'
-            )
-            db.session.add(default_user)
+        if not shards.find('demo'):
+            try:
+                create_user('demo', generate_password_hash('demo123'), routine=True,
+                            name='Demo User',
+                            email='demo@example.com',
+                            age=65,
+                            gender='Not specified',
+                            emergency_contact='Emergency Contact: 911',
+                            medical_history='No pre-existing conditions')
+            except IntegrityError:
+                # Another worker created it first
+                pass
+
+def create_user(username, password, facility=None, routine=False, **profile):
+    """
+    Register a user in the shard directory and create them on their shard,
+    with the default daily routine if asked; returns the new user id.
+    Raises IntegrityError if the username is taken.
+    """
+    user_id, shard = shards.register(username, facility)
+    try:
+        with shards.use(shard):
+            db.session.add(User(id=user_id, username=username, password=password, **profile))
+            if routine:
+                db.session.flush()
+                db.session.add_all(default_routine(user_id))
             db.session.commit()
+    except Exception:
+        db.session.rollback()
+        shards.unregister(user_id)
+        raise
+    return user_id
+
+def default_routine(user_id):
+    """Daily reminders for the standard routine, each starting at its next occurrence"""
+    return [Reminder(
+        user_id=user_id,
+        title=title,
+        reminder_type=reminder_type,
+        due_date=due_date,
+        recurrence='daily'
+    ) for title, reminder_type, due_date in routine_schedule(datetime.datetime.now())]
 
 # Initialize database
 init_db()
 
-# Load ML model and scaler
-try:
-    model = joblib.load('models/health_predictor.joblib')
-    scaler = joblib.load('models/scaler.joblib')
-except:
-    # Train a simple model if not exists
-    model = RandomForestClassifier()
-    scaler = StandardScaler()
-
-# Initialize AI Assistant
-ai_assistant = ElderlyAIAssistant()
+# The risk model (with scikit-learn and pandas) loads in the background;
+# single readings share batched predictions once it's there
+risk_models = LazyRiskModel()
 
-def analyze_health_data(data):
+def fire_reminders(entries):
     """
-    Analyze health data and generate alerts and predictions
+    Record reminders the scheduler found due: one alert each, pushed to
+    caregivers, with recurring reminders moved to their next occurrence in
+    the same transaction on each shard
     """
-    # Define normal ranges for vital signs and health metrics
-    ranges = {
-        'heart_rate': {
-            'normal': (60, 100),
-            'warning': (50, 120),
-            'critical': (40, 130)
-        },
-        'oxygen_level': {
-            'normal': (95, 100),
-            'warning': (90, 94),
-            'critical': (0, 89)
-        },
-        'temperature': {
-            'normal': (97.0, 99.0),
-            'warning': (96.0, 100.0),
-            'critical': (95.0, 103.0)
-        },
-        'glucose_level': {
-            'normal': (70, 140),
-            'warning': (60, 180),
-            'critical': (50, 200)
-        },
-        'sleep_hours': {
-            'normal': (7, 9),
-            'warning': (5, 10),
-            'critical': (0, 4)
-        }
-    }
+    def write(shard, shard_entries):
+        return lambda session: fire_on_shard(session, shard_entries)
     
-    alerts = []
-    alert_level = 'normal'
-    health_score = 100  # Start with perfect score and deduct based on issues
+    fired, events = [], []
+    for shard_fired, shard_events in shards.write_each(shards.split(entries, lambda entry: entry.user_id), write):
+        fired.extend(shard_fired)
+        events.extend(shard_events)
+    for reminder in fired:
+        reminder_scheduler.schedule(reminder)
+    user_contexts.invalidate(*{reminder.user_id for reminder in fired})
+    publish_alerts(events)
+
+def fire_on_shard(session, entries):
+    now = datetime.datetime.now()
+    fired = []
+    new_alerts = []
+    reminders = session.query(Reminder).filter(Reminder.id.in_([entry.id for entry in entries])).all()
+    for reminder in reminders:
+        if reminder.completed or (reminder.last_fired_at and reminder.last_fired_at >= reminder.due_date):
+            continue
+        new_alerts.append(Alert(
+            user_id=reminder.user_id,
+            type=reminder.reminder_type or 'reminder',
+            message=reminder_message(ScheduledReminder.from_row(reminder)),
+            priority=reminder.priority or 'normal',
+            timestamp=now
+        ))
+        reminder.last_fired_at = now
+        if reminder.recurrence:
+            reminder.due_date = next_occurrence(reminder.due_date, reminder.recurrence, now)
+        fired.append(ScheduledReminder.from_row(reminder))
     
-    try:
-        # Analyze vital signs
-        # Heart Rate Analysis
-        hr = float(data['heart_rate'])
-        if hr < ranges['heart_rate']['normal'][0] or hr > ranges['heart_rate']['normal'][1]:
-            if hr < ranges['heart_rate']['warning'][0] or hr > ranges['heart_rate']['warning'][1]:
-                alerts.append(f"CRITICAL: Heart rate at {hr} BPM is severely abnormal")
-                alert_level = 'danger'
-                health_score -= 30
-            else:
-                alerts.append(f"WARNING: Heart rate at {hr} BPM is outside normal range")
-                alert_level = 'warning'
-                health_score -= 15
-
-        # Oxygen Level Analysis
-        o2 = float(data['oxygen_level'])
-        if o2 < ranges['oxygen_level']['normal'][0]:
-            if o2 < ranges['oxygen_level']['warning'][0]:
-                alerts.append(f"CRITICAL: Oxygen level at {o2}% is dangerously low")
-                alert_level = 'danger'
-                health_score -= 40
-            else:
-                alerts.append(f"WARNING: Oxygen level at {o2}% is below normal")
-                alert_level = 'warning'
-                health_score -= 20
-
-        # Temperature Analysis
-        temp = float(data['temperature'])
-        if temp < ranges['temperature']['normal'][0] or temp > ranges['temperature']['normal'][1]:
-            if temp < ranges['temperature']['warning'][0] or temp > ranges['temperature']['warning'][1]:
-                alerts.append(f"CRITICAL: Temperature at {temp}°F requires immediate attention")
-                alert_level = 'danger'
-                health_score -= 25
-            else:
-                alerts.append(f"WARNING: Temperature at {temp}°F is outside normal range")
-                alert_level = 'warning'
-                health_score -= 10
-
-        # Glucose Level Analysis
-        glucose = float(data['glucose_level'])
-        if glucose < ranges['glucose_level']['normal'][0] or glucose > ranges['glucose_level']['normal'][1]:
-            if glucose < ranges['glucose_level']['warning'][0] or glucose > ranges['glucose_level']['warning'][1]:
-                alerts.append(f"CRITICAL: Glucose level at {glucose} mg/dL requires immediate attention")
-                alert_level = 'danger'
-                health_score -= 25
-            else:
-                alerts.append(f"WARNING: Glucose level at {glucose} mg/dL is outside normal range")
-                alert_level = 'warning'
-                health_score -= 10
-
-        # Sleep Analysis
-        sleep = float(data['sleep_hours'])
-        if sleep < ranges['sleep_hours']['normal'][0] or sleep > ranges['sleep_hours']['normal'][1]:
-            alerts.append(f"NOTE: Sleep duration of {sleep} hours is outside recommended range")
-            health_score -= 5
-
-        # Activity Level Analysis
-        activity_scores = {
-            'sedentary': -10,
-            'light': 0,
-            'moderate': 5,
-            'active': 10,
-            'very_active': 15
-        }
-        health_score += activity_scores.get(data['activity_level'], 0)
-
-        # Medication Adherence
-        if not data['medication_adherence']:
-            alerts.append("WARNING: Missed medications today")
-            health_score -= 15
-
-        # Pain Level Analysis
-        pain = int(data['pain_level'])
-        if pain >= 7:
-            alerts.append(f"ALERT: High pain level reported ({pain}/10)")
-            alert_level = 'warning'
-            health_score -= 20
-        elif pain >= 4:
-            alerts.append(f"NOTE: Moderate pain level reported ({pain}/10)")
-            health_score -= 10
-
-        # Mood Analysis
-        mood = int(data['mood'])
-        if mood <= 2:
-            alerts.append("NOTE: Low mood reported - may need attention")
-            health_score -= 10
-
-        # Adjust final health score
-        health_score = max(0, min(100, health_score))  # Keep between 0 and 100
-
-        # Generate AI insights using the trained model
-        try:
-            # Prepare data for prediction
-            features = [
-                hr, o2, temp, glucose, sleep,
-                activity_scores.get(data['activity_level'], 0),
-                1 if data['medication_adherence'] else 0,
-                pain, mood
-            ]
-            
-            # Scale features and make prediction if model exists
-            if 'model' in globals() and 'scaler' in globals():
-                features_scaled = scaler.transform([features])
-                risk_prediction = model.predict(features_scaled)[0]
-                if risk_prediction > 0.7:
-                    alerts.append("AI ALERT: High risk pattern detected - Consider medical consultation")
-                    if alert_level != 'danger':
-                        alert_level = 'warning'
-        except Exception as e:
-            print(f"AI prediction error: {str(e)}")
+    session.add_all(new_alerts)
+    session.flush()
+    return fired, [serialize_alert(alert) for alert in new_alerts]
 
-        return {
-            'alerts': alerts,
-            'alert_level': alert_level,
-            'health_score': health_score,
-            'analysis_timestamp': datetime.datetime.utcnow().isoformat()
-        }
+reminder_scheduler = ReminderScheduler(fire_reminders)
+with app.app_context():
+    reminder_scheduler.load([entry for _, entries in shards.fan_out(lambda session: [
+        ScheduledReminder.from_row(reminder)
+        for reminder in session.query(Reminder).filter_by(completed=False).all()
+    ]) for entry in entries])
 
-    except Exception as e:
-        print(f"Error in health analysis: {str(e)}")
-        return {
-            'alerts': ["Error analyzing health data"],
-            'alert_level': 'error',
-            'health_score': 0,
-            'analysis_timestamp': datetime.datetime.utcnow().isoformat()
-        }
+# Readings, rollups and baselines deferred by write jobs go out as one bulk
+# statement each per group commit
+shards.flusher('health_data', lambda session, rows: session.execute(db.insert(HealthData.__table__), rows))
+shards.flusher('rollups', lambda session, rows: update_rollups(session, HealthRollup, rows))
+shards.flusher('baselines', lambda session, rows: save_baselines(session, HealthBaseline, rows))
+shards.start()
+
+# Initialize AI Assistant; every Ollama call goes through the gateway
+llm_gateway = LLMGateway()
+ai_assistant = ElderlyAIAssistant(client=llm_gateway, scheduler=reminder_scheduler)
+# Each Ollama instance adds its own generation slots
+chat_executor = ChatExecutor(max_concurrent=CHAT_CONCURRENCY["max_concurrent"] * len(llm_gateway.backends))
+alert_broker = AlertBroker()
+user_contexts = UserContextCache()
+
+# Instrumentation, scraped at /api/metrics
+REQUEST_SECONDS = metrics.registry.histogram(
+    'elder_http_request_duration_seconds', 'Time to build each response, by route',
+    ('method', 'route', 'status'))
+with app.app_context():
+    metrics.instrument_database(db.engines.values(), db.session)
+
+@app.before_request
+def start_request_timer():
+    request.environ['metrics.start'] = time.perf_counter()
+
+@app.before_request
+def route_to_shard():
+    # Routes with a user in the path read and write that user's shard
+    if request.view_args and 'user_id' in request.view_args:
+        shards.route(request.view_args['user_id'])
+
+@app.after_request
+def record_request_time(response):
+    start = request.environ.get('metrics.start')
+    if start is not None and metrics.registry.enabled:
+        # Streaming responses are timed to their first byte
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        REQUEST_SECONDS.observe(time.perf_counter() - start, request.method, route, str(response.status_code))
+    return response
+
+@metrics.registry.collector
+def collect_component_stats():
+    caches = {'response': ai_assistant.cache.stats(), 'user_context': user_contexts.stats()}
+    lanes = chat_executor.stats()
+    families = [
+        ('elder_cache_hits_total', 'counter', 'Cache lookups answered from memory',
+         [({'cache': name}, stats['hits']) for name, stats in caches.items()]),
+        ('elder_cache_misses_total', 'counter', 'Cache lookups that had to be computed',
+         [({'cache': name}, stats['misses']) for name, stats in caches.items()]),
+        ('elder_cache_hit_ratio', 'gauge', 'Share of cache lookups that were hits',
+         [({'cache': name}, stats['hit_rate']) for name, stats in caches.items()]),
+        ('elder_cache_entries', 'gauge', 'Entries held in each cache',
+         [({'cache': name}, stats['entries']) for name, stats in caches.items()]),
+        ('elder_chat_admitted_total', 'counter', 'Chat requests admitted per model lane',
+         [({'model': model}, lane['admitted']) for model, lane in lanes.items()]),
+        ('elder_chat_rejected_total', 'counter', 'Chat requests turned away as busy',
+         [({'model': model}, lane['rejected']) for model, lane in lanes.items()]),
+        ('elder_chat_sessions', 'gauge', 'Chat sessions held in memory',
+         [({}, ai_assistant.sessions.stats()['sessions'])]),
+        ('elder_reminders_scheduled', 'gauge', 'Open reminders in the scheduler',
+         [({}, reminder_scheduler.stats()['scheduled'])])
+    ]
+    writes = shards.stats()
+    families.append(('elder_db_group_commits_total', 'counter', "Transactions committed by each shard's writer thread",
+                     [({'shard': str(w['shard'])}, w['commits']) for w in writes]))
+    families.append(('elder_db_writes_total', 'counter', 'Write jobs committed, over all group commits',
+                     [({'shard': str(w['shard'])}, w['writes']) for w in writes]))
+    families.append(('elder_db_write_queue', 'gauge', "Write jobs waiting for each shard's writer thread",
+                     [({'shard': str(w['shard'])}, w['queued']) for w in writes]))
+    llm = llm_gateway.status()
+    families.append(('elder_llm_backend_up', 'gauge', 'Whether an Ollama instance passed its last probe',
+                     [({'url': b['url'], 'model': b['model']}, int(b['healthy'])) for b in llm['backends']]))
+    families.append(('elder_llm_backend_in_flight', 'gauge', 'Generations running on each Ollama instance',
+                     [({'url': b['url'], 'model': b['model']}, b['in_flight']) for b in llm['backends']]))
+    families.append(('elder_llm_coalesced_total', 'counter', 'Requests answered by an identical one already running',
+                     [({}, llm['coalesced'])]))
+    # Read without forcing a load
+    if risk_models.batcher:
+        batcher = risk_models.batcher.stats()
+        families.append(('elder_risk_batches_total', 'counter', 'Batched risk model predictions',
+                         [({}, batcher['batches'])]))
+        families.append(('elder_risk_batched_requests_total', 'counter', 'Readings scored through the batcher',
+                         [({}, batcher['requests'])]))
+    return families
+
+def load_baselines(user_id):
+    with shards.use_user(user_id):
+        rows = db.session.execute(
+            db.select(HealthBaseline.__table__).where(HealthBaseline.user_id == user_id)
+        ).mappings().all()
+    return [dict(row) for row in rows]
+
+baselines = BaselineStore(load_baselines)
+safety_processor = SafetyProcessor()
+# Readings older than COLD_AFTER_DAYS, in Parquet
+cold_store = ColdStore()
+
+def analyze_health_data(data):
+    """
+    Analyze health data and generate alerts and predictions
+    """
+    from health_analysis import analyze_health_records
+    
+    risk_batcher = risk_models.get().batcher
+    with stage('analysis'):
+        return analyze_health_records([data], risk_batcher)[0]
 
 # Routes
 @app.route('/api/register', methods=['POST'])
 def register():
     data = request.json
     
-    if User.query.filter_by(username=data['username']).first():
+    if shards.find(data['username']):
         return jsonify({'success': False, 'message': 'Username already exists'}), 400
         
     hashed_password = generate_password_hash(data['password'])
-    new_user = User(
-        username=data['username'],
-        password=hashed_password,
-        name=data.get('name', ''),
-        email=data.get('email', ''),
-        age=data.get('age'),
-        gender=data.get('gender', ''),
-        emergency_contact=data.get('emergency_contact', ''),
-        medical_history=data.get('medical_history', '')
-    )
-    
-    db.session.add(new_user)
-    db.session.commit()
+    try:
+        # The facility, if given, decides the shard
+        create_user(
+            data['username'],
+            hashed_password,
+            facility=data.get('facility') or None,
+            # Opt in to the standard daily routine as recurring reminders
+            routine=bool(data.get('routine')),
+            name=data.get('name', ''),
+            email=data.get('email', ''),
+            age=data.get('age'),
+            gender=data.get('gender', ''),
+            emergency_contact=data.get('emergency_contact', ''),
+            medical_history=data.get('medical_history', '')
+        )
+    except IntegrityError:
+        return jsonify({'success': False, 'message': 'Username already exists'}), 400
     
     return jsonify({'success': True, 'message': 'User registered successfully'})
 
 @app.route('/api/login', methods=['POST'])
 def login():
     data = request.json
-    user = User.query.filter_by(username=data['username']).first()
+    found = shards.find(data['username'])
+    user = None
+    if found:
+        user_id, shard = found
+        with shards.use(shard):
+            user = db.session.get(User, user_id)
     
     if user and check_password_hash(user.password, data['password']):
         return jsonify({
@@ -322,44 +425,35 @@ def login():
 
 @app.route('/api/health/add', methods=['POST'])
 def add_health_data():
+    observed_users = []
     try:
         data = request.json
-        print("Received health data:", data)
-        
-        # Validate and convert data types
-        data['heart_rate'] = int(data['heart_rate'])
-        data['oxygen_level'] = int(data['oxygen_level'])
-        data['temperature'] = float(data['temperature'])
-        data['glucose_level'] = float(data['glucose_level'])
-        data['sleep_hours'] = float(data['sleep_hours'])
-        data['pain_level'] = int(data['pain_level'])
         
-        # Convert medication_adherence to boolean
-        if isinstance(data['medication_adherence'], str):
-            data['medication_adherence'] = data['medication_adherence'].lower() == 'true'
+        coerce_health_reading(data)
         
-        # Analyze health data
+        # Analyze health data, against fixed ranges and the user's own baseline
         analysis_result = analyze_health_data(data)
+        row = health_row(data, analysis_result, datetime.datetime.utcnow())
+        with stage('baseline'):
+            deviations, baseline_rows = baselines.observe([row])
+        observed_users.append(row['user_id'])
+        apply_deviations(analysis_result, deviations[0])
+        row['alert_level'] = analysis_result['alert_level']
         
-        new_health_data = HealthData(
-            user_id=data['user_id'],
-            heart_rate=data['heart_rate'],
-            blood_pressure=data['blood_pressure'],
-            oxygen_level=data['oxygen_level'],
-            temperature=data['temperature'],
-            glucose_level=data['glucose_level'],
-            sleep_hours=data['sleep_hours'],
-            activity_level=data['activity_level'],
-            medication_adherence=data['medication_adherence'],
-            pain_level=data['pain_level'],
-            mood=data['mood'],
-            notes=data.get('notes', ''),
-            alert_level=analysis_result['alert_level'],
-            health_score=analysis_result['health_score']
-        )
+        def write(session):
+            storage.defer(session, 'health_data', [row])
+            storage.defer(session, 'rollups', [row])
+            storage.defer(session, 'baselines', baseline_rows)
+            new_alerts = []
+            if analysis_result['alert_level'] == 'danger':
+                new_alerts.append(health_alert(row['user_id'], analysis_result))
+                session.add_all(new_alerts)
+                session.flush()
+            return [serialize_alert(alert) for alert in new_alerts]
         
-        db.session.add(new_health_data)
-        db.session.commit()
+        events = shards.writer(row['user_id']).write(write)
+        user_contexts.invalidate(row['user_id'])
+        publish_alerts(events)
         
         return jsonify({
             'success': True,
@@ -368,38 +462,426 @@ def add_health_data():
         })
     except Exception as e:
         db.session.rollback()
+        # The in-memory baselines may hold readings that weren't saved
+        baselines.invalidate(*observed_users)
         print("Error adding health data:", str(e))
         return jsonify({
             'success': False,
             'message': f'Failed to submit health data: {str(e)}'
         }), 500
 
+@app.route('/api/health/bulk', methods=['POST'])
+def add_health_data_bulk():
+    """
+    Ingest many readings at once. Accepts a JSON array (or {"readings": [...]})
+    or NDJSON with one reading per line. Invalid rows are reported by index
+    and skipped; the rest are analyzed together and written in one transaction.
+    """
+    from health_analysis import analyze_health_records
+    
+    observed_users = []
+    try:
+        readings, errors = parse_bulk_readings(request)
+        if len(readings) + len(errors) > MAX_BULK_READINGS:
+            return jsonify({
+                'success': False,
+                'message': f'Too many readings, the limit is {MAX_BULK_READINGS} per request'
+            }), 413
+        
+        valid = []
+        for index, data in readings:
+            try:
+                coerce_health_reading(data)
+                timestamp = data.get('timestamp')
+                if timestamp:
+                    timestamp = datetime.datetime.fromisoformat(str(timestamp).replace('Z', '+00:00'))
+                    if timestamp.tzinfo:
+                        timestamp = timestamp.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+                else:
+                    timestamp = datetime.datetime.utcnow()
+                valid.append((data, health_row(data, {'alert_level': None, 'health_score': None}, timestamp)))
+            except (KeyError, TypeError, ValueError) as e:
+                errors.append({'index': index, 'error': f'Invalid reading: {str(e)}'})
+        
+        with stage('analysis'):
+            analyses = analyze_health_records([data for data, _ in valid], risk_models.get().model)
+        with stage('baseline'):
+            deviations, baseline_rows = baselines.observe([row for _, row in valid])
+        observed_users.extend({row['user_id'] for _, row in valid})
+        rows = []
+        for (_, row), analysis, alerts in zip(valid, analyses, deviations):
+            apply_deviations(analysis, alerts)
+            row['alert_level'] = analysis['alert_level']
+            row['health_score'] = analysis['health_score']
+            rows.append(row)
+        
+        if rows:
+            # One transaction per shard, committed by the shards' writers side by side
+            baseline_groups = shards.split(baseline_rows, lambda row: row['user_id'])
+            
+            def write(shard, readings):
+                def job(session):
+                    shard_rows = [row for row, _ in readings]
+                    storage.defer(session, 'health_data', shard_rows)
+                    storage.defer(session, 'rollups', shard_rows)
+                    storage.defer(session, 'baselines', baseline_groups.get(shard, []))
+                    new_alerts = [health_alert(row['user_id'], analysis)
+                                  for row, analysis in readings
+                                  if analysis['alert_level'] == 'danger']
+                    session.add_all(new_alerts)
+                    session.flush()
+                    return [serialize_alert(alert) for alert in new_alerts]
+                return job
+            
+            groups = shards.split(zip(rows, analyses), lambda reading: reading[0]['user_id'])
+            events = [event for shard_events in shards.write_each(groups, write) for event in shard_events]
+            user_contexts.invalidate(*{row['user_id'] for row in rows})
+            publish_alerts(events)
+        
+        errors.sort(key=lambda error: error['index'])
+        return jsonify({
+            'success': True,
+            'inserted': len(rows),
+            'failed': len(errors),
+            'errors': errors,
+            'alert_levels': {
+                level: sum(1 for a in analyses if a['alert_level'] == level)
+                for level in {a['alert_level'] for a in analyses}
+            }
+        })
+    except Exception as e:
+        db.session.rollback()
+        baselines.invalidate(*observed_users)
+        print("Error adding bulk health data:", str(e))
+        return jsonify({
+            'success': False,
+            'message': f'Failed to submit health data: {str(e)}'
+        }), 500
+
+MAX_BULK_READINGS = 50000
+
+def parse_bulk_readings(req, key='readings'):
+    """Return ([(index, reading), ...], [errors]) from a JSON or NDJSON body"""
+    readings, errors = [], []
+    if req.mimetype in ('application/x-ndjson', 'application/jsonl'):
+        lines = req.get_data(as_text=True).splitlines()
+        for index, line in enumerate(line for line in lines if line.strip()):
+            try:
+                readings.append((index, json.loads(line)))
+            except ValueError as e:
+                errors.append({'index': index, 'error': f'Invalid JSON: {str(e)}'})
+    else:
+        payload = req.get_json()
+        if isinstance(payload, dict):
+            payload = payload.get(key, [])
+        if not isinstance(payload, list):
+            raise ValueError('Expected a JSON array of readings')
+        readings = list(enumerate(payload))
+    
+    errors.extend({'index': index, 'error': 'Reading must be a JSON object'}
+                  for index, reading in readings if not isinstance(reading, dict))
+    return [(index, reading) for index, reading in readings if isinstance(reading, dict)], errors
+
+def coerce_health_reading(data):
+    """Validate and convert a reading's fields in place"""
+    data['heart_rate'] = int(data['heart_rate'])
+    data['oxygen_level'] = int(data['oxygen_level'])
+    data['temperature'] = float(data['temperature'])
+    data['glucose_level'] = float(data['glucose_level'])
+    data['sleep_hours'] = float(data['sleep_hours'])
+    data['pain_level'] = int(data['pain_level'])
+    data['mood'] = int(data['mood'])
+    
+    # Convert medication_adherence to boolean
+    if isinstance(data['medication_adherence'], str):
+        data['medication_adherence'] = data['medication_adherence'].lower() == 'true'
+    return data
+
+def health_row(data, analysis, timestamp=None):
+    """Column values for a HealthData row"""
+    row = {
+        'user_id': data['user_id'],
+        'heart_rate': data['heart_rate'],
+        'blood_pressure': data['blood_pressure'],
+        'oxygen_level': data['oxygen_level'],
+        'temperature': data['temperature'],
+        'glucose_level': data['glucose_level'],
+        'sleep_hours': data['sleep_hours'],
+        'activity_level': data['activity_level'],
+        'medication_adherence': data['medication_adherence'],
+        'pain_level': data['pain_level'],
+        'mood': data['mood'],
+        'notes': data.get('notes', ''),
+        'alert_level': analysis['alert_level'],
+        'health_score': analysis['health_score']
+    }
+    if timestamp is not None:
+        row['timestamp'] = timestamp
+    return row
+
 @app.route('/api/health/<int:user_id>', methods=['GET'])
 def get_health_data(user_id):
-    health_data = HealthData.query.filter_by(user_id=user_id).order_by(HealthData.timestamp.desc()).all()
+    """
+    Page through a user's readings, newest first.
+
+    Query parameters:
+    - limit: page size (default 100, max 1000)
+    - cursor: next_cursor from the previous page
+    - since / until: ISO timestamps bounding the readings
+    - fields: comma-separated columns to return (id and timestamp always are)
+    """
+    try:
+        limit = max(1, min(int(request.args.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE))
+        fields = parse_health_fields(request.args.get('fields'))
+        since = parse_query_timestamp(request.args['since']) if request.args.get('since') else None
+        until = parse_query_timestamp(request.args['until']) if request.args.get('until') else None
+        cursor = decode_cursor(request.args['cursor']) if request.args.get('cursor') else None
+        
+        columns = [getattr(HealthData, field) for field in fields]
+        query = db.session.query(*columns).filter(HealthData.user_id == user_id)
+        
+        if since:
+            query = query.filter(HealthData.timestamp >= since)
+        if until:
+            query = query.filter(HealthData.timestamp < until)
+        
+        if cursor:
+            # Row-value comparison lets SQLite seek straight to the cursor
+            query = query.filter(db.tuple_(HealthData.timestamp, HealthData.id) < cursor)
+        
+        rows = query.order_by(HealthData.timestamp.desc(), HealthData.id.desc()).limit(limit + 1).all()
+        rows = with_cold_readings(user_id, fields, [dict(zip(fields, row)) for row in rows],
+                                  limit, since, until, cursor)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    has_more = len(rows) > limit
+    rows = rows[:limit]
     data = [{
-        'id': h.id,
-        'heart_rate': h.heart_rate,
-        'blood_pressure': h.blood_pressure,
-        'oxygen_level': h.oxygen_level,
-        'temperature': h.temperature,
-        'glucose_level': h.glucose_level,
-        'sleep_hours': h.sleep_hours,
-        'activity_level': h.activity_level,
-        'medication_adherence': h.medication_adherence,
-        'pain_level': h.pain_level,
-        'mood': h.mood,
-        'notes': h.notes,
-        'timestamp': h.timestamp.isoformat(),
-        'alert_level': h.alert_level
-    } for h in health_data]
-    
-    return jsonify(data)
+        field: value.isoformat() if isinstance(value, datetime.datetime) else value
+        for field, value in row.items()
+    } for row in rows]
+    
+    return jsonify({
+        'data': data,
+        'has_more': has_more,
+        'next_cursor': encode_cursor(rows[-1]['timestamp'], rows[-1]['id']) if has_more else None
+    })
+
+def with_cold_readings(user_id, fields, rows, limit, since=None, until=None, before=None):
+    """
+    Merge a page of hot readings (dicts, newest first) with the user's
+    readings in the cold tier, which is only read if the page can reach it
+    """
+    newest_cold = cold_store.newest('health_data', user_id)
+    if newest_cold is None or (len(rows) > limit and rows[-1]['timestamp'] >= newest_cold):
+        return rows
+    cold = cold_store.scan('health_data', user_id, fields, since, until, before, limit + 1)
+    if cold is None:
+        return rows
+    hot_ids = {row['id'] for row in rows}
+    merged = rows + [row for row in cold.select(fields).to_pylist() if row['id'] not in hot_ids]
+    merged.sort(key=lambda row: (row['timestamp'], row['id']), reverse=True)
+    return merged[:limit + 1]
+
+@app.route('/api/health/<int:user_id>/history', methods=['GET'])
+def get_health_history(user_id):
+    """
+    A user's readings over a long range, from SQLite and the cold tier, as
+    one array per field, oldest first.
+    
+    Query parameters:
+    - fields: comma-separated columns (id and timestamp always are)
+    - since / until: ISO timestamps (default: the last 365 days)
+    """
+    try:
+        fields = parse_health_fields(request.args.get('fields'))
+        since, until = parse_history_range(request.args)
+        return history_response('health_data', shards.engine(shards.shard_of(user_id)), user_id,
+                                fields, since, until)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/devices/<device_id>/history', methods=['GET'])
+def get_device_history(device_id):
+    """
+    One device's rows of an imported dataset over a long range, from SQLite
+    and the cold tier, as one array per field, oldest first.
+    
+    Query parameters:
+    - dataset: device_health_data (default) or safety_data
+    - fields: comma-separated columns (default: all)
+    - since / until: ISO timestamps (default: the last 365 days)
+    """
+    dataset = request.args.get('dataset', 'device_health_data')
+    if dataset not in TIERED_TABLES or dataset == 'health_data':
+        return jsonify({'error': 'dataset must be device_health_data or safety_data'}), 400
+    try:
+        raw = db.engine.raw_connection()
+        try:
+            known = arrow_schema(raw.driver_connection, dataset).names
+        finally:
+            raw.close()
+        fields = [field.strip() for field in request.args.get('fields', '').split(',') if field.strip()] or known
+        unknown = [field for field in fields if field not in known]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        since, until = parse_history_range(request.args)
+        return history_response(dataset, db.engine, device_id, fields, since, until)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+MAX_HISTORY_ROWS = 500000
+
+def parse_history_range(args):
+    until = parse_query_timestamp(args['until']) if args.get('until') else datetime.datetime.utcnow()
+    since = parse_query_timestamp(args['since']) if args.get('since') else until - datetime.timedelta(days=365)
+    return since, until
+
+def history_response(table, engine, owner, fields, since, until):
+    """Columnar JSON of an owner's rows from both tiers"""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    
+    raw = engine.raw_connection()
+    try:
+        with stage('history_query'):
+            rows = tiered_history(raw.driver_connection, table, owner, fields, since, until, cold_store)
+    finally:
+        raw.close()
+    if rows.num_rows > MAX_HISTORY_ROWS:
+        return jsonify({'error': f'More than {MAX_HISTORY_ROWS} rows, narrow the range'}), 413
+    
+    columns = {}
+    for name in rows.column_names:
+        column = rows[name]
+        if pa.types.is_timestamp(column.type):
+            column = pc.strftime(column, format='%Y-%m-%dT%H:%M:%S')
+        columns[name] = column.to_pylist()
+    return jsonify({
+        'since': since.isoformat(),
+        'until': until.isoformat(),
+        'rows': rows.num_rows,
+        'columns': columns
+    })
+
+@app.route('/api/health/<int:user_id>/baseline', methods=['GET'])
+def get_health_baseline(user_id):
+    """The user's personal baseline per metric: running mean/stddev, EWMA and recent percentiles"""
+    try:
+        return jsonify({'user_id': user_id, 'metrics': baselines.summary(user_id)})
+    except Exception as e:
+        print(f"Error reading baseline: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/health/<int:user_id>/series', methods=['GET'])
+def get_health_series(user_id):
+    """
+    Chart series for one metric, served from the rollup table.
+
+    Query parameters:
+    - metric: one of ROLLUP_METRICS (required)
+    - resolution: 1m, 1h or 1d (default: finest that fits max_points)
+    - since / until: ISO timestamps (default: the last 24 hours)
+    - max_points: upper bound on returned buckets (default 500)
+    """
+    try:
+        metric = request.args.get('metric')
+        if metric not in ROLLUP_METRICS:
+            raise ValueError(f"metric must be one of: {', '.join(ROLLUP_METRICS)}")
+        
+        until = parse_query_timestamp(request.args['until']) if request.args.get('until') \
+            else datetime.datetime.utcnow()
+        since = parse_query_timestamp(request.args['since']) if request.args.get('since') \
+            else until - datetime.timedelta(days=1)
+        max_points = max(1, min(int(request.args.get('max_points', DEFAULT_MAX_POINTS)), 5000))
+        
+        resolution = request.args.get('resolution') or choose_resolution(since, until, max_points)
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"resolution must be one of: {', '.join(RESOLUTIONS)}")
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Newest buckets first so an oversized range keeps its most recent points
+    buckets = db.session.query(
+        HealthRollup.bucket_start, HealthRollup.count, HealthRollup.sum_value,
+        HealthRollup.min_value, HealthRollup.max_value, HealthRollup.last_value
+    ).filter(
+        HealthRollup.user_id == user_id,
+        HealthRollup.metric == metric,
+        HealthRollup.resolution == resolution,
+        HealthRollup.bucket_start >= bucket_start(since, RESOLUTIONS[resolution]),
+        HealthRollup.bucket_start < until
+    ).order_by(HealthRollup.bucket_start.desc()).limit(max_points).all()
+    
+    return jsonify({
+        'metric': metric,
+        'resolution': resolution,
+        'since': since.isoformat(),
+        'until': until.isoformat(),
+        'points': [{
+            'time': start.isoformat(),
+            'count': count,
+            'mean': total / count,
+            'min': minimum,
+            'max': maximum,
+            'last': last
+        } for start, count, total, minimum, maximum, last in reversed(buckets)]
+    })
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+HEALTH_FIELDS = (
+    'id', 'heart_rate', 'blood_pressure', 'oxygen_level', 'temperature',
+    'glucose_level', 'sleep_hours', 'activity_level', 'medication_adherence',
+    'pain_level', 'mood', 'notes', 'timestamp', 'alert_level', 'health_score'
+)
+
+def parse_health_fields(fields):
+    if not fields:
+        return list(HEALTH_FIELDS)
+    requested = [field.strip() for field in fields.split(',') if field.strip()]
+    unknown = [field for field in requested if field not in HEALTH_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    # The cursor needs id and timestamp
+    return ['id', 'timestamp'] + [field for field in requested if field not in ('id', 'timestamp')]
+
+def parse_query_timestamp(value):
+    timestamp = datetime.datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if timestamp.tzinfo:
+        timestamp = timestamp.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+def encode_cursor(timestamp, row_id):
+    return base64.urlsafe_b64encode(f"{timestamp.isoformat()}|{row_id}".encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        timestamp, row_id = base64.urlsafe_b64decode(padded).decode().split('|')
+        return datetime.datetime.fromisoformat(timestamp), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError('Invalid cursor')
+
+@app.route('/api/health/model', methods=['GET'])
+def health_model_status():
+    risk_model = risk_models.get().model
+    if risk_model is None:
+        return jsonify({'loaded': False})
+    return jsonify({
+        'loaded': True,
+        'version': risk_model.version,
+        'features': risk_model.features,
+        'metrics': risk_model.metadata.get('metrics'),
+        'batcher': risk_models.batcher.stats()
+    })
 
 @app.route('/api/reminders/<int:user_id>', methods=['GET', 'POST'])
 def handle_reminders(user_id):
     if request.method == 'GET':
-        reminders = Reminder.query.filter_by(user_id=user_id).order_by(Reminder.due_date).all()
+        with stage('reminder_query'):
+            reminders = Reminder.query.filter_by(user_id=user_id).order_by(Reminder.due_date).all()
         return jsonify([{
             'id': r.id,
             'title': r.title,
@@ -407,52 +889,270 @@ def handle_reminders(user_id):
             'reminder_type': r.reminder_type,
             'due_date': r.due_date.isoformat(),
             'completed': r.completed,
-            'priority': r.priority
+            'priority': r.priority,
+            'recurrence': r.recurrence,
+            'last_fired_at': r.last_fired_at.isoformat() if r.last_fired_at else None
         } for r in reminders])
     
     data = request.json
-    new_reminder = Reminder(
-        user_id=user_id,
-        title=data['title'],
-        description=data.get('description', ''),
-        reminder_type=data['reminder_type'],
-        due_date=datetime.datetime.fromisoformat(data['due_date']),
-        priority=data.get('priority', 'normal')
-    )
+    recurrence = data.get('recurrence') or None
+    if recurrence is not None and recurrence not in RECURRENCE_INTERVALS:
+        return jsonify({
+            'success': False,
+            'message': f"recurrence must be one of {', '.join(RECURRENCE_INTERVALS)}"
+        }), 400
+    due_date = datetime.datetime.fromisoformat(data['due_date'])
+    
+    def write(session):
+        new_reminder = Reminder(
+            user_id=user_id,
+            title=data['title'],
+            description=data.get('description', ''),
+            reminder_type=data['reminder_type'],
+            due_date=due_date,
+            priority=data.get('priority', 'normal'),
+            recurrence=recurrence
+        )
+        session.add(new_reminder)
+        session.flush()
+        return ScheduledReminder.from_row(new_reminder)
+    
+    scheduled = shards.writer(user_id).write(write)
+    reminder_scheduler.schedule(scheduled)
+    user_contexts.invalidate(user_id)
+    
+    return jsonify({'success': True, 'message': 'Reminder added successfully', 'id': scheduled.id})
+
+@app.route('/api/reminders/<int:user_id>/<int:reminder_id>/complete', methods=['POST'])
+def complete_reminder(user_id, reminder_id):
+    """Mark a reminder done; a recurring one moves on to its next occurrence"""
+    def write(session):
+        reminder = session.query(Reminder).filter_by(id=reminder_id, user_id=user_id).first()
+        if not reminder:
+            return None
+        if reminder.recurrence:
+            reminder.due_date = next_occurrence(reminder.due_date, reminder.recurrence,
+                                                max(datetime.datetime.now(), reminder.due_date))
+        else:
+            reminder.completed = True
+        return ScheduledReminder.from_row(reminder), reminder.completed
+    
+    result = shards.writer(user_id).write(write)
+    if result is None:
+        return jsonify({'success': False, 'message': 'Reminder not found'}), 404
+    scheduled, completed = result
     
-    db.session.add(new_reminder)
-    db.session.commit()
+    if completed:
+        reminder_scheduler.cancel(scheduled.key)
+    else:
+        reminder_scheduler.schedule(scheduled)
+    user_contexts.invalidate(user_id)
     
-    return jsonify({'success': True, 'message': 'Reminder added successfully'})
+    return jsonify({
+        'success': True,
+        'completed': completed,
+        'next_due': None if completed else scheduled.due.isoformat()
+    })
 
 @app.route('/api/safety', methods=['GET'])
 def get_safety():
     try:
-        conn = sqlite3.connect(DATABASE)
-        df = pd.read_sql_query("""
-            SELECT *
-            FROM safety_data 
-            ORDER BY timestamp DESC 
-            LIMIT 10
-        """, conn)
-        conn.close()
-        return jsonify(df.to_dict(orient='records'))
+        with db.engine.connect() as conn:
+            rows = conn.execute(text("""
+                SELECT *
+                FROM safety_data 
+                ORDER BY timestamp DESC 
+                LIMIT 10
+            """)).mappings().all()
+        return jsonify([dict(row) for row in rows])
     except Exception as e:
         print(f"Error fetching safety data: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+SAFETY_EVENT_COLUMNS = ('device_id', 'timestamp', 'movement_activity', 'fall_detected',
+                        'impact_force_level', 'inactivity_seconds', 'location',
+                        'alert_triggered', 'caregiver_notified')
+SAFETY_SWEEP_SECONDS = 60
+
+@app.route('/api/safety/events', methods=['POST'])
+def ingest_safety_events():
+    """
+    Ingest device safety events (JSON array, {"user_id": ..., "events": [...]}
+    or NDJSON). Events run through the per-device fall/inactivity processor,
+    are stored in safety_data, and any alerts they raise are saved and pushed
+    to caregivers.
+    """
+    try:
+        payload = request.get_json(silent=True) if request.mimetype == 'application/json' else None
+        default_user_id = payload.get('user_id') if isinstance(payload, dict) else None
+        raw_events, errors = parse_bulk_readings(request, key='events')
+        if len(raw_events) + len(errors) > MAX_BULK_READINGS:
+            return jsonify({
+                'success': False,
+                'message': f'Too many events, the limit is {MAX_BULK_READINGS} per request'
+            }), 413
+        
+        now = datetime.datetime.utcnow()
+        events = []
+        for index, raw_event in raw_events:
+            try:
+                events.append(parse_event(raw_event, default_user_id, now))
+            except (TypeError, ValueError) as e:
+                errors.append({'index': index, 'error': f'Invalid event: {str(e)}'})
+        
+        raised = safety_processor.process(events)
+        store_safety_events(events, raised)
+        
+        errors.sort(key=lambda error: error['index'])
+        return jsonify({
+            'success': True,
+            'processed': len(events),
+            'failed': len(errors),
+            'errors': errors,
+            'alerts': [{key: alert[key] for key in ('device_id', 'type', 'priority', 'message')}
+                       for alert in raised]
+        })
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error ingesting safety events: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': f'Failed to ingest safety events: {str(e)}'
+        }), 500
+
+@app.route('/api/safety/status', methods=['GET'])
+def safety_status():
+    device_id = request.args.get('device_id')
+    if device_id:
+        state = safety_processor.device(device_id)
+        if state is None:
+            return jsonify({'error': 'Unknown device'}), 404
+        return jsonify(state)
+    return jsonify(safety_processor.stats())
+
+def store_safety_events(events, raised):
+    """
+    Write events to safety_data (in shard 0) and their alerts to Alert, in
+    one transaction per shard
+    """
+    alerting = {(alert['device_id'], alert['event_timestamp']) for alert in raised}
+    rows = [{
+        'device_id': event['device_id'],
+        'timestamp': event['timestamp'].strftime('%Y-%m-%d %H:%M:%S'),
+        'movement_activity': event['movement_activity'],
+        'fall_detected': int(event['fall_detected']),
+        'impact_force_level': event['impact_force_level'],
+        'inactivity_seconds': event['inactivity_seconds'],
+        'location': event['location'],
+        'alert_triggered': int((event['device_id'], event['timestamp']) in alerting),
+        'caregiver_notified': 0
+    } for event in events]
+    
+    def write(shard, shard_alerts):
+        def job(session):
+            if rows and shard == 0:
+                session.execute(text(
+                    f"INSERT OR IGNORE INTO safety_data ({', '.join(SAFETY_EVENT_COLUMNS)}) "
+                    f"VALUES ({', '.join(':' + column for column in SAFETY_EVENT_COLUMNS)})"
+                ), rows)
+            new_alerts = [Alert(
+                user_id=alert['user_id'],
+                type=alert['type'],
+                message=f"{alert['message']} (device {alert['device_id']})",
+                priority=alert['priority'],
+                timestamp=datetime.datetime.now()
+            ) for alert in shard_alerts]
+            session.add_all(new_alerts)
+            session.flush()
+            return [serialize_alert(alert) for alert in new_alerts]
+        return job
+    
+    groups = shards.split(raised, lambda alert: alert['user_id'])
+    if rows:
+        groups.setdefault(0, [])
+    for events in shards.write_each(groups, write):
+        publish_alerts(events)
+
+def sweep_safety_devices():
+    """Raise inactivity alerts for devices that have gone quiet"""
+    while True:
+        time.sleep(SAFETY_SWEEP_SECONDS)
+        try:
+            raised = safety_processor.sweep()
+            if raised:
+                with app.app_context():
+                    store_safety_events([], raised)
+        except Exception as e:
+            print(f"Error sweeping safety devices: {str(e)}")
+
+threading.Thread(target=sweep_safety_devices, name='safety-sweeper', daemon=True).start()
+
+def run_cold_tiering(cutoff=None):
+    """
+    Move readings older than the cutoff (default: COLD_AFTER_DAYS ago) from
+    every shard, and the device exports from shard 0, to the cold tier, and
+    prune rollup buckets past their retention
+    """
+    summaries = []
+    for shard in range(shards.count):
+        raw = shards.engine(shard).raw_connection()
+        try:
+            for table in TIERED_TABLES if shard == 0 else ['health_data']:
+                summary = tier(raw.driver_connection, table, cold_store, cutoff)
+                if table == 'health_data':
+                    # Their latest readings may have been among the moved ones
+                    user_contexts.invalidate(*summary['owners'])
+                summaries.append(dict(summary, shard=shard, owners=len(summary['owners'])))
+            deleted = prune_rollups(raw.driver_connection, COLD_STORAGE_CONFIG['batch_rows'])
+            summaries.append({'table': 'health_rollup', 'shard': shard, 'rows_deleted': deleted})
+        finally:
+            raw.close()
+    return summaries
+
+def tier_cold_storage():
+    """Move old readings to the cold tier every COLD_TIER_INTERVAL seconds"""
+    while True:
+        time.sleep(COLD_STORAGE_CONFIG['interval'])
+        try:
+            with app.app_context():
+                summaries = run_cold_tiering()
+            for summary in summaries:
+                if summary.get('rows_moved'):
+                    print(f"Moved {summary['rows_moved']} rows of {summary['table']} on shard "
+                          f"{summary['shard']} to cold storage")
+                if sum(summary.get('rows_deleted', {}).values()):
+                    print(f"Pruned rollup buckets on shard {summary['shard']}: {summary['rows_deleted']}")
+        except Exception as e:
+            print(f"Error moving rows to cold storage: {str(e)}")
+
+if COLD_STORAGE_CONFIG['interval'] > 0:
+    threading.Thread(target=tier_cold_storage, name='cold-tiering', daemon=True).start()
+
+@app.route('/api/admin/cold-storage', methods=['POST'])
+def cold_storage_tier():
+    """Run the cold tiering job now; ?days= overrides COLD_AFTER_DAYS"""
+    try:
+        cutoff = None
+        if request.args.get('days'):
+            cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=float(request.args['days']))
+        return jsonify(run_cold_tiering(cutoff))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"Error moving rows to cold storage: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/reminders', methods=['GET'])
 def get_reminders():
     try:
-        conn = sqlite3.connect(DATABASE)
-        df = pd.read_sql_query("""
-            SELECT *
-            FROM reminders 
-            WHERE acknowledged = 'No'
-            ORDER BY scheduled_time ASC
-        """, conn)
-        conn.close()
-        return jsonify(df.to_dict(orient='records'))
+        with db.engine.connect() as conn:
+            rows = conn.execute(text("""
+                SELECT *
+                FROM reminders 
+                WHERE acknowledged = 0
+                ORDER BY scheduled_time ASC
+            """)).mappings().all()
+        return jsonify([dict(row) for row in rows])
     except Exception as e:
         print(f"Error fetching reminders: {str(e)}")
         return jsonify({"error": str(e)}), 500
@@ -464,26 +1164,22 @@ def chat():
         user_id = data.get('user_id')
         query = data.get('query')
         
-        # Get user data
-        user = User.query.get(user_id)
-        if not user:
+        context = build_chat_context(user_id)
+        if not context:
             return jsonify({'error': 'User not found'}), 404
+        user_data, health_data = context
         
-        # Get latest health data
-        health_data = HealthData.query.filter_by(user_id=user_id).order_by(HealthData.timestamp.desc()).first()
+        categories = emergency_matcher.categories(query)
+        if categories:
+            # Answered from the templates at once; the model's guidance follows as an alert
+            response = emergency_fast_path(user_id, query, categories)
+            elaborating = elaborate_emergency(user_id, user_data, query, health_data)
+            response['elaboration'] = 'pending' if elaborating else 'unavailable'
+            return jsonify(response)
         
-        # Prepare user data for AI
-        user_data = {
-            'name': user.name,
-            'age': user.age,
-            'medical_history': user.medical_history,
-            'medication_schedule': get_medication_schedule(user_id),
-            'daily_routines': get_daily_routines(user_id),
-            'mood_history': get_mood_history(user_id)
-        }
-        
-        # Generate AI response
-        response = ai_assistant.generate_response(user_data, query, health_data.__dict__ if health_data else None)
+        # Generate AI response on the bounded chat pool
+        future = chat_executor.submit(ai_assistant.generate_response, user_data, query, health_data)
+        response = future.result(timeout=CHAT_CONCURRENCY['request_timeout'])
         
         # Store any generated alerts
         for alert in response.get('alerts', []):
@@ -491,35 +1187,184 @@ def chat():
                 store_alert(user_id, alert)
         
         return jsonify(response)
+    except ChatQueueFull as e:
+        return chat_busy_response(e)
+    except FuturesTimeout:
+        return jsonify({'error': 'AI assistant timed out, please try again'}), 504
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/chat/status', methods=['GET'])
+def chat_status():
+    return jsonify({
+        'executor': chat_executor.stats(),
+        'response_cache': ai_assistant.cache.stats(),
+        'user_context_cache': user_contexts.stats(),
+        'sessions': ai_assistant.sessions.stats(),
+        'llm': llm_gateway.status()
+    })
+
+@app.route('/api/llm/status', methods=['GET'])
+def llm_status():
+    """Whether the assistant's model is reachable, from the gateway's last background probe"""
+    return jsonify(llm_gateway.status())
+
+@app.route('/api/chat/<int:user_id>/session', methods=['GET', 'DELETE'])
+def chat_session(user_id):
+    """The user's recent turns and health alerts, or start a new conversation"""
+    try:
+        if request.method == 'DELETE':
+            ai_assistant.sessions.clear(user_id)
+            return jsonify({'message': 'Conversation cleared'})
+        return jsonify(ai_assistant.sessions.get(user_id).summary())
+    except Exception as e:
+        print(f"Error handling chat session: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Request, stage, model and cache metrics in the Prometheus text format"""
+    if not metrics.registry.enabled:
+        return jsonify({'error': 'Metrics are disabled'}), 404
+    return Response(metrics.registry.render(), content_type=metrics.CONTENT_TYPE)
+
+def chat_busy_response(error):
+    response = jsonify({
+        'error': 'AI assistant is busy, please try again shortly',
+        'retry_after': error.retry_after
+    })
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, 429
+
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """
+    Streaming variant of /api/chat. Sends Server-Sent Events: a "meta" frame
+    with alerts, recommendations and next actions, then "token" frames as the
+    model generates, then "done" (or "error"). An emergency starts with an
+    "emergency" frame carrying the templated actions and the stored alert.
+    """
+    data = request.json
+    user_id = data.get('user_id')
+    query = data.get('query')
+    
+    context = build_chat_context(user_id)
+    if not context:
+        return jsonify({'error': 'User not found'}), 404
+    user_data, health_data = context
+    
+    # An emergency gets its templated answer first and is never turned away;
+    # the model's guidance streams after it if a slot is free
+    categories = emergency_matcher.categories(query)
+    emergency = emergency_fast_path(user_id, query, categories) if categories else None
+    try:
+        reservation = chat_executor.reserve()
+    except ChatQueueFull as e:
+        if emergency is None:
+            return chat_busy_response(e)
+        reservation = None
+    
+    def event_stream():
+        if emergency is not None:
+            yield f"event: emergency\ndata: {json.dumps(emergency)}\n\n"
+            if reservation is None:
+                yield f"event: done\ndata: {json.dumps({'cached': False, 'elaboration': 'unavailable'})}\n\n"
+                return
+        with reservation:
+            for event, payload in ai_assistant.stream_response(user_data, query, health_data):
+                if event == 'meta':
+                    for alert in payload['alerts']:
+                        if alert['priority'] in ['high', 'critical']:
+                            store_alert(user_id, alert)
+                yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+    
+    response = Response(
+        stream_with_context(event_stream()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    # Client may disconnect before the stream starts
+    if reservation is not None:
+        response.call_on_close(reservation.cancel)
+    return response
+
+def build_chat_context(user_id):
+    """Collect the user profile and latest health data the assistant needs"""
+    context = user_contexts.get(user_id, load_user_context)
+    if not context:
+        return None
+    
+    # Prepare user data for AI
+    user_data = {
+        **context['profile'],
+        'user_id': user_id,
+        'medication_schedule': context['medications'],
+        'daily_routines': context['routines'],
+        'mood_history': context['mood_history']
+    }
+    return user_data, context['health_data']
+
+def load_user_context(user_id):
+    """
+    Build a user's assistant context: the profile, one indexed query for all
+    open reminders (partitioned by type in memory) and one for recent readings
+    """
+    with shards.use_user(user_id):
+        return user_context_from_shard(user_id)
+
+def user_context_from_shard(user_id):
+    user = db.session.get(User, user_id)
+    if not user:
+        return None
+    
+    with stage('reminder_query'):
+        reminders = partition_reminders(
+            Reminder.query.filter_by(user_id=user_id, completed=False).order_by(Reminder.due_date).all()
+        )
+    recent = HealthData.query.filter_by(user_id=user_id).order_by(
+        HealthData.timestamp.desc(), HealthData.id.desc()).limit(MOOD_HISTORY_LENGTH).all()
+    latest = recent[0] if recent else None
+    
+    return {
+        'profile': {
+            'name': user.name,
+            'age': user.age,
+            'medical_history': user.medical_history
+        },
+        'health_data': {column.name: getattr(latest, column.name)
+                        for column in HealthData.__table__.columns} if latest else None,
+        'medications': format_medications(reminders.get('medication', [])),
+        'routines': format_routines(reminders.get('routine', [])),
+        'appointments': format_appointments(reminders.get('appointment', [])),
+        'exercises': format_routines(reminders.get('exercise', [])),
+        'mood_history': format_mood_history(recent)
+    }
+
 @app.route('/api/daily-schedule', methods=['GET'])
 def get_daily_schedule():
     try:
         user_id = request.args.get('user_id')
-        current_time = datetime.datetime.now()
+        context = user_contexts.get(user_id, load_user_context)
+        if not context:
+            return jsonify({'error': 'User not found'}), 404
         
         # Get user's schedule
         schedule = {
-            'medications': get_medication_schedule(user_id),
-            'routines': get_daily_routines(user_id),
-            'appointments': get_appointments(user_id),
-            'exercises': get_exercise_schedule(user_id)
+            'medications': context['medications'],
+            'routines': context['routines'],
+            'appointments': context['appointments'],
+            'exercises': context['exercises']
         }
         
         # Get AI recommendations
-        user = User.query.get(user_id)
-        health_data = HealthData.query.filter_by(user_id=user_id).order_by(HealthData.timestamp.desc()).first()
-        
+        health_data = context['health_data']
         user_data = {
-            'name': user.name,
-            'age': user.age,
-            'medical_history': user.medical_history,
+            **context['profile'],
+            'user_id': user_id,
             'medication_schedule': schedule['medications']
         }
         
-        ai_insights = ai_assistant._generate_recommendations(user_data, health_data.__dict__ if health_data else None)
+        ai_insights = ai_assistant._generate_recommendations(user_data, health_data)
         
         return jsonify({
             'schedule': schedule,
@@ -529,120 +1374,261 @@ def get_daily_schedule():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-def get_medication_schedule(user_id):
-    # Get medication schedule from reminders
-    medications = Reminder.query.filter_by(
-        user_id=user_id,
-        reminder_type='medication',
-        completed=False
-    ).all()
-    
-    return [{
-        'name': med.title,
-        'description': med.description,
-        'next_dose': med.due_date.isoformat(),
-        'priority': med.priority
-    } for med in medications]
-
-def get_daily_routines(user_id):
-    # Get daily routines from reminders
-    routines = Reminder.query.filter_by(
-        user_id=user_id,
-        reminder_type='routine',
-        completed=False
-    ).all()
-    
-    return [{
-        'activity': routine.title,
-        'time': routine.due_date.strftime('%H:%M'),
-        'description': routine.description,
-        'completed': routine.completed
-    } for routine in routines]
-
-def get_mood_history(user_id):
-    # Get mood history from health data
-    moods = HealthData.query.filter_by(user_id=user_id).order_by(HealthData.timestamp.desc()).limit(7).all()
-    
-    return [{
-        'mood': entry.mood,
-        'timestamp': entry.timestamp.isoformat(),
-        'notes': entry.notes
-    } for entry in moods]
-
-def get_appointments(user_id):
-    # Get upcoming appointments
-    appointments = Reminder.query.filter_by(
-        user_id=user_id,
-        reminder_type='appointment',
-        completed=False
-    ).all()
-    
-    return [{
-        'title': apt.title,
-        'datetime': apt.due_date.isoformat(),
-        'description': apt.description,
-        'priority': apt.priority
-    } for apt in appointments]
-
-def get_exercise_schedule(user_id):
-    # Get exercise schedule
-    exercises = Reminder.query.filter_by(
-        user_id=user_id,
-        reminder_type='exercise',
-        completed=False
-    ).all()
-    
-    return [{
-        'activity': ex.title,
-        'time': ex.due_date.strftime('%H:%M'),
-        'description': ex.description,
-        'completed': ex.completed
-    } for ex in exercises]
-
 def store_alert(user_id, alert):
     # Store important alerts in the database
-    new_alert = Alert(
+    def write(session):
+        new_alert = Alert(
+            user_id=user_id,
+            type=alert['type'],
+            message=alert['message'],
+            priority=alert['priority'],
+            timestamp=datetime.datetime.now()
+        )
+        session.add(new_alert)
+        session.flush()
+        return serialize_alert(new_alert)
+    
+    event = shards.writer(user_id).write(write)
+    publish_alerts([event])
+    return event
+
+def emergency_fast_path(user_id, query, categories):
+    """
+    Answer an emergency from the action templates and raise its critical
+    alert straight away, without waiting on the model
+    """
+    with stage('emergency'):
+        text, actions = emergency_response(categories)
+        alert = store_alert(user_id, {
+            'type': 'emergency',
+            'message': f"Emergency reported ({', '.join(categories)}): {query[:200]}",
+            'priority': 'critical'
+        })
+    return {
+        'response': text,
+        'emergency': True,
+        'categories': categories,
+        'actions': actions,
+        'alerts': [alert]
+    }
+
+def elaborate_emergency(user_id, user_data, query, health_data):
+    """
+    Queue the model's fuller guidance for an emergency. It is stored as an
+    emergency_guidance alert, which reaches the user's alert stream. Returns
+    False if the chat pool is saturated.
+    """
+    def publish(future):
+        result = future.result()
+        if not result.get('response'):
+            print(f"Emergency guidance failed: {result.get('error')}")
+            return
+        try:
+            with app.app_context():
+                store_alert(user_id, {'type': 'emergency_guidance', 'message': result['response'],
+                                      'priority': 'critical'})
+                for alert in result.get('alerts', []):
+                    if alert['priority'] in ['high', 'critical']:
+                        store_alert(user_id, alert)
+        except Exception as e:
+            print(f"Error storing emergency guidance: {str(e)}")
+
+    try:
+        future = chat_executor.submit(ai_assistant.generate_response, user_data, query, health_data)
+    except ChatQueueFull:
+        return False
+    future.add_done_callback(publish)
+    return True
+
+def health_alert(user_id, analysis):
+    """Alert row for a reading whose analysis came back as danger"""
+    return Alert(
         user_id=user_id,
-        type=alert['type'],
-        message=alert['message'],
-        priority=alert['priority'],
+        type='health',
+        message='; '.join(analysis['alerts']),
+        priority='critical',
         timestamp=datetime.datetime.now()
     )
-    db.session.add(new_alert)
-    db.session.commit()
+
+def serialize_alert(alert):
+    return {
+        'id': alert.id,
+        'user_id': alert.user_id,
+        'type': alert.type,
+        'message': alert.message,
+        'priority': alert.priority,
+        'timestamp': alert.timestamp.isoformat(),
+        'acknowledged': alert.acknowledged
+    }
+
+def publish_alerts(events):
+    """Push serialized, committed alerts to subscribed caregiver sessions"""
+    for event in events:
+        alert_broker.publish(event['user_id'], event)
+
+@app.route('/api/alerts/stream/<int:user_id>', methods=['GET'])
+def stream_alerts(user_id):
+    """
+    Server-Sent Events feed of a user's alerts. Reconnecting clients send
+    Last-Event-ID (or ?last_event_id=) and get the alerts they missed first;
+    without one, the most recent REPLAY_LIMIT alerts are replayed.
+    """
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        return jsonify({'error': 'Invalid Last-Event-ID'}), 400
+    
+    # Subscribe before reading the backlog so nothing falls in between
+    subscription = alert_broker.subscribe([user_id])
+    
+    def event_stream():
+        try:
+            query = Alert.query.filter(Alert.user_id == user_id)
+            if last_event_id is not None:
+                backlog = query.filter(Alert.id > last_event_id).order_by(Alert.id).limit(REPLAY_LIMIT).all()
+            else:
+                backlog = list(reversed(query.order_by(Alert.id.desc()).limit(REPLAY_LIMIT).all()))
+            
+            last_sent = last_event_id or 0
+            for alert in backlog:
+                last_sent = alert.id
+                yield format_sse(serialize_alert(alert))
+            db.session.remove()
+            
+            yield "retry: 3000\n\n"
+            while not subscription.closed:
+                event = subscription.get()
+                if event is None:
+                    yield ": keepalive\n\n"
+                elif event['id'] > last_sent:
+                    last_sent = event['id']
+                    yield format_sse(event)
+        finally:
+            alert_broker.unsubscribe(subscription)
+    
+    return Response(
+        stream_with_context(event_stream()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+REPLAY_LIMIT = 100
+
+@app.route('/api/admin/alerts', methods=['GET'])
+def admin_alerts():
+    """
+    Newest alerts over every resident, for the facility overview. Each shard
+    is queried in parallel and the results merged.
+
+    Query parameters:
+    - limit: how many to return (default 50, max 500)
+    - priority: only alerts of this priority
+    - unacknowledged: 1 for only alerts nobody has acknowledged
+    """
+    try:
+        limit = max(1, min(int(request.args.get('limit', 50)), 500))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    priority = request.args.get('priority')
+    unacknowledged = request.args.get('unacknowledged') == '1'
+
+    def newest(session):
+        query = session.query(Alert)
+        if priority:
+            query = query.filter(Alert.priority == priority)
+        if unacknowledged:
+            query = query.filter(Alert.acknowledged.isnot(True))
+        return [serialize_alert(alert) for alert in
+                query.order_by(Alert.timestamp.desc(), Alert.id.desc()).limit(limit).all()]
+
+    try:
+        pages = shards.fan_out(newest)
+    except Exception as e:
+        print(f"Error fetching alerts: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+    # Alert ids are per shard, so the shard goes along with each one
+    alerts = sorted((dict(alert, shard=shard) for shard, page in pages for alert in page),
+                    key=lambda alert: alert['timestamp'], reverse=True)
+    return jsonify({'alerts': alerts[:limit], 'shards': shards.count})
+
+@app.route('/api/admin/shards', methods=['GET'])
+def shard_status():
+    """Residents, readings and alerts held by each shard, with its writer's counters"""
+    def counts(session):
+        return {
+            'users': session.query(db.func.count(User.id)).scalar(),
+            'readings': session.query(db.func.count(HealthData.id)).scalar(),
+            'alerts': session.query(db.func.count(Alert.id)).scalar()
+        }
+
+    try:
+        totals = shards.fan_out(counts)
+    except Exception as e:
+        print(f"Error counting shard rows: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+    writers = shards.stats()
+    return jsonify([{
+        'shard': shard,
+        'database': shards.engine(shard).url.render_as_string(hide_password=True),
+        **rows,
+        'writer': writers[shard]
+    } for shard, rows in totals])
 
 @app.route('/api/load-data', methods=['POST'])
 def load_datasets():
+    """
+    Stream the CSV exports in DATA_DIR (data/) into SQLite, adding only new rows.
+    Pass ?stream=1 to receive NDJSON progress lines while it runs, and
+    ?force=1 to re-scan files that haven't changed since the last load.
+    """
+    from data_loader import DATA_DIR, load_all
+    
+    force = request.args.get('force') == '1'
+    
+    def log_progress(summary):
+        if summary['skipped']:
+            print(f"{summary['file']} unchanged since last load, skipping")
+        else:
+            print(f"Loaded {summary['rows_read']} rows from {summary['file']} "
+                  f"({summary['rows_inserted']} new)")
+    
+    if request.args.get('stream') == '1':
+        def progress_stream():
+            updates = []
+            raw = db.engine.raw_connection()
+            try:
+                def report(summary):
+                    log_progress(summary)
+                    updates.append(dict(summary))
+                for _ in load_all(raw.driver_connection, DATA_DIR, progress=report, force=force):
+                    while updates:
+                        yield json.dumps(updates.pop(0)) + '\n'
+                yield json.dumps({'done': True}) + '\n'
+            except Exception as e:
+                print(f"Error loading data: {str(e)}")
+                yield json.dumps({'error': str(e)}) + '\n'
+            finally:
+                raw.close()
+        return Response(stream_with_context(progress_stream()), mimetype='application/x-ndjson')
+    
     try:
         print("Starting data load process...")
-        
-        # Load and transform health data
-        health_file = os.path.join('data', 'health_monitoring.csv')
-        print(f"Loading health data from {health_file}")
-        health = pd.read_csv(health_file)
-        
-        # Load safety data
-        safety_file = os.path.join('data', 'safety_monitoring.csv')
-        print(f"Loading safety data from {safety_file}")
-        safety = pd.read_csv(safety_file)
-        
-        # Load reminders data
-        reminder_file = os.path.join('data', 'daily_reminder.csv')
-        print(f"Loading reminder data from {reminder_file}")
-        reminder = pd.read_csv(reminder_file)
-        
-        # Save to SQLite
-        conn = sqlite3.connect(DATABASE)
-        health.to_sql("health_data", conn, if_exists="replace", index=False)
-        safety.to_sql("safety_data", conn, if_exists="replace", index=False)
-        reminder.to_sql("reminders", conn, if_exists="replace", index=False)
-        conn.close()
+        raw = db.engine.raw_connection()
+        try:
+            summaries = {summary['table']: summary for summary in
+                         load_all(raw.driver_connection, DATA_DIR, progress=log_progress, force=force)}
+        finally:
+            raw.close()
         
         return jsonify({
             "message": "Data loaded successfully",
-            "health_records": len(health),
-            "safety_records": len(safety),
-            "reminder_records": len(reminder)
+            "health_records": summaries['device_health_data']['rows_inserted'],
+            "safety_records": summaries['safety_data']['rows_inserted'],
+            "reminder_records": summaries['reminders']['rows_inserted'],
+            "details": summaries
         })
     except Exception as e:
         print(f"Error loading data: {str(e)}")
@@ -651,6 +1637,20 @@ def load_datasets():
             "details": "Check server logs for more information"
         }), 500
 
+# Started last: catching up on reminders missed while down fires right away
+reminder_scheduler.start()
+risk_models.preload()
+llm_gateway.start()
+
+def warm_up_ollama():
+    # Load the model up front so the first chat doesn't pay for it
+    try:
+        llm_gateway.warm_up()
+    except Exception as e:
+        print(f"Ollama warm-up failed: {str(e)}")
+
 if __name__ == '__main__':
+    threading.Thread(target=warm_up_ollama, name='ollama-warm-up', daemon=True).start()
+
     print("Server starting on http://localhost:5000")
     app.run(debug=True, port=5000) 
\ No newline at end of file
@@ -0,0 +1,221 @@
+"""
+Per-user personal baselines for each health metric.
+
+Every ingested reading updates, in O(1), a running mean and variance
+(Welford), an exponentially weighted moving average and a fixed window of
+recent values kept sorted for percentiles. Readings are compared with the
+baseline as it stood before them, so analysis can flag what is unusual for
+this resident without querying their history. The state is persisted as one
+small row per user and metric.
+"""
+import bisect
+import collections
+import math
+import threading
+from array import array
+
+from sqlalchemy.dialects.sqlite import insert
+
+BASELINE_METRICS = (
+    'heart_rate', 'oxygen_level', 'temperature', 'glucose_level',
+    'sleep_hours', 'pain_level', 'mood'
+)
+
+WINDOW_SIZE = 50
+EWMA_ALPHA = 0.1
+MIN_SAMPLES = 20
+DEVIATION_Z = 3.0
+MAX_CACHED_USERS = 10000
+
+# Floor for the standard deviation used in z-scores, so a resident whose
+# readings barely vary isn't flagged for ordinary measurement noise
+MIN_STDDEV = {
+    'heart_rate': 3.0,
+    'oxygen_level': 1.0,
+    'temperature': 0.3,
+    'glucose_level': 5.0,
+    'sleep_hours': 0.5,
+    'pain_level': 1.0,
+    'mood': 1.0
+}
+
+METRIC_LABELS = {
+    'heart_rate': ('Heart rate', ' BPM'),
+    'oxygen_level': ('Oxygen level', '%'),
+    'temperature': ('Temperature', '°F'),
+    'glucose_level': ('Glucose level', ' mg/dL'),
+    'sleep_hours': ('Sleep duration', ' hours'),
+    'pain_level': ('Pain level', '/10'),
+    'mood': ('Mood', '/5')
+}
+
+
+class MetricStats:
+    __slots__ = ('count', 'mean', 'm2', 'ewma', 'window', 'ordered')
+
+    def __init__(self, count=0, mean=0.0, m2=0.0, ewma=None, window=()):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+        self.ewma = ewma
+        self.window = collections.deque(window, maxlen=WINDOW_SIZE)
+        self.ordered = sorted(self.window)
+
+    def update(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.ewma = value if self.ewma is None else EWMA_ALPHA * value + (1 - EWMA_ALPHA) * self.ewma
+
+        if len(self.window) == WINDOW_SIZE:
+            del self.ordered[bisect.bisect_left(self.ordered, self.window[0])]
+        self.window.append(value)
+        bisect.insort(self.ordered, value)
+
+    @property
+    def stddev(self):
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    def percentile(self, p):
+        """Linearly interpolated percentile of the recent window"""
+        if not self.ordered:
+            return None
+        position = (len(self.ordered) - 1) * p / 100
+        lower = int(position)
+        upper = min(lower + 1, len(self.ordered) - 1)
+        return self.ordered[lower] + (self.ordered[upper] - self.ordered[lower]) * (position - lower)
+
+    def deviation(self, metric, value):
+        """z-score of value against this baseline, or None while it's still forming"""
+        if self.count < MIN_SAMPLES:
+            return None
+        return (value - self.mean) / max(self.stddev, MIN_STDDEV[metric])
+
+    def to_row(self):
+        return {
+            'count': self.count,
+            'mean': self.mean,
+            'm2': self.m2,
+            'ewma': self.ewma,
+            'window': array('f', self.window).tobytes()
+        }
+
+    @classmethod
+    def from_row(cls, row):
+        window = array('f')
+        window.frombytes(row['window'] or b'')
+        return cls(row['count'], row['mean'], row['m2'], row['ewma'], window)
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean': round(self.mean, 2),
+            'stddev': round(self.stddev, 2),
+            'ewma': round(self.ewma, 2) if self.ewma is not None else None,
+            'p5': self.percentile(5),
+            'p50': self.percentile(50),
+            'p95': self.percentile(95)
+        }
+
+
+def deviation_alert(metric, value, stats):
+    label, unit = METRIC_LABELS[metric]
+    return (f"BASELINE: {label} of {value:g}{unit} is unusual for this resident "
+            f"(usually {stats.mean:.1f} ± {max(stats.stddev, MIN_STDDEV[metric]):.1f}{unit})")
+
+
+class BaselineStore:
+    """
+    In-memory baselines for recently active users, backed by the persisted
+    rows. load(user_id) returns a user's stored rows and is only called the
+    first time the user is seen.
+    """
+
+    def __init__(self, load, max_users=MAX_CACHED_USERS):
+        self.load = load
+        self.max_users = max_users
+        self._users = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def _user(self, user_id):
+        stats = self._users.get(user_id)
+        if stats is None:
+            stats = {row['metric']: MetricStats.from_row(row) for row in self.load(user_id)}
+            self._users[user_id] = stats
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        else:
+            self._users.move_to_end(user_id)
+        return stats
+
+    def observe(self, readings):
+        """
+        Check each reading against its user's baseline, then fold it in.
+        Returns (deviation alerts per reading, rows to persist).
+        """
+        deviations = []
+        touched = set()
+        with self._lock:
+            for reading in readings:
+                user_id = int(reading['user_id'])
+                stats = self._user(user_id)
+                alerts = []
+                for metric in BASELINE_METRICS:
+                    try:
+                        value = float(reading[metric])
+                    except (KeyError, TypeError, ValueError):
+                        continue
+                    if math.isnan(value):
+                        continue
+                    metric_stats = stats.get(metric)
+                    if metric_stats is None:
+                        metric_stats = stats[metric] = MetricStats()
+                    z = metric_stats.deviation(metric, value)
+                    if z is not None and abs(z) > DEVIATION_Z:
+                        alerts.append(deviation_alert(metric, value, metric_stats))
+                    metric_stats.update(value)
+                    touched.add((user_id, metric))
+                deviations.append(alerts)
+
+            rows = [{'user_id': user_id, 'metric': metric, **self._users[user_id][metric].to_row()}
+                    for user_id, metric in touched if user_id in self._users]
+        return deviations, rows
+
+    def summary(self, user_id):
+        with self._lock:
+            return {metric: stats.summary() for metric, stats in self._user(int(user_id)).items()}
+
+    def invalidate(self, *user_ids):
+        """Drop cached baselines so they are reloaded from the stored rows"""
+        with self._lock:
+            for user_id in user_ids:
+                self._users.pop(int(user_id), None)
+
+
+def apply_deviations(analysis, alerts):
+    """Add baseline alerts to an analysis dict, raising a normal level to warning"""
+    if alerts and analysis['alert_level'] != 'error':
+        analysis['alerts'] = analysis['alerts'] + alerts
+        if analysis['alert_level'] == 'normal':
+            analysis['alert_level'] = 'warning'
+    return analysis
+
+
+def save_baselines(session, model, rows):
+    """
+    Upsert baseline rows inside the caller's transaction. Rows are snapshots
+    taken when readings were observed, and concurrent ingests may commit
+    them out of order, so a row only replaces one with no more samples.
+    """
+    if not rows:
+        return 0
+    table = model.__table__
+    statement = insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=['user_id', 'metric'],
+        set_={column: statement.excluded[column] for column in ('count', 'mean', 'm2', 'ewma', 'window')},
+        where=table.c.count <= statement.excluded.count
+    )
+    session.execute(statement, rows)
+    return len(rows)
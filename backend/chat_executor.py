@@ -0,0 +1,142 @@
+"""
+Bounded execution layer for LLM calls.
+
+Each model gets its own small thread pool (its concurrency limit) and an
+admission counter. When a model's slots and waiting queue are both full,
+new requests are rejected straight away with ChatQueueFull so the caller
+can answer HTTP 429 instead of tying up a worker.
+"""
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ai_config import CHAT_CONCURRENCY, OLLAMA_CONFIG
+
+
+class ChatQueueFull(Exception):
+    """Raised when a model's admission queue is full"""
+
+    def __init__(self, model, retry_after):
+        super().__init__(f"Chat queue for {model} is full, retry in {retry_after}s")
+        self.model = model
+        self.retry_after = retry_after
+
+
+class _ModelLane:
+    def __init__(self, model, max_concurrent, max_queue):
+        self.model = model
+        self.max_concurrent = max_concurrent
+        self.capacity = max_concurrent + max_queue
+        self.pool = ThreadPoolExecutor(max_workers=max_concurrent,
+                                       thread_name_prefix=f"chat-{model}")
+        self.slots = threading.BoundedSemaphore(max_concurrent)
+        self.lock = threading.Lock()
+        self.admitted = 0
+        self.rejected = 0
+        # Moving average of how long one generation holds a slot
+        self.avg_service_time = 5.0
+
+    def admit(self):
+        with self.lock:
+            if self.admitted >= self.capacity:
+                self.rejected += 1
+                raise ChatQueueFull(self.model, self.retry_after())
+            self.admitted += 1
+
+    def release(self, service_time=None):
+        with self.lock:
+            self.admitted -= 1
+            if service_time is not None:
+                self.avg_service_time = 0.8 * self.avg_service_time + 0.2 * service_time
+
+    def retry_after(self):
+        # Time for the current backlog to drain through the available slots
+        waves = self.admitted / self.max_concurrent
+        return max(1, math.ceil(waves * self.avg_service_time))
+
+
+class _Reservation:
+    def __init__(self, lane):
+        self.lane = lane
+        self.state = "admitted"
+        self.start = None
+
+    def __enter__(self):
+        self.lane.slots.acquire()
+        self.state = "running"
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.lane.slots.release()
+        self.state = "done"
+        self.lane.release(time.perf_counter() - self.start)
+        return False
+
+    def cancel(self):
+        """Give back the admission if the slot was never used"""
+        if self.state == "admitted":
+            self.state = "done"
+            self.lane.release()
+
+
+class ChatExecutor:
+    def __init__(self, max_concurrent=None, max_queue=None):
+        self.max_concurrent = max_concurrent or CHAT_CONCURRENCY["max_concurrent"]
+        self.max_queue = max_queue if max_queue is not None else CHAT_CONCURRENCY["max_queue"]
+        self._lanes = {}
+        self._lock = threading.Lock()
+
+    def _lane(self, model):
+        model = model or OLLAMA_CONFIG["model"]
+        with self._lock:
+            if model not in self._lanes:
+                self._lanes[model] = _ModelLane(model, self.max_concurrent, self.max_queue)
+            return self._lanes[model]
+
+    def submit(self, fn, *args, model=None, **kwargs):
+        """
+        Run fn(*args, **kwargs) on the model's pool and return a Future.
+        Raises ChatQueueFull if the model is saturated.
+        """
+        lane = self._lane(model)
+        lane.admit()
+
+        def run():
+            with lane.slots:
+                start = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    lane.release(time.perf_counter() - start)
+
+        try:
+            return lane.pool.submit(run)
+        except Exception:
+            lane.release()
+            raise
+
+    def reserve(self, model=None):
+        """
+        Admit a request now and return a reservation whose `with` block
+        holds a generation slot. Used for streaming responses, which run in
+        the request thread rather than on the pool. Raises ChatQueueFull if
+        the model is saturated.
+        """
+        lane = self._lane(model)
+        lane.admit()
+        return _Reservation(lane)
+
+    def stats(self):
+        with self._lock:
+            lanes = list(self._lanes.values())
+        return {
+            lane.model: {
+                "admitted": lane.admitted,
+                "rejected": lane.rejected,
+                "max_concurrent": lane.max_concurrent,
+                "capacity": lane.capacity,
+                "avg_service_time": round(lane.avg_service_time, 3)
+            } for lane in lanes
+        }
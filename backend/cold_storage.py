@@ -0,0 +1,296 @@
+"""
+Cold tier: old readings moved out of SQLite into Parquet.
+
+tier() moves a table's rows older than COLD_STORAGE_CONFIG["after_days"]
+into Parquet files partitioned by owner (user or device) and month:
+
+    <root>/<table>/<owner column>=<owner>/month=YYYY-MM/part-<first id>-<last id>.parquet
+
+It then deletes them from SQLite, so the databases keep only recent rows.
+ColdStore.scan reads one owner's months in the requested range and skips the
+rest. It reads only the requested columns and memory-maps the files.
+history() returns the hot and the cold rows as one Arrow table. Baselines
+and daily rollups stay in SQLite, so deviation checks and long-range charts
+still cover the whole history; finer rollups are pruned by age alongside
+tiering (rollups.prune_rollups).
+
+pyarrow is imported on first use, so the tier costs nothing at startup.
+"""
+import datetime
+import os
+from urllib.parse import quote
+
+from ai_config import COLD_STORAGE_CONFIG
+
+# Table -> the column that owns its rows; partitions are per owner and month
+TIERED_TABLES = {
+    'health_data': 'user_id',
+    'device_health_data': 'device_id',
+    'safety_data': 'device_id'
+}
+SQLITE_TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def tier_cutoff(conn, table):
+    """The cutoff a table's rows have been moved to the cold tier before, or None"""
+    row = conn.execute('SELECT cutoff FROM cold_tier_state WHERE table_name = ?', (table,)).fetchone()
+    return row[0] if row else None
+
+
+def arrow_schema(conn, table):
+    """Arrow types for a table's columns, from their declared SQLite types"""
+    import pyarrow as pa
+
+    fields = []
+    for _, name, declared, *_ in conn.execute(f'PRAGMA table_info("{table}")'):
+        declared = (declared or '').upper()
+        if name == 'timestamp' or declared.startswith('DATETIME'):
+            kind = pa.timestamp('us')
+        elif declared.startswith('BOOL'):
+            kind = pa.bool_()
+        elif 'INT' in declared:
+            kind = pa.int64()
+        elif declared.startswith(('REAL', 'FLOAT', 'DOUBLE', 'NUMERIC')):
+            kind = pa.float64()
+        elif 'BLOB' in declared:
+            kind = pa.binary()
+        else:
+            kind = pa.string()
+        fields.append(pa.field(name, kind))
+    return pa.schema(fields)
+
+
+def to_arrow(rows, schema):
+    """Arrow table from sqlite3 row tuples in the schema's column order"""
+    import pyarrow as pa
+
+    columns = list(zip(*rows)) if rows else [()] * len(schema)
+    arrays = []
+    for field, values in zip(schema, columns):
+        if pa.types.is_timestamp(field.type):
+            # SQLite keeps them as text, with or without microseconds
+            arrays.append(pa.array(values, pa.string()).cast(field.type))
+        elif pa.types.is_boolean(field.type):
+            arrays.append(pa.array(values, pa.int64()).cast(field.type))
+        else:
+            arrays.append(pa.array(values, field.type))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def _month_start(month):
+    return datetime.datetime.strptime(month, '%Y-%m')
+
+
+def _next_month(start):
+    return start.replace(year=start.year + start.month // 12, month=start.month % 12 + 1)
+
+
+class ColdStore:
+    def __init__(self, root=None):
+        self.root = root or COLD_STORAGE_CONFIG["root"]
+
+    def _owner_dir(self, table, owner):
+        return os.path.join(self.root, table, f'{TIERED_TABLES[table]}={quote(str(owner), safe="")}')
+
+    def _files(self, table, owner, month):
+        directory = os.path.join(self._owner_dir(table, owner), f'month={month}')
+        try:
+            names = os.listdir(directory)
+        except FileNotFoundError:
+            return []
+        return sorted(os.path.join(directory, name) for name in names if name.endswith('.parquet'))
+
+    def months(self, table, owner):
+        """The owner's months in the cold tier, oldest first, as YYYY-MM"""
+        try:
+            entries = os.listdir(self._owner_dir(table, owner))
+        except FileNotFoundError:
+            return []
+        return sorted(entry[len('month='):] for entry in entries if entry.startswith('month='))
+
+    def newest(self, table, owner):
+        """A time every cold row of the owner is older than, or None if there are none"""
+        months = self.months(table, owner)
+        return _next_month(_month_start(months[-1])) if months else None
+
+    def _dataset(self, files):
+        import pyarrow.dataset as ds
+        from pyarrow import fs
+
+        return ds.dataset(files, format='parquet', filesystem=fs.LocalFileSystem(use_mmap=True))
+
+    def write(self, table, owner, month, rows):
+        """Add an Arrow table of rows to a partition, skipping ids it already has; returns rows written"""
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+
+        files = self._files(table, owner, month)
+        if files:
+            # A run that stopped between writing and deleting moves the same rows again
+            existing = self._dataset(files).to_table(columns=['id'])['id']
+            rows = rows.filter(pc.invert(pc.is_in(rows['id'], value_set=existing)))
+        if not rows.num_rows:
+            return 0
+        directory = os.path.join(self._owner_dir(table, owner), f'month={month}')
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"part-{pc.min(rows['id'])}-{pc.max(rows['id'])}.parquet")
+        pq.write_table(rows, path + '.tmp', compression=COLD_STORAGE_CONFIG["compression"])
+        os.replace(path + '.tmp', path)
+        return rows.num_rows
+
+    def contains(self, table, owners, timestamps):
+        """
+        Which (owner, timestamp) pairs, timestamps in SQLite's text format,
+        already are in the cold tier, as a list of booleans
+        """
+        pairs = list(zip(owners, timestamps))
+        stored = {}
+        for owner, month in {(owner, timestamp[:7]) for owner, timestamp in pairs}:
+            files = self._files(table, owner, month)
+            if files:
+                column = self._dataset(files).to_table(columns=['timestamp'])['timestamp']
+                stored[owner, month] = {value.strftime(SQLITE_TIMESTAMP_FORMAT) for value in column.to_pylist()}
+        return [timestamp in stored.get((owner, timestamp[:7]), ()) for owner, timestamp in pairs]
+
+    def scan(self, table, owner, columns=None, since=None, until=None, before=None, limit=None):
+        """
+        The owner's cold rows as an Arrow table, newest first. since/until
+        bound the timestamp; before=(timestamp, id) continues a keyset page.
+        With a limit, months are read newest first until there are enough.
+        """
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        wanted = list(dict.fromkeys(['id', 'timestamp'] + list(columns))) if columns else None
+        condition = None
+        if since is not None:
+            condition = ds.field('timestamp') >= since
+        if until is not None:
+            condition = _and(condition, ds.field('timestamp') < until)
+        if before is not None:
+            timestamp, row_id = before
+            condition = _and(condition, (ds.field('timestamp') < timestamp) |
+                             ((ds.field('timestamp') == timestamp) & (ds.field('id') < row_id)))
+
+        newest_allowed = min(value for value in (until, before and before[0], datetime.datetime.max)
+                             if value is not None)
+        tables = []
+        found = 0
+        for month in reversed(self.months(table, owner)):
+            start = _month_start(month)
+            if start > newest_allowed:
+                continue
+            if since is not None and _next_month(start) <= since:
+                break
+            files = self._files(table, owner, month)
+            if not files:
+                continue
+            part = self._dataset(files).to_table(columns=wanted, filter=condition)
+            if part.num_rows:
+                tables.append(part)
+                found += part.num_rows
+            if limit is not None and found >= limit:
+                break
+
+        if not tables:
+            return None
+        result = pa.concat_tables(tables).sort_by([('timestamp', 'descending'), ('id', 'descending')])
+        return result.slice(0, limit) if limit is not None else result
+
+
+def _and(condition, other):
+    return other if condition is None else condition & other
+
+
+def history(conn, table, owner, columns, since=None, until=None, store=None):
+    """
+    Rows of one owner from both tiers, oldest first, as an Arrow table with
+    id, timestamp and the given columns. conn is a sqlite3 connection to the
+    database holding the owner's hot rows.
+    """
+    import pyarrow as pa
+
+    store = store or ColdStore()
+    wanted = list(dict.fromkeys(['id', 'timestamp'] + list(columns)))
+    schema = arrow_schema(conn, table)
+    schema = pa.schema([schema.field(name) for name in wanted])
+
+    clauses, params = [f'"{TIERED_TABLES[table]}" = ?'], [owner]
+    if since is not None:
+        clauses.append('timestamp >= ?')
+        params.append(since.strftime(SQLITE_TIMESTAMP_FORMAT))
+    if until is not None:
+        clauses.append('timestamp < ?')
+        params.append(until.strftime(SQLITE_TIMESTAMP_FORMAT))
+    hot = to_arrow(conn.execute(
+        f'SELECT {", ".join(wanted)} FROM "{table}" WHERE {" AND ".join(clauses)}', params
+    ).fetchall(), schema)
+
+    cold = store.scan(table, owner, wanted, since, until)
+    if cold is not None:
+        import pyarrow.compute as pc
+
+        # A row caught between being copied and deleted is in both; the hot copy wins
+        cold = cold.filter(pc.invert(pc.is_in(cold['id'], value_set=hot['id'])))
+        hot = pa.concat_tables([hot, cold.cast(schema)])
+    return hot.sort_by([('timestamp', 'ascending'), ('id', 'ascending')])
+
+
+def tier(conn, table, store=None, cutoff=None, batch_rows=None):
+    """
+    Move a table's rows older than cutoff (default: after_days ago) from
+    the sqlite3 connection to the cold store, one transaction per batch.
+    Returns a summary with the owners whose rows moved.
+    """
+    import pyarrow.compute as pc
+
+    store = store or ColdStore()
+    batch_rows = batch_rows or COLD_STORAGE_CONFIG["batch_rows"]
+    if cutoff is None:
+        cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=COLD_STORAGE_CONFIG["after_days"])
+    cutoff_text = cutoff.strftime(SQLITE_TIMESTAMP_FORMAT)
+    owner_column = TIERED_TABLES[table]
+    schema = arrow_schema(conn, table)
+    summary = {'table': table, 'cutoff': cutoff_text, 'rows_moved': 0, 'files': 0, 'owners': set()}
+
+    # Recorded first, so a data load running alongside already skips these rows
+    conn.execute('''
+        INSERT INTO cold_tier_state VALUES (?, ?, 0, datetime('now'))
+        ON CONFLICT (table_name) DO UPDATE SET cutoff = MAX(cutoff, excluded.cutoff),
+                                               tiered_at = excluded.tiered_at''', (table, cutoff_text))
+    conn.commit()
+
+    last_id = 0
+    while True:
+        # The newest row always stays: SQLite would hand its id out again if
+        # it were deleted, and ids have to stay unique across both tiers
+        rows = conn.execute(
+            f'SELECT {", ".join(schema.names)} FROM "{table}" '
+            f'WHERE id > ? AND id < (SELECT MAX(id) FROM "{table}") AND timestamp < ? '
+            f'ORDER BY id LIMIT ?', (last_id, cutoff_text, batch_rows)).fetchall()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+
+        batch = to_arrow(rows, schema)
+        batch = batch.append_column('__month', pc.strftime(batch['timestamp'], format='%Y-%m'))
+        batch = batch.sort_by([(owner_column, 'ascending'), ('__month', 'ascending'), ('id', 'ascending')])
+        owners = batch[owner_column].to_pylist()
+        months = batch['__month'].to_pylist()
+        batch = batch.drop_columns(['__month'])
+
+        start = 0
+        for index in range(1, len(owners) + 1):
+            if index == len(owners) or (owners[index], months[index]) != (owners[start], months[start]):
+                if store.write(table, owners[start], months[start], batch.slice(start, index - start)):
+                    summary['files'] += 1
+                summary['owners'].add(owners[start])
+                start = index
+
+        conn.executemany(f'DELETE FROM "{table}" WHERE id = ?', [(row[0],) for row in rows])
+        conn.execute('UPDATE cold_tier_state SET rows_moved = rows_moved + ? WHERE table_name = ?',
+                     (len(rows), table))
+        conn.commit()
+        summary['rows_moved'] += len(rows)
+
+    return summary
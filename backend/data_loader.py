@@ -0,0 +1,225 @@
+"""
+Streaming loader for the device CSV exports in data/.
+
+Files are read in fixed-size chunks, parsed into typed columns and inserted
+with INSERT OR IGNORE on a (device_id, timestamp) key, so memory stays flat
+and re-loading only adds rows that aren't there yet. A file whose size and
+modification time haven't changed since the last load is skipped entirely.
+"""
+import os
+import time
+
+import pandas as pd
+
+from cold_storage import ColdStore, tier_cutoff
+
+DATA_DIR = os.getenv('DATA_DIR', 'data')
+CHUNK_SIZE = 5000
+CSV_TIMESTAMP_FORMAT = '%m/%d/%Y %H:%M'
+YES_NO = {'yes': 1, 'no': 0}
+
+
+def parse_yes_no(values):
+    return values.astype('string').str.strip().str.lower().map(YES_NO).astype('Int64')
+
+
+def parse_blood_pressure(values):
+    """Split "136/79 mmHg" into systolic and diastolic integers"""
+    parts = values.astype('string').str.extract(r'(\d+)\s*/\s*(\d+)')
+    return parts[0].astype('Int64'), parts[1].astype('Int64')
+
+
+def parse_timestamp(values):
+    parsed = pd.to_datetime(values, format=CSV_TIMESTAMP_FORMAT, errors='coerce')
+    return parsed.dt.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _health_columns(chunk):
+    systolic, diastolic = parse_blood_pressure(chunk['Blood Pressure'])
+    return {
+        'heart_rate': pd.to_numeric(chunk['Heart Rate'], errors='coerce').astype('Int64'),
+        'heart_rate_abnormal': parse_yes_no(chunk['Heart Rate Below/Above Threshold (Yes/No)']),
+        'systolic_bp': systolic,
+        'diastolic_bp': diastolic,
+        'blood_pressure_abnormal': parse_yes_no(chunk['Blood Pressure Below/Above Threshold (Yes/No)']),
+        'glucose_level': pd.to_numeric(chunk['Glucose Levels'], errors='coerce'),
+        'glucose_abnormal': parse_yes_no(chunk['Glucose Levels Below/Above Threshold (Yes/No)']),
+        'oxygen_saturation': pd.to_numeric(chunk['Oxygen Saturation (SpO₂%)'], errors='coerce').astype('Int64'),
+        'oxygen_low': parse_yes_no(chunk['SpO₂ Below Threshold (Yes/No)']),
+        'alert_triggered': parse_yes_no(chunk['Alert Triggered (Yes/No)']),
+        'caregiver_notified': parse_yes_no(chunk['Caregiver Notified (Yes/No)'])
+    }
+
+
+def _safety_columns(chunk):
+    impact = chunk['Impact Force Level'].astype('string').str.strip()
+    return {
+        'movement_activity': chunk['Movement Activity'].astype('string'),
+        'fall_detected': parse_yes_no(chunk['Fall Detected (Yes/No)']),
+        'impact_force_level': impact.where(impact != '-'),
+        'inactivity_seconds': pd.to_numeric(
+            chunk['Post-Fall Inactivity Duration (Seconds)'], errors='coerce').astype('Int64'),
+        'location': chunk['Location'].astype('string'),
+        'alert_triggered': parse_yes_no(chunk['Alert Triggered (Yes/No)']),
+        'caregiver_notified': parse_yes_no(chunk['Caregiver Notified (Yes/No)'])
+    }
+
+
+def _reminder_columns(chunk):
+    return {
+        'reminder_type': chunk['Reminder Type'].astype('string'),
+        'scheduled_time': chunk['Scheduled Time'].astype('string'),
+        'reminder_sent': parse_yes_no(chunk['Reminder Sent (Yes/No)']),
+        'acknowledged': parse_yes_no(chunk['Acknowledged (Yes/No)'])
+    }
+
+
+# table -> (csv file, column DDL, chunk parser)
+DATASETS = {
+    'device_health_data': ('health_monitoring.csv', {
+        'heart_rate': 'INTEGER',
+        'heart_rate_abnormal': 'INTEGER',
+        'systolic_bp': 'INTEGER',
+        'diastolic_bp': 'INTEGER',
+        'blood_pressure_abnormal': 'INTEGER',
+        'glucose_level': 'REAL',
+        'glucose_abnormal': 'INTEGER',
+        'oxygen_saturation': 'INTEGER',
+        'oxygen_low': 'INTEGER',
+        'alert_triggered': 'INTEGER',
+        'caregiver_notified': 'INTEGER'
+    }, _health_columns),
+    'safety_data': ('safety_monitoring.csv', {
+        'movement_activity': 'TEXT',
+        'fall_detected': 'INTEGER',
+        'impact_force_level': 'TEXT',
+        'inactivity_seconds': 'INTEGER',
+        'location': 'TEXT',
+        'alert_triggered': 'INTEGER',
+        'caregiver_notified': 'INTEGER'
+    }, _safety_columns),
+    'reminders': ('daily_reminder.csv', {
+        'reminder_type': 'TEXT',
+        'scheduled_time': 'TEXT',
+        'reminder_sent': 'INTEGER',
+        'acknowledged': 'INTEGER'
+    }, _reminder_columns)
+}
+
+
+def ensure_schema(conn, table):
+    _, columns, _ = DATASETS[table]
+    existing = [row[1] for row in conn.execute(f'PRAGMA table_info("{table}")')]
+    if existing and 'device_id' not in existing:
+        # Not written by this loader (an old DataFrame.to_sql copy, or a
+        # table of the app's): set it aside instead of dropping its rows
+        legacy, number = f'{table}_legacy', 1
+        while conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (legacy,)).fetchone():
+            legacy, number = f'{table}_legacy{number}', number + 1
+        conn.execute(f'ALTER TABLE "{table}" RENAME TO "{legacy}"')
+        conn.execute('DELETE FROM data_load_state WHERE table_name = ?', (table,))
+        print(f"Kept the existing {table} table as {legacy}")
+
+    column_ddl = ',\n    '.join(f'{name} {kind}' for name, kind in columns.items())
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS "{table}" (
+            id INTEGER PRIMARY KEY,
+            device_id TEXT NOT NULL,
+            timestamp TEXT NOT NULL,
+            {column_ddl},
+            UNIQUE (device_id, timestamp)
+        )''')
+    conn.execute(f'CREATE INDEX IF NOT EXISTS "ix_{table}_timestamp" ON "{table}" (timestamp)')
+
+
+def _ensure_state_table(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS data_load_state (
+            table_name TEXT PRIMARY KEY,
+            path TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            rows INTEGER NOT NULL,
+            loaded_at TEXT NOT NULL
+        )''')
+
+
+def prepare_table(conn, table):
+    """Create a dataset's table (and the load state table) if needed"""
+    _ensure_state_table(conn)
+    ensure_schema(conn, table)
+
+
+def _rows(frame):
+    # Turn pandas NA values into None for the DB-API
+    frame = frame.astype(object).where(frame.notna(), None)
+    return list(frame.itertuples(index=False, name=None))
+
+
+def load_dataset(conn, table, data_dir=DATA_DIR, chunk_size=CHUNK_SIZE, progress=None, force=False):
+    """
+    Stream one CSV into its table. Returns a summary dict; calls
+    progress(summary) after every chunk.
+    """
+    filename, columns, parse_chunk = DATASETS[table]
+    path = os.path.join(data_dir, filename)
+    stat = os.stat(path)
+    summary = {'table': table, 'file': path, 'rows_read': 0, 'rows_inserted': 0,
+               'rows_invalid': 0, 'rows_cold': 0, 'skipped': False}
+
+    prepare_table(conn, table)
+    state = conn.execute('SELECT size, mtime_ns FROM data_load_state WHERE table_name = ?',
+                         (table,)).fetchone()
+    if not force and state == (stat.st_size, stat.st_mtime_ns):
+        summary['skipped'] = True
+        if progress:
+            progress(summary)
+        return summary
+
+    # Rows older than this may have been moved to the cold tier; loading
+    # them again would put them in both
+    cold_cutoff = tier_cutoff(conn, table)
+    cold_store = ColdStore()
+    names = ['device_id', 'timestamp'] + list(columns)
+    insert_sql = (f'INSERT OR IGNORE INTO "{table}" ({", ".join(names)}) '
+                  f'VALUES ({", ".join("?" for _ in names)})')
+    start = time.perf_counter()
+
+    for chunk in pd.read_csv(path, chunksize=chunk_size, dtype=str):
+        parsed = pd.DataFrame({
+            'device_id': chunk['Device-ID/User-ID'].astype('string').str.strip(),
+            'timestamp': parse_timestamp(chunk['Timestamp']),
+            **parse_chunk(chunk)
+        })[names]
+        valid = parsed['device_id'].notna() & parsed['timestamp'].notna()
+        keep = valid
+        if cold_cutoff:
+            cold = valid & (parsed['timestamp'] < cold_cutoff)
+            if cold.any():
+                cold[cold] = cold_store.contains(table, parsed.loc[cold, 'device_id'],
+                                                 parsed.loc[cold, 'timestamp'])
+            summary['rows_cold'] += int(cold.sum())
+            keep = valid & ~cold
+
+        before = conn.total_changes
+        conn.executemany(insert_sql, _rows(parsed[keep]))
+        conn.commit()
+
+        summary['rows_read'] += len(chunk)
+        summary['rows_inserted'] += conn.total_changes - before
+        summary['rows_invalid'] += int((~valid).sum())
+        summary['elapsed'] = round(time.perf_counter() - start, 3)
+        if progress:
+            progress(summary)
+
+    row_count = conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+    conn.execute('INSERT OR REPLACE INTO data_load_state VALUES (?, ?, ?, ?, ?, datetime(\'now\'))',
+                 (table, path, stat.st_size, stat.st_mtime_ns, row_count))
+    conn.commit()
+    return summary
+
+
+def load_all(conn, data_dir=DATA_DIR, chunk_size=CHUNK_SIZE, progress=None, force=False):
+    """Load every dataset, yielding its summary as each one finishes"""
+    for table in DATASETS:
+        yield load_dataset(conn, table, data_dir, chunk_size, progress, force)
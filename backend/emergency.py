@@ -0,0 +1,193 @@
+"""
+Deterministic emergency detection and the templated first response.
+
+All of EMERGENCY_PATTERNS and EMERGENCY_EXCLUSIONS are compiled into one
+Aho-Corasick automaton, so a message is scanned once however many phrases
+there are. Phrases match whole words only; one that sits inside an exclusion
+("fell asleep") doesn't count, and neither does one a negation directly
+precedes ("I didn't fall", "no chest pain"), unless the phrase is a negation
+itself ("not breathing"). An emergency phrase asked about ("Is chest pain
+serious?") or reported as over ("the chest pain is gone") is only a concern.
+"""
+import collections
+import re
+
+from ai_config import (EMERGENCY_ACTIONS, EMERGENCY_EXCLUSIONS, EMERGENCY_PATTERNS,
+                       NEGATION_CUES, NEGATION_FILLERS, NEGATION_WINDOW, QUESTION_WORDS,
+                       RESOLUTION_CUES)
+
+_CONTRACTIONS = [
+    (re.compile(r"\bcan'?t\b|\bcannot\b"), "can not"),
+    (re.compile(r"\bwon't\b"), "will not"),
+    (re.compile(r"'m\b"), " am"),
+    (re.compile(r"n't\b"), " not"),
+    (re.compile(r"\b(do|does|did|is|was|are|were|has|have|had|could|would|should)nt\b"), r"\1 not")
+]
+_CLAUSE_BREAK = re.compile(r"[.!;,:]+|\bbut\b")
+_QUESTION_MARK = re.compile(r"\?+")
+_NON_WORD = re.compile(r"[^a-z0-9|]+")
+_NON_WORD_IN_CLAUSES = re.compile(r"[^a-z0-9|?]+")
+# Words after a phrase that start something new, for the resolution check
+_CONJUNCTIONS = {"and", "then", "so"}
+
+MAX_ACTIONS = 6
+
+
+def normalize(text, clauses=False):
+    """
+    Lowercase words separated by single spaces; with clauses, '|' marks
+    clause breaks and a question's clause ends with a '?' word
+    """
+    text = text.lower().replace('’', "'")
+    for pattern, replacement in _CONTRACTIONS:
+        text = pattern.sub(replacement, text)
+    if clauses:
+        text = _QUESTION_MARK.sub(' ? | ', _CLAUSE_BREAK.sub(' | ', text))
+        return ' '.join(_NON_WORD_IN_CLAUSES.sub(' ', text).split())
+    return ' '.join(_NON_WORD.sub(' ', text).split())
+
+
+class AhoCorasick:
+    """Multi-pattern string matcher: one pass over the text finds every pattern"""
+
+    def __init__(self, patterns):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for index, pattern in enumerate(patterns):
+            state = 0
+            for char in pattern:
+                following = self._goto[state].get(char)
+                if following is None:
+                    following = self._goto[state][char] = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = following
+            self._out[state].append(index)
+
+        # Breadth first, so each state's failure link is final before its children use it
+        queue = collections.deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, following in self._goto[state].items():
+                queue.append(following)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                link = self._goto[fallback].get(char, 0)
+                self._fail[following] = link if link != following else 0
+                self._out[following] = self._out[following] + self._out[self._fail[following]]
+
+    def search(self, text):
+        """Yield (pattern index, end offset) for every occurrence"""
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for index in self._out[state]:
+                yield index, position + 1
+
+
+class EmergencyMatcher:
+    def __init__(self, patterns=None, exclusions=None, negations=None, window=None, fillers=None):
+        patterns = EMERGENCY_PATTERNS if patterns is None else patterns
+        exclusions = EMERGENCY_EXCLUSIONS if exclusions is None else exclusions
+        # (phrase, category, severity); exclusions have no category
+        self._entries = [(normalize(phrase), category, severity)
+                         for phrase, (category, severity) in patterns.items()]
+        self._entries += [(normalize(phrase), None, 'exclude') for phrase in exclusions]
+        # Padding every phrase with spaces makes matches whole words
+        self._automaton = AhoCorasick([f' {phrase} ' for phrase, _, _ in self._entries])
+        self.negations = frozenset(NEGATION_CUES if negations is None else negations)
+        self.window = window or NEGATION_WINDOW
+        self.fillers = frozenset(NEGATION_FILLERS if fillers is None else fillers)
+        self.question_words = frozenset(QUESTION_WORDS)
+        self.resolution_cues = frozenset(RESOLUTION_CUES)
+
+    def matches(self, message):
+        """(phrase, category, severity) for every pattern the message means"""
+        if not message:
+            return []
+        text = f' {normalize(message, clauses=True)} '
+        found, excluded = [], []
+        for index, end in self._automaton.search(text):
+            start = end - len(self._entries[index][0]) - 2
+            (excluded if self._entries[index][2] == 'exclude' else found).append((start, end, index))
+
+        # A negated phrase takes the words inside it along ("no chest pain" isn't "pain")
+        excluded += [match for match in found if self._negated(text, *match)]
+        matches = []
+        for start, end, index in found:
+            if any(low <= start and end <= high for low, high, _ in excluded):
+                continue
+            phrase, category, severity = self._entries[index]
+            if (severity == 'emergency' and category != 'general'
+                    and (self._asked(text, start, end) or self._resolved(text, end))):
+                severity = 'concern'
+            matches.append((phrase, category, severity))
+        return matches
+
+    def _negated(self, text, start, end, index):
+        words = self._entries[index][0].split()
+        if words[0] in self.negations or words[:2] == ['can', 'not']:
+            return False
+        # Walk back from the phrase: only fillers may separate it from the cue,
+        # so a cue belonging to an earlier phrase ("not moving and ...") stops short
+        clause = text[:start].rsplit('|', 1)[-1].split()
+        for gap, word in enumerate(reversed(clause)):
+            if word in self.negations:
+                return True
+            if gap >= self.window or word not in self.fillers:
+                return False
+        return False
+
+    def _asked(self, text, start, end):
+        before = text[:start].rsplit('|', 1)[-1].split()
+        after = text[end - 1:].split('|', 1)[0].split()
+        first = before[0] if before else text[start:end].split()[0]
+        return first in self.question_words and after[-1:] == ['?']
+
+    def _resolved(self, text, end):
+        after = text[end - 1:].split('|', 1)[0].split()
+        for word in after[:self.window]:
+            if word in self.resolution_cues:
+                return True
+            if word in _CONJUNCTIONS or word in self.negations:
+                return False
+        return False
+
+    def categories(self, message):
+        """Emergency categories in the message, in order of appearance; empty if none"""
+        categories = []
+        for _, category, severity in self.matches(message):
+            if severity == 'emergency' and category not in categories:
+                categories.append(category)
+        # A bare cry for help ("Help!", "please help me") is an emergency on its own
+        if not categories and message:
+            words = normalize(message).split()
+            if 'help' in words and set(words) <= {'help', 'please', 'me'}:
+                categories.append('general')
+        return categories
+
+    def is_concern(self, message):
+        """Whether the message mentions anything worth following up, emergency or not"""
+        return bool(self.matches(message)) or bool(self.categories(message))
+
+
+emergency_matcher = EmergencyMatcher()
+
+
+def emergency_response(categories):
+    """(text, actions): the templated reply for the detected categories"""
+    actions = []
+    for category in categories + ['general']:
+        for step in EMERGENCY_ACTIONS.get(category, []):
+            if step not in actions:
+                actions.append(step)
+    actions = actions[:MAX_ACTIONS]
+    lines = [f"{number}. {step}" for number, step in enumerate(actions, 1)]
+    text = ("EMERGENCY MODE ACTIVATED\n" + "\n".join(lines) +
+            "\nYour caregiver has been alerted. More guidance will follow shortly.")
+    return text, actions
@@ -0,0 +1,261 @@
+"""
+Gateway in front of one or more local Ollama instances.
+
+All chat traffic goes through the backend: the browser never talks to
+Ollama directly. A background thread probes every instance's /api/tags and
+keeps the result in memory, so status checks cost nothing and Ollama sees
+one probe per interval however many clients are open. Each generation goes
+to the healthy instance with the fewest requests in flight; one that fails
+before producing output is skipped for a cooldown and the request moves to
+the next. Identical non-streaming requests that arrive while one is already
+running share its result instead of generating it again.
+"""
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import Future
+
+from ai_config import LLM_GATEWAY, OLLAMA_CONFIG
+from ollama_client import OllamaClient, OllamaError
+
+
+def parse_backends(spec):
+    """[(base_url, model)] from "url[=model],url[=model]"; defaults to OLLAMA_HOST"""
+    backends = []
+    for entry in (spec or '').split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        url, _, model = entry.partition('=')
+        backends.append((url.strip(), model.strip() or OLLAMA_CONFIG["model"]))
+    return backends or [(OLLAMA_CONFIG["base_url"], OLLAMA_CONFIG["model"])]
+
+
+def _has_model(names, model):
+    # Ollama lists "llama3:latest" for a model pulled as "llama3"
+    return model in names or f"{model}:latest" in names
+
+
+class Backend:
+    def __init__(self, client):
+        self.client = client
+        self.name = f"{client.base_url}/{client.model}"
+        # Assumed healthy until the first probe says otherwise
+        self.healthy = True
+        self.error = None
+        self.checked_at = None
+        self.probe_seconds = None
+        self.down_until = 0.0
+        self.in_flight = 0
+        self.served = 0
+        self.failures = 0
+
+    def available(self, now):
+        return self.healthy and now >= self.down_until
+
+    def status(self):
+        return {
+            'url': self.client.base_url,
+            'model': self.client.model,
+            'healthy': self.healthy and time.monotonic() >= self.down_until,
+            'error': self.error,
+            'checked_at': self.checked_at,
+            'probe_ms': round(self.probe_seconds * 1000, 1) if self.probe_seconds is not None else None,
+            'in_flight': self.in_flight,
+            'served': self.served,
+            'failures': self.failures
+        }
+
+
+class LLMGateway:
+    """
+    Drop-in replacement for OllamaClient (generate, generate_stream, chat,
+    warm_up) that spreads calls over several instances
+    """
+
+    def __init__(self, backends=None, probe_interval=None, failure_cooldown=None):
+        if backends is None:
+            backends = [OllamaClient(base_url=url, model=model)
+                        for url, model in parse_backends(LLM_GATEWAY["backends"])]
+        self.backends = [Backend(client) for client in backends]
+        self.probe_interval = probe_interval or LLM_GATEWAY["probe_interval"]
+        self.failure_cooldown = (failure_cooldown if failure_cooldown is not None
+                                 else LLM_GATEWAY["failure_cooldown"])
+        self._lock = threading.Lock()
+        self._pending = {}
+        self.coalesced = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def model(self):
+        return self.backends[0].client.model
+
+    def start(self):
+        """Probe every instance now, then keep probing in the background"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name='llm-gateway-probe', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.probe()
+            self._stop.wait(self.probe_interval)
+
+    def probe(self):
+        for backend in self.backends:
+            start = time.perf_counter()
+            try:
+                names = backend.client.list_models(timeout=backend.client.timeout[0])
+                has_model = _has_model(names, backend.client.model)
+                error = None if has_model else f"model {backend.client.model} is not pulled"
+            except OllamaError as e:
+                has_model, error = False, str(e)
+            with self._lock:
+                backend.healthy = has_model
+                backend.error = error
+                backend.checked_at = time.time()
+                backend.probe_seconds = time.perf_counter() - start
+                if has_model:
+                    # A good probe ends any cooldown from a failed request
+                    backend.down_until = 0.0
+
+    def status(self):
+        """Health of every instance as of the last probe; never calls Ollama"""
+        with self._lock:
+            backends = [backend.status() for backend in self.backends]
+            coalesced = self.coalesced
+        return {
+            'connected': any(backend['healthy'] for backend in backends),
+            'models': sorted({backend['model'] for backend in backends if backend['healthy']}),
+            'backends': backends,
+            'coalesced': coalesced,
+            'probe_interval': self.probe_interval
+        }
+
+    def _candidates(self, model):
+        """Instances serving the model, least loaded first; unhealthy ones last, as a final resort"""
+        now = time.monotonic()
+        with self._lock:
+            matching = [backend for backend in self.backends
+                        if model is None or backend.client.model == model]
+            return sorted(matching, key=lambda backend: (not backend.available(now), backend.in_flight))
+
+    def _acquire(self, backend):
+        with self._lock:
+            backend.in_flight += 1
+
+    def _release(self, backend, error=None):
+        with self._lock:
+            backend.in_flight -= 1
+            if error is None:
+                backend.served += 1
+                return
+            backend.failures += 1
+            # Ollama answering 4xx means the request was wrong, not the instance
+            if error.status_code is None or error.status_code >= 500:
+                backend.healthy = False
+                backend.error = str(error)
+                backend.down_until = time.monotonic() + self.failure_cooldown
+
+    def _route(self, call, model):
+        candidates = self._candidates(model)
+        if not candidates:
+            raise OllamaError(f"No Ollama instance is configured for model {model}")
+        error = None
+        for backend in candidates:
+            self._acquire(backend)
+            try:
+                result = call(backend.client)
+            except OllamaError as e:
+                self._release(backend, e)
+                if e.status_code is not None and e.status_code < 500:
+                    raise
+                error = e
+                continue
+            self._release(backend)
+            return result
+        raise error
+
+    def _coalesced(self, key, call):
+        leader = None
+        with self._lock:
+            pending = self._pending.get(key)
+            if pending is not None:
+                self.coalesced += 1
+            else:
+                pending = self._pending[key] = Future()
+                leader = pending
+        if pending is not leader:
+            # The same request is already running; wait for its answer
+            return pending.result()
+        try:
+            result = call()
+            pending.set_result(result)
+            return result
+        except Exception as e:
+            pending.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+    @staticmethod
+    def _key(*parts):
+        return hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+    def generate(self, prompt, model=None, system=None, context=None, options=None, timeout=None):
+        key = self._key('generate', model, prompt, system, context, options)
+        return self._coalesced(key, lambda: self._route(
+            lambda client: client.generate(prompt, system=system, context=context,
+                                           options=options, timeout=timeout), model))
+
+    def chat(self, messages, model=None, options=None, timeout=None):
+        key = self._key('chat', model, messages, options)
+        return self._coalesced(key, lambda: self._route(
+            lambda client: client.chat(messages, options=options, timeout=timeout), model))
+
+    def generate_stream(self, prompt, model=None, system=None, context=None, options=None, timeout=None):
+        """
+        Stream from the least loaded instance. An instance that fails before
+        sending anything is skipped; once frames have gone out, a failure is
+        raised to the caller rather than restarting the answer elsewhere.
+        """
+        candidates = self._candidates(model)
+        if not candidates:
+            raise OllamaError(f"No Ollama instance is configured for model {model}")
+        error = None
+        for backend in candidates:
+            self._acquire(backend)
+            started = False
+            try:
+                for frame in backend.client.generate_stream(prompt, system=system, context=context,
+                                                            options=options, timeout=timeout):
+                    started = True
+                    yield frame
+            except OllamaError as e:
+                self._release(backend, e)
+                if started or (e.status_code is not None and e.status_code < 500):
+                    raise
+                error = e
+                continue
+            except BaseException:
+                # The client went away mid-stream; not the instance's fault
+                self._release(backend)
+                raise
+            self._release(backend)
+            return
+        raise error
+
+    def warm_up(self, model=None):
+        """Load the model on every instance serving it"""
+        for backend in self._candidates(model):
+            try:
+                backend.client.warm_up()
+            except OllamaError as e:
+                print(f"Ollama warm-up failed for {backend.name}: {str(e)}")
@@ -0,0 +1,192 @@
+"""
+Lightweight request and stage instrumentation, exposed in the Prometheus
+text format at /api/metrics.
+
+Histograms and counters are plain in-process objects with one small lock
+each; recording a sample is a bisect and two additions. Components that
+already keep their own statistics (caches, the chat executor) are read at
+scrape time through collectors instead of being instrumented twice.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+from ai_config import METRICS_CONFIG
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _label_text(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return '{' + pairs + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, *label_values):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for label_values, value in sorted(values.items()):
+            yield self.name, _label_text(self.labels, label_values), value
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=None):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets or METRICS_CONFIG["latency_buckets"])
+        # label values -> [per-bucket counts (+Inf last), sum]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def samples(self):
+        with self._lock:
+            series = {key: (list(counts), total) for key, (counts, total) in self._series.items()}
+        bounds = self.buckets + (float('inf'),)
+        for label_values, (counts, total) in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                yield (f'{self.name}_bucket',
+                       _label_text(self.labels + ('le',), label_values + (_number(bound),)), cumulative)
+            labels = _label_text(self.labels, label_values)
+            yield f'{self.name}_sum', labels, round(total, 6)
+            yield f'{self.name}_count', labels, cumulative
+
+
+class Registry:
+    def __init__(self, enabled=None):
+        self.enabled = METRICS_CONFIG["enabled"] if enabled is None else enabled
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help, labels, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help, labels, **kwargs)
+            return metric
+
+    def counter(self, name, help, labels=()):
+        return self._get(Counter, name, help, labels)
+
+    def histogram(self, name, help, labels=(), buckets=None):
+        return self._get(Histogram, name, help, labels, buckets=buckets)
+
+    def collector(self, collect):
+        """
+        Register collect(), called at scrape time; it returns
+        (name, kind, help, [(labels dict, value), ...]) tuples
+        """
+        self._collectors.append(collect)
+        return collect
+
+    def render(self):
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(f'{name}{labels} {_number(value)}' for name, labels, value in metric.samples())
+        for collect in self._collectors:
+            try:
+                families = collect()
+            except Exception as e:
+                print(f"Error collecting metrics: {str(e)}")
+                continue
+            for name, kind, help, samples in families:
+                lines.append(f'# HELP {name} {help}')
+                lines.append(f'# TYPE {name} {kind}')
+                for labels, value in samples:
+                    label_text = _label_text(tuple(labels), tuple(labels.values()))
+                    lines.append(f'{name}{label_text} {_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+STAGE_SECONDS = registry.histogram(
+    'elder_stage_duration_seconds', 'Time spent in a processing stage', ('stage',))
+
+
+@contextmanager
+def stage(name):
+    """Time a block as a processing stage: with stage('analysis'): ..."""
+    if not registry.enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, name)
+
+
+def instrument_database(engines, session):
+    """
+    Time every statement on the SQLAlchemy engines (stage db_query) and every
+    session commit, including its flush (stage db_commit)
+    """
+    if not registry.enabled:
+        return
+    from sqlalchemy import event
+
+    def start_query(conn, cursor, statement, parameters, context, executemany):
+        context.query_start = time.perf_counter()
+
+    def end_query(conn, cursor, statement, parameters, context, executemany):
+        STAGE_SECONDS.observe(time.perf_counter() - context.query_start, 'db_query')
+
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', start_query)
+        event.listen(engine, 'after_cursor_execute', end_query)
+
+    @event.listens_for(session, 'before_commit')
+    def start_commit(db_session):
+        db_session.info['commit_start'] = time.perf_counter()
+
+    @event.listens_for(session, 'after_commit')
+    def end_commit(db_session):
+        start = db_session.info.pop('commit_start', None)
+        if start is not None:
+            STAGE_SECONDS.observe(time.perf_counter() - start, 'db_commit')
+
@@ -0,0 +1,205 @@
+"""
+Versioned schema migrations, applied at startup.
+
+Each migration runs once, in order, and its version is recorded in
+schema_migrations. Pending migrations run in one transaction that holds
+SQLite's write lock, so workers starting together wait for each other
+instead of migrating twice, and an up-to-date database costs one query.
+
+Databases created by the old drop-and-create startup already have some of
+these tables, so every step checks what exists before changing it.
+"""
+
+INITIAL_TABLES = [
+    '''CREATE TABLE IF NOT EXISTS user (
+        id INTEGER NOT NULL,
+        username VARCHAR(80) NOT NULL,
+        password VARCHAR(120) NOT NULL,
+        name VARCHAR(100),
+        email VARCHAR(120),
+        age INTEGER,
+        gender VARCHAR(10),
+        emergency_contact VARCHAR(100),
+        medical_history TEXT,
+        PRIMARY KEY (id),
+        UNIQUE (username)
+    )''',
+    '''CREATE TABLE IF NOT EXISTS health_data (
+        id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        heart_rate INTEGER,
+        blood_pressure VARCHAR(20),
+        oxygen_level INTEGER,
+        temperature FLOAT,
+        glucose_level FLOAT,
+        sleep_hours FLOAT,
+        activity_level VARCHAR(20),
+        medication_adherence BOOLEAN,
+        pain_level INTEGER,
+        mood INTEGER,
+        notes TEXT,
+        timestamp DATETIME,
+        alert_level VARCHAR(20),
+        health_score FLOAT,
+        PRIMARY KEY (id),
+        FOREIGN KEY(user_id) REFERENCES user (id)
+    )''',
+    'CREATE INDEX IF NOT EXISTS ix_health_data_user_timestamp ON health_data (user_id, timestamp, id)',
+    '''CREATE TABLE IF NOT EXISTS health_rollup (
+        id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        metric VARCHAR(30) NOT NULL,
+        resolution VARCHAR(4) NOT NULL,
+        bucket_start DATETIME NOT NULL,
+        count INTEGER NOT NULL,
+        sum_value FLOAT NOT NULL,
+        min_value FLOAT NOT NULL,
+        max_value FLOAT NOT NULL,
+        last_value FLOAT NOT NULL,
+        last_timestamp DATETIME NOT NULL,
+        PRIMARY KEY (id),
+        CONSTRAINT uq_health_rollup_bucket UNIQUE (user_id, metric, resolution, bucket_start),
+        FOREIGN KEY(user_id) REFERENCES user (id)
+    )''',
+    '''CREATE TABLE IF NOT EXISTS reminder (
+        id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        title VARCHAR(100) NOT NULL,
+        description TEXT,
+        due_date DATETIME NOT NULL,
+        completed BOOLEAN,
+        reminder_type VARCHAR(20),
+        priority VARCHAR(20),
+        PRIMARY KEY (id),
+        FOREIGN KEY(user_id) REFERENCES user (id)
+    )''',
+    'CREATE INDEX IF NOT EXISTS ix_reminder_user_open ON reminder (user_id, completed, due_date)',
+    '''CREATE TABLE IF NOT EXISTS alert (
+        id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        type VARCHAR(50),
+        message TEXT,
+        priority VARCHAR(20),
+        timestamp DATETIME,
+        acknowledged BOOLEAN,
+        PRIMARY KEY (id),
+        FOREIGN KEY(user_id) REFERENCES user (id)
+    )'''
+]
+
+
+def _columns(conn, table):
+    return [row[1] for row in conn.execute(f'PRAGMA table_info("{table}")')]
+
+
+def initial_schema(conn):
+    # /api/load-data used to write the device health export into health_data
+    # itself; keep any such copy under its own name
+    if 'device_id' in _columns(conn, 'health_data'):
+        conn.execute('ALTER TABLE health_data RENAME TO device_health_data')
+    for statement in INITIAL_TABLES:
+        conn.execute(statement)
+
+
+def health_baselines(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS health_baseline (
+            user_id INTEGER NOT NULL,
+            metric VARCHAR(30) NOT NULL,
+            count INTEGER NOT NULL,
+            mean FLOAT NOT NULL,
+            m2 FLOAT NOT NULL,
+            ewma FLOAT,
+            window BLOB,
+            PRIMARY KEY (user_id, metric),
+            FOREIGN KEY(user_id) REFERENCES user (id)
+        )''')
+
+
+def reminder_recurrence(conn):
+    existing = _columns(conn, 'reminder')
+    if 'recurrence' not in existing:
+        conn.execute('ALTER TABLE reminder ADD COLUMN recurrence VARCHAR(10)')
+    if 'last_fired_at' not in existing:
+        conn.execute('ALTER TABLE reminder ADD COLUMN last_fired_at DATETIME')
+
+
+def device_datasets(conn):
+    # Tables for the device exports (safety_data also takes live safety
+    # events), so their routes work before the first /api/load-data
+    from data_loader import DATASETS, prepare_table
+
+    for table in DATASETS:
+        prepare_table(conn, table)
+    # Load state recorded under the old table name no longer matches a table
+    conn.execute("DELETE FROM data_load_state WHERE table_name = 'health_data'")
+
+
+def user_shard_directory(conn):
+    # Which shard each user lives on, keyed by the user id it allocates.
+    # Every shard runs the same migrations; only shard 0's directory is used.
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS user_shard (
+            user_id INTEGER NOT NULL,
+            username VARCHAR(80) NOT NULL,
+            shard INTEGER NOT NULL,
+            facility VARCHAR(100),
+            PRIMARY KEY (user_id),
+            UNIQUE (username)
+        )''')
+    conn.execute('INSERT OR IGNORE INTO user_shard (user_id, username, shard) SELECT id, username, 0 FROM user')
+
+
+def cold_tier_state(conn):
+    # How far each table has been moved to the cold tier (see cold_storage.py)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS cold_tier_state (
+            table_name TEXT PRIMARY KEY,
+            cutoff TEXT NOT NULL,
+            rows_moved INTEGER NOT NULL,
+            tiered_at TEXT NOT NULL
+        )''')
+
+
+# (version, name, apply(conn)); append only, never edit an applied migration
+MIGRATIONS = [
+    (1, 'initial schema', initial_schema),
+    (2, 'health baselines', health_baselines),
+    (3, 'reminder recurrence', reminder_recurrence),
+    (4, 'device datasets', device_datasets),
+    (5, 'user shard directory', user_shard_directory),
+    (6, 'cold tier state', cold_tier_state)
+]
+
+
+def current_version(conn):
+    return conn.execute('SELECT COALESCE(MAX(version), 0) FROM schema_migrations').fetchone()[0]
+
+
+def migrate(conn):
+    """Apply pending migrations to a sqlite3 connection; returns the versions applied"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TEXT NOT NULL
+        )''')
+    conn.commit()
+    if current_version(conn) >= MIGRATIONS[-1][0]:
+        return []
+
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        # Another worker may have migrated while this one waited for the lock
+        version = current_version(conn)
+        applied = []
+        for number, name, apply in MIGRATIONS:
+            if number > version:
+                apply(conn)
+                conn.execute("INSERT INTO schema_migrations VALUES (?, ?, datetime('now'))", (number, name))
+                applied.append(number)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return applied
@@ -0,0 +1,202 @@
+"""
+Pooled HTTP client for the local Ollama server
+"""
+import json
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from ai_config import OLLAMA_CONFIG, METRICS_CONFIG
+from metrics import registry
+
+LLM_SECONDS = registry.histogram(
+    'elder_llm_request_duration_seconds', 'Ollama generate calls, start to last token', ('model', 'mode'))
+LLM_FIRST_TOKEN_SECONDS = registry.histogram(
+    'elder_llm_time_to_first_token_seconds', 'Streaming generate calls, start to first token', ('model',))
+LLM_TOKENS_PER_SECOND = registry.histogram(
+    'elder_llm_tokens_per_second', 'Generation speed reported by Ollama', ('model',),
+    buckets=METRICS_CONFIG["throughput_buckets"])
+LLM_TOKENS = registry.counter(
+    'elder_llm_tokens_total', 'Tokens evaluated by Ollama', ('model', 'kind'))
+LLM_ERRORS = registry.counter(
+    'elder_llm_errors_total', 'Failed Ollama generate calls', ('model',))
+
+
+def record_generation(model, mode, seconds, frame, first_token_seconds=None):
+    """Record timings and token counts from a final (done) Ollama frame"""
+    if not registry.enabled:
+        return
+    LLM_SECONDS.observe(seconds, model, mode)
+    if first_token_seconds is not None:
+        LLM_FIRST_TOKEN_SECONDS.observe(first_token_seconds, model)
+    prompt_tokens = frame.get("prompt_eval_count") or 0
+    eval_tokens = frame.get("eval_count") or 0
+    LLM_TOKENS.inc(prompt_tokens, model, 'prompt')
+    LLM_TOKENS.inc(eval_tokens, model, 'generated')
+    # eval_duration is in nanoseconds; without it, fall back to wall time
+    eval_seconds = (frame.get("eval_duration") or 0) / 1e9 or seconds - (first_token_seconds or 0)
+    if eval_tokens and eval_seconds > 0:
+        LLM_TOKENS_PER_SECOND.observe(eval_tokens / eval_seconds, model)
+
+
+class OllamaError(Exception):
+    """Raised when Ollama cannot be reached or returns an error"""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        # HTTP status Ollama answered with; None if it couldn't be reached
+        self.status_code = status_code
+
+
+def _status_code(error):
+    response = getattr(error, "response", None)
+    return response.status_code if response is not None else None
+
+
+class OllamaClient:
+    """
+    Talks to Ollama's HTTP API (/api/generate, /api/chat) over a shared
+    keep-alive session instead of spawning `ollama run` per request.
+    """
+
+    def __init__(self, base_url=None, model=None, keep_alive=None,
+                 connect_timeout=None, read_timeout=None, pool_size=None):
+        self.base_url = (base_url or OLLAMA_CONFIG["base_url"]).rstrip("/")
+        self.model = model or OLLAMA_CONFIG["model"]
+        self.keep_alive = keep_alive if keep_alive is not None else OLLAMA_CONFIG["keep_alive"]
+        self.timeout = (
+            connect_timeout if connect_timeout is not None else OLLAMA_CONFIG["connect_timeout"],
+            read_timeout if read_timeout is not None else OLLAMA_CONFIG["read_timeout"]
+        )
+
+        pool_size = pool_size or OLLAMA_CONFIG["pool_size"]
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _post(self, path, payload, timeout=None):
+        try:
+            response = self.session.post(
+                f"{self.base_url}{path}",
+                json=payload,
+                timeout=timeout or self.timeout
+            )
+            response.raise_for_status()
+            return response.json()
+        except requests.RequestException as e:
+            raise OllamaError(f"Ollama request to {path} failed: {str(e)}", _status_code(e)) from e
+        except ValueError as e:
+            raise OllamaError(f"Invalid JSON from Ollama {path}: {str(e)}") from e
+
+    def generate(self, prompt, model=None, system=None, context=None, options=None, timeout=None):
+        """
+        Run a single non-streaming completion via /api/generate. Passing the
+        context array from a previous response continues that conversation.
+        """
+        payload = {
+            "model": model or self.model,
+            "prompt": prompt,
+            "stream": False,
+            "keep_alive": self.keep_alive
+        }
+        if system:
+            payload["system"] = system
+        if context:
+            payload["context"] = context
+        if options:
+            payload["options"] = options
+        start = time.perf_counter()
+        try:
+            result = self._post("/api/generate", payload, timeout)
+        except OllamaError:
+            LLM_ERRORS.inc(1, payload["model"])
+            raise
+        record_generation(payload["model"], 'generate', time.perf_counter() - start, result)
+        return result
+
+    def generate_stream(self, prompt, model=None, system=None, context=None, options=None, timeout=None):
+        """
+        Stream a completion via /api/generate, yielding each NDJSON frame
+        as Ollama produces it. The last frame has done=True.
+        """
+        payload = {
+            "model": model or self.model,
+            "prompt": prompt,
+            "stream": True,
+            "keep_alive": self.keep_alive
+        }
+        if system:
+            payload["system"] = system
+        if context:
+            payload["context"] = context
+        if options:
+            payload["options"] = options
+
+        start = time.perf_counter()
+        first_token = None
+        try:
+            with self.session.post(
+                f"{self.base_url}/api/generate",
+                json=payload,
+                timeout=timeout or self.timeout,
+                stream=True
+            ) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    frame = json.loads(line)
+                    if "error" in frame:
+                        raise OllamaError(f"Ollama error: {frame['error']}")
+                    if first_token is None and frame.get("response"):
+                        first_token = time.perf_counter() - start
+                    if frame.get("done"):
+                        record_generation(payload["model"], 'stream', time.perf_counter() - start,
+                                          frame, first_token)
+                    yield frame
+                    if frame.get("done"):
+                        break
+        except OllamaError:
+            LLM_ERRORS.inc(1, payload["model"])
+            raise
+        except requests.RequestException as e:
+            LLM_ERRORS.inc(1, payload["model"])
+            raise OllamaError(f"Ollama streaming request failed: {str(e)}", _status_code(e)) from e
+        except ValueError as e:
+            LLM_ERRORS.inc(1, payload["model"])
+            raise OllamaError(f"Invalid JSON frame from Ollama: {str(e)}") from e
+
+    def chat(self, messages, model=None, options=None, timeout=None):
+        """Run a single non-streaming chat turn via /api/chat"""
+        payload = {
+            "model": model or self.model,
+            "messages": messages,
+            "stream": False,
+            "keep_alive": self.keep_alive
+        }
+        if options:
+            payload["options"] = options
+        return self._post("/api/chat", payload, timeout)
+
+    def list_models(self, timeout=None):
+        """Names of the models this Ollama instance has, via /api/tags"""
+        try:
+            response = self.session.get(f"{self.base_url}/api/tags", timeout=timeout or self.timeout)
+            response.raise_for_status()
+            return [model["name"] for model in response.json().get("models", [])]
+        except requests.RequestException as e:
+            raise OllamaError(f"Ollama request to /api/tags failed: {str(e)}", _status_code(e)) from e
+        except (ValueError, KeyError) as e:
+            raise OllamaError(f"Invalid JSON from Ollama /api/tags: {str(e)}") from e
+
+    def warm_up(self, model=None):
+        """Load the model into memory without generating anything"""
+        return self._post("/api/generate", {
+            "model": model or self.model,
+            "keep_alive": self.keep_alive
+        })
+
+    def close(self):
+        self.session.close()
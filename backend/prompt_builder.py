@@ -0,0 +1,144 @@
+"""
+Prompt construction for the assistant.
+
+The system prompt for each situation (health assistant or emergency) is
+assembled once at startup and sent unchanged as Ollama's `system` field, so
+every request shares the same leading tokens and the server can reuse its
+KV cache for them. Everything that varies (time, profile, vitals, mood
+history, recent turns, the question) goes into the prompt after it. The
+whole request is kept under a token budget by trimming mood history and
+older turns first, then notes.
+
+A follow-up turn that carries Ollama's context array only needs the new
+question and anything that changed since, which follow_up() builds.
+"""
+from datetime import datetime
+
+from ai_config import SYSTEM_PROMPTS, PROMPT_BUDGET, is_emergency_situation
+
+ASSISTANT_PROFILE = """You are ElderCare AI, a compassionate and intelligent assistant specifically designed for elderly care.
+
+Your capabilities include:
+1. Medication reminders and adherence tracking
+2. Daily routine management and gentle reminders
+3. Health monitoring and emergency alerts
+4. Emotional support and companionship
+5. Social interaction encouragement
+6. Memory assistance and cognitive exercises
+7. Family connection facilitation
+8. Emergency response guidance
+9. Nutrition and exercise advice
+10. Sleep quality monitoring"""
+
+RESPONSE_GUIDANCE = """Please provide a caring, clear, and helpful response. If you detect any health concerns or emergency situations, highlight them prominently."""
+
+TRUNCATED = " [truncated]"
+
+
+def estimate_tokens(text):
+    """Rough token count; Ollama models average about four characters per token"""
+    return len(text) // PROMPT_BUDGET["chars_per_token"] + 1
+
+
+def compile_system_prompts():
+    return {kind: f"{ASSISTANT_PROFILE}\n\n{prompt}\n\n{RESPONSE_GUIDANCE}"
+            for kind, prompt in SYSTEM_PROMPTS.items()}
+
+
+def _shorten(text, max_chars):
+    if len(text) <= max_chars:
+        return text
+    return text[:max(max_chars - len(TRUNCATED), 0)].rstrip() + TRUNCATED
+
+
+class PromptBuilder:
+    def __init__(self, max_tokens=None):
+        self.max_tokens = max_tokens or PROMPT_BUDGET["max_tokens"]
+        self.system_prompts = compile_system_prompts()
+
+    def situation(self, query, health_data=None):
+        return "emergency" if is_emergency_situation(query, health_data) else "health_assistant"
+
+    def build(self, user_data, query, health_data=None, turns=None):
+        """Return (system, prompt) for a query, within the token budget"""
+        system = self.system_prompts[self.situation(query, health_data)]
+        now = datetime.now()
+
+        header = (f"Current Time: {now.strftime('%I:%M %p')}\n"
+                  f"Date: {now.strftime('%B %d, %Y')}\n\n"
+                  f"User Profile:\n"
+                  f"- Name: {user_data.get('name', 'User')}\n"
+                  f"- Age: {user_data.get('age', 'Not specified')}\n")
+        text = {
+            'medical_history': str(user_data.get('medical_history') or 'Not available'),
+            'notes': str((health_data or {}).get('notes') or '')
+        }
+        vitals = self.format_health_data(health_data)
+        moods = [self.format_mood(entry) for entry in user_data.get('mood_history') or []]
+        turns = [self.format_turn(turn) for turn in turns or []]
+        footer = f"\n\nUser Query: {query}"
+
+        def render():
+            prompt = (header + f"- Medical History: {text['medical_history']}\n\n"
+                      f"Recent Health Status:\n{vitals}")
+            if text['notes']:
+                prompt += f"\n- Notes: {text['notes']}"
+            if moods:
+                prompt += "\n\nRecent Mood:\n" + "\n".join(moods)
+            if turns:
+                prompt += "\n\nConversation So Far:\n" + "\n".join(turns)
+            return prompt + footer
+
+        prompt = render()
+        available_chars = (self.max_tokens - estimate_tokens(system) - 1) * PROMPT_BUDGET["chars_per_token"]
+        # Oldest mood entries and turns go first, then the reading notes and
+        # medical history shrink
+        while len(prompt) > available_chars and (moods or turns):
+            if moods:
+                moods.pop()
+            else:
+                turns.pop(0)
+            prompt = render()
+        for field in ('notes', 'medical_history'):
+            excess = len(prompt) - available_chars
+            if excess <= 0:
+                break
+            if text[field]:
+                text[field] = _shorten(text[field], len(text[field]) - excess)
+                prompt = render()
+
+        return system, prompt
+
+    def follow_up(self, query, health_data=None):
+        """
+        Prompt for a turn that continues an Ollama context: the question,
+        plus the vitals when they changed since the previous turn
+        """
+        prompt = f"Current Time: {datetime.now().strftime('%I:%M %p')}\n"
+        if health_data:
+            prompt += f"\nUpdated Health Status:\n{self.format_health_data(health_data)}\n"
+        return prompt + f"\nUser Query: {query}"
+
+    @staticmethod
+    def format_health_data(health_data):
+        if not health_data:
+            return "No recent health data available"
+
+        return f"""Latest Vital Signs:
+- Heart Rate: {health_data.get('heart_rate', 'N/A')} BPM
+- Blood Pressure: {health_data.get('blood_pressure', 'N/A')}
+- Oxygen Level: {health_data.get('oxygen_level', 'N/A')}%
+- Temperature: {health_data.get('temperature', 'N/A')}°F
+- Pain Level: {health_data.get('pain_level', 'N/A')}/10
+- Mood: {health_data.get('mood', 'N/A')}/5"""
+
+    @staticmethod
+    def format_mood(entry):
+        line = f"- {entry.get('timestamp', '')[:16].replace('T', ' ')}: {entry.get('mood', 'N/A')}/5"
+        if entry.get('notes'):
+            line += f" ({entry['notes']})"
+        return line
+
+    @staticmethod
+    def format_turn(turn):
+        return f"User: {turn['query']}\nAssistant: {_shorten(turn['response'], 300)}"
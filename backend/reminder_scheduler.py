@@ -0,0 +1,257 @@
+"""
+Reminder scheduling: fires due reminders as they come due and answers
+"what's next" for a user without scanning their reminder list.
+
+Open reminders are held in two sets of heaps keyed by due time. A single
+firing heap holds reminders that haven't fired yet, and a worker thread
+sleeps until the earliest of them is due. Per user and reminder type, an
+index holds every open reminder, so the next one is a heap peek. Entries
+are replaced rather than updated in place, and superseded heap items are
+skipped when they surface.
+
+The database stays the source of truth. A reminder's last_fired_at records
+the occurrence it fired for, and recurring reminders advance due_date in the
+same transaction. Loading open reminders at startup therefore resumes
+exactly, including firing anything that came due while the server was down.
+"""
+import datetime
+import heapq
+import itertools
+import threading
+
+RECURRENCE_INTERVALS = {
+    'hourly': datetime.timedelta(hours=1),
+    'daily': datetime.timedelta(days=1),
+    'weekly': datetime.timedelta(weeks=1)
+}
+
+DUE_SOON = datetime.timedelta(minutes=30)
+# Longest the worker sleeps before re-checking, in case the clock jumps
+MAX_SLEEP_SECONDS = 60
+RETRY_SECONDS = 30
+
+# Seeded as daily reminders for the demo user and for users who opt in when
+# they register: (title, reminder_type, HH:MM)
+DEFAULT_DAILY_ROUTINE = [
+    ('Morning medications', 'medication', '08:00'),
+    ('Breakfast', 'routine', '09:00'),
+    ('Exercise', 'exercise', '10:00'),
+    ('Lunch', 'routine', '13:00'),
+    ('Afternoon medications', 'medication', '14:00'),
+    ('Social time', 'routine', '15:00'),
+    ('Dinner', 'routine', '18:00'),
+    ('Evening medications', 'medication', '20:00'),
+    ('Sleep', 'routine', '22:00')
+]
+
+
+def next_occurrence(due, recurrence, after):
+    """First occurrence of a recurring schedule starting at due that is later than after"""
+    if due > after:
+        return due
+    interval = RECURRENCE_INTERVALS[recurrence]
+    return due + ((after - due) // interval + 1) * interval
+
+
+def routine_schedule(now):
+    """(title, reminder_type, first due date) of each DEFAULT_DAILY_ROUTINE entry after now"""
+    schedule = []
+    for title, reminder_type, at in DEFAULT_DAILY_ROUTINE:
+        hour, minute = map(int, at.split(':'))
+        first = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        schedule.append((title, reminder_type, next_occurrence(first, 'daily', now)))
+    return schedule
+
+
+def reminder_message(reminder, now=None):
+    if reminder.reminder_type == 'medication':
+        message = f"Time to take {reminder.title}"
+    else:
+        message = f"Time for {reminder.title}"
+    if now is not None:
+        minutes = int((reminder.due - now).total_seconds() // 60)
+        if minutes > 0:
+            message += f" in {minutes} minutes"
+    return message
+
+
+class ScheduledReminder:
+    __slots__ = ('id', 'user_id', 'reminder_type', 'title', 'priority', 'due', 'recurrence', 'fired')
+
+    def __init__(self, id, user_id, reminder_type, title, priority, due, recurrence=None, fired=False):
+        self.id = id
+        self.user_id = user_id
+        self.reminder_type = reminder_type
+        self.title = title
+        self.priority = priority
+        self.due = due
+        self.recurrence = recurrence
+        self.fired = fired
+
+    @classmethod
+    def from_row(cls, reminder):
+        """From a Reminder row; it has fired if last_fired_at covers its due date"""
+        fired = reminder.last_fired_at is not None and reminder.last_fired_at >= reminder.due_date
+        return cls(reminder.id, reminder.user_id, reminder.reminder_type, reminder.title,
+                   reminder.priority, reminder.due_date, reminder.recurrence, fired)
+
+    @property
+    def key(self):
+        # Reminder ids are only unique within a database shard, and a user lives on one
+        return self.user_id, self.id
+
+
+def _in_order_until(heap, limit):
+    """Heap items up to limit in ascending order, without popping: O(k log k)"""
+    if not heap:
+        return
+    frontier = [(heap[0], 0)]
+    while frontier:
+        item, index = heapq.heappop(frontier)
+        if item[0] > limit:
+            return
+        yield item
+        for child in (2 * index + 1, 2 * index + 2):
+            if child < len(heap):
+                heapq.heappush(frontier, (heap[child], child))
+
+
+class ReminderScheduler:
+    def __init__(self, fire, clock=datetime.datetime.now):
+        """
+        fire(reminders) is called from the worker thread with reminders that
+        have come due. It should record them and re-schedule any that recur.
+        """
+        self.fire = fire
+        self.clock = clock
+        # Heap items are (time, sequence, entry); an item is live while its
+        # entry is still the current one for that reminder's key
+        self._entries = {}
+        self._firing = []
+        self._by_user = {}
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._worker = None
+        self.fired = 0
+
+    def _live(self, item):
+        entry = item[2]
+        return self._entries.get(entry.key) is entry
+
+    def _push(self, entry):
+        self._entries[entry.key] = entry
+        user_heaps = self._by_user.setdefault(entry.user_id, {})
+        heapq.heappush(user_heaps.setdefault(entry.reminder_type, []),
+                       (entry.due, next(self._sequence), entry))
+        if not entry.fired:
+            heapq.heappush(self._firing, (entry.due, next(self._sequence), entry))
+
+    def load(self, entries):
+        """Replace the schedule with the given open reminders (at startup)"""
+        with self._condition:
+            self._entries = {}
+            self._firing = []
+            self._by_user = {}
+            for entry in entries:
+                self._push(entry)
+            self._condition.notify()
+
+    def schedule(self, entry):
+        """Add a reminder or replace its previous schedule"""
+        with self._condition:
+            self._push(entry)
+            self._compact(entry.user_id, entry.reminder_type)
+            self._condition.notify()
+
+    def cancel(self, key):
+        """Drop a reminder from the schedule by its key, (user_id, reminder id)"""
+        with self._condition:
+            self._entries.pop(key, None)
+
+    def _compact(self, user_id, reminder_type):
+        # Superseded items are skipped lazily; rebuild a heap once they dominate it
+        if len(self._firing) > 2 * len(self._entries) + 64:
+            self._firing = [item for item in self._firing if self._live(item) and not item[2].fired]
+            heapq.heapify(self._firing)
+        heap = self._by_user[user_id][reminder_type]
+        if len(heap) > 16:
+            live = [item for item in heap if self._live(item)]
+            if len(heap) > 2 * len(live):
+                heapq.heapify(live)
+                self._by_user[user_id][reminder_type] = live
+
+    def next_due(self, user_id, reminder_type):
+        """The user's earliest open reminder of a type (overdue ones included)"""
+        with self._condition:
+            heap = self._by_user.get(int(user_id), {}).get(reminder_type, [])
+            while heap:
+                if self._live(heap[0]):
+                    return heap[0][2]
+                heapq.heappop(heap)
+            return None
+
+    def due_within(self, user_id, window=DUE_SOON, now=None):
+        """The user's open reminders due before now + window, earliest first"""
+        limit = (now or self.clock()) + window
+        with self._condition:
+            due = [item for heap in self._by_user.get(int(user_id), {}).values()
+                   for item in _in_order_until(heap, limit) if self._live(item)]
+        return [entry for _, _, entry in sorted(due)]
+
+    def _take_due(self, now):
+        due = []
+        while self._firing and self._firing[0][0] <= now:
+            item = heapq.heappop(self._firing)
+            entry = item[2]
+            if self._live(item) and not entry.fired:
+                entry.fired = True
+                due.append(entry)
+        return due
+
+    def _next_fire_at(self):
+        while self._firing:
+            if self._live(self._firing[0]) and not self._firing[0][2].fired:
+                return self._firing[0][0]
+            heapq.heappop(self._firing)
+        return None
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while True:
+                    now = self.clock()
+                    due = self._take_due(now)
+                    if due:
+                        break
+                    fire_at = self._next_fire_at()
+                    timeout = MAX_SLEEP_SECONDS if fire_at is None else \
+                        min(MAX_SLEEP_SECONDS, max((fire_at - now).total_seconds(), 0.01))
+                    self._condition.wait(timeout)
+
+            try:
+                self.fire(due)
+                self.fired += len(due)
+            except Exception as e:
+                print(f"Error firing reminders: {str(e)}")
+                retry_at = self.clock() + datetime.timedelta(seconds=RETRY_SECONDS)
+                with self._condition:
+                    for entry in due:
+                        if self._entries.get(entry.key) is entry:
+                            entry.fired = False
+                            heapq.heappush(self._firing, (retry_at, next(self._sequence), entry))
+
+    def start(self):
+        with self._condition:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name='reminder-scheduler', daemon=True)
+                self._worker.start()
+
+    def stats(self):
+        with self._condition:
+            fire_at = self._next_fire_at()
+            return {
+                'scheduled': len(self._entries),
+                'pending': sum(1 for entry in self._entries.values() if not entry.fired),
+                'fired': self.fired,
+                'next_fire_at': fire_at.isoformat() if fire_at else None
+            }
@@ -0,0 +1,92 @@
+"""
+LRU + TTL cache for AI assistant responses
+"""
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from ai_config import RESPONSE_CACHE
+
+# Profile and vitals fields that end up in the prompt (see PromptBuilder.build)
+PROFILE_FIELDS = ("name", "age", "medical_history", "mood_history")
+HEALTH_FIELDS = ("heart_rate", "blood_pressure", "oxygen_level",
+                 "temperature", "pain_level", "mood", "notes")
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query):
+    """Lowercase, drop punctuation and collapse whitespace"""
+    query = _PUNCTUATION.sub(" ", (query or "").lower())
+    return _WHITESPACE.sub(" ", query).strip()
+
+
+def context_fingerprint(user_data, health_data=None, turns=None):
+    """Hash the parts of the user/health context and conversation the prompt depends on"""
+    relevant = {
+        "user": {field: user_data.get(field) for field in PROFILE_FIELDS},
+        "health": {field: health_data.get(field) for field in HEALTH_FIELDS} if health_data else None,
+        "turns": [[turn.get("query"), turn.get("response")] for turn in turns] if turns else None
+    }
+    encoded = json.dumps(relevant, sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+class ResponseCache:
+    def __init__(self, max_entries=None, ttl=None):
+        self.max_entries = max_entries or RESPONSE_CACHE["max_entries"]
+        self.ttl = ttl if ttl is not None else RESPONSE_CACHE["ttl"]
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def make_key(self, query, user_data, health_data=None, turns=None):
+        return f"{context_fingerprint(user_data, health_data, turns)}:{normalize_query(query)}"
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
@@ -0,0 +1,281 @@
+"""
+Health risk model: training, versioned artifacts and batched inference.
+
+Artifacts live in models/health_risk/<version>/ as an uncompressed joblib
+pipeline (so its arrays can be memory-mapped at load) plus metadata.json
+with the feature schema and evaluation metrics. models/health_risk/LATEST
+names the version the server loads.
+
+Usage:
+    python risk_model.py train [--data data/health_monitoring.csv]
+    python risk_model.py info
+"""
+import argparse
+import datetime
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+from metrics import stage
+
+MODELS_DIR = os.getenv('RISK_MODEL_DIR', os.path.join('models', 'health_risk'))
+DEFAULT_TRAINING_DATA = os.path.join('data', 'health_monitoring.csv')
+RISK_THRESHOLD = 0.7
+
+# Feature schema of models trained from the device export
+FEATURES = ['heart_rate', 'systolic_bp', 'diastolic_bp', 'glucose_level', 'oxygen_level']
+LABEL = 'alert_triggered'
+
+
+def feature_frame(df, features):
+    """
+    Pull the schema's features out of a readings DataFrame, deriving blood
+    pressure parts from "120/80"-style strings when needed. Values that
+    can't be read become NaN.
+    """
+    import numpy as np
+    import pandas as pd
+
+    columns = {}
+    if ('systolic_bp' in features or 'diastolic_bp' in features) and 'systolic_bp' not in df.columns:
+        pressure = df['blood_pressure'] if 'blood_pressure' in df.columns else pd.Series(index=df.index, dtype=object)
+        parts = pressure.astype('string').str.extract(r'(\d+)\s*/\s*(\d+)')
+        columns['systolic_bp'], columns['diastolic_bp'] = parts[0], parts[1]
+    for feature in features:
+        values = columns.get(feature, df[feature] if feature in df.columns else np.nan)
+        columns[feature] = pd.to_numeric(pd.Series(values, index=df.index), errors='coerce')
+    return pd.DataFrame({feature: columns[feature] for feature in features}, index=df.index)
+
+
+class RiskModel:
+    def __init__(self, pipeline, metadata):
+        self.pipeline = pipeline
+        self.metadata = metadata
+        self.features = metadata['features']
+        self.version = metadata['version']
+
+    def predict_risk(self, df):
+        """Probability of an alert for every row; NaN where features are missing"""
+        import numpy as np
+
+        with stage('model_inference'):
+            features = feature_frame(df, self.features)
+            complete = features.notna().all(axis=1).to_numpy()
+            risk = np.full(len(df), np.nan)
+            if complete.any():
+                risk[complete] = self.pipeline.predict_proba(features.to_numpy(dtype=float)[complete])[:, 1]
+        return risk
+
+
+class MicroBatcher:
+    """
+    Groups concurrent single-reading predictions into one predict_proba call.
+    A batch closes when it reaches max_batch rows or max_wait seconds after
+    its first request.
+    """
+
+    def __init__(self, model, max_batch=64, max_wait=0.005):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._pending = []
+        self._condition = threading.Condition()
+        self._worker = None
+        self.batches = 0
+        self.requests = 0
+
+    @property
+    def version(self):
+        return self.model.version
+
+    def predict_risk(self, df):
+        future = Future()
+        with self._condition:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name='risk-batcher', daemon=True)
+                self._worker.start()
+            self._pending.append((df, future))
+            self._condition.notify()
+        return future.result()
+
+    def _run(self):
+        import pandas as pd
+
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+                deadline = time.monotonic() + self.max_wait
+                while sum(len(df) for df, _ in self._pending) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                batch, self._pending = self._pending, []
+
+            try:
+                risk = self.model.predict_risk(pd.concat([df for df, _ in batch], ignore_index=True))
+                with self._condition:
+                    self.batches += 1
+                    self.requests += len(batch)
+                offset = 0
+                for df, future in batch:
+                    future.set_result(risk[offset:offset + len(df)])
+                    offset += len(df)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+
+    def stats(self):
+        with self._condition:
+            batches, requests = self.batches, self.requests
+        return {
+            'version': self.model.version,
+            'batches': batches,
+            'requests': requests,
+            'avg_batch_size': round(requests / batches, 2) if batches else 0.0
+        }
+
+
+def load_training_data(path):
+    import pandas as pd
+    from data_loader import parse_blood_pressure, parse_yes_no
+
+    df = pd.read_csv(path, dtype=str)
+    systolic, diastolic = parse_blood_pressure(df['Blood Pressure'])
+    data = pd.DataFrame({
+        'heart_rate': pd.to_numeric(df['Heart Rate'], errors='coerce'),
+        'systolic_bp': systolic,
+        'diastolic_bp': diastolic,
+        'glucose_level': pd.to_numeric(df['Glucose Levels'], errors='coerce'),
+        'oxygen_level': pd.to_numeric(df['Oxygen Saturation (SpO₂%)'], errors='coerce'),
+        LABEL: parse_yes_no(df['Alert Triggered (Yes/No)'])
+    }).dropna()
+    return data[FEATURES].astype(float), data[LABEL].astype(int)
+
+
+def train(data_path=DEFAULT_TRAINING_DATA, models_dir=MODELS_DIR, random_state=42):
+    """Fit a model, write it as a new version and point LATEST at it"""
+    import joblib
+    import sklearn
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.metrics import accuracy_score, roc_auc_score
+    from sklearn.model_selection import train_test_split
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import StandardScaler
+
+    features, labels = load_training_data(data_path)
+    x_train, x_test, y_train, y_test = train_test_split(
+        features.to_numpy(), labels.to_numpy(), test_size=0.2,
+        random_state=random_state, stratify=labels)
+
+    pipeline = make_pipeline(
+        StandardScaler(),
+        RandomForestClassifier(n_estimators=100, max_depth=12, n_jobs=1, random_state=random_state)
+    )
+    pipeline.fit(x_train, y_train)
+    probabilities = pipeline.predict_proba(x_test)[:, 1]
+
+    version = datetime.datetime.utcnow().strftime('%Y%m%d%H%M%S')
+    metadata = {
+        'version': version,
+        'created_at': datetime.datetime.utcnow().isoformat(),
+        'features': FEATURES,
+        'label': LABEL,
+        'threshold': RISK_THRESHOLD,
+        'training_data': data_path,
+        'training_rows': int(len(x_train)),
+        'metrics': {
+            'accuracy': round(float(accuracy_score(y_test, probabilities >= 0.5)), 4),
+            'roc_auc': round(float(roc_auc_score(y_test, probabilities)), 4)
+        },
+        'sklearn_version': sklearn.__version__
+    }
+
+    version_dir = os.path.join(models_dir, version)
+    os.makedirs(version_dir, exist_ok=True)
+    # Uncompressed so the arrays can be memory-mapped when loading
+    joblib.dump(pipeline, os.path.join(version_dir, 'model.joblib'))
+    with open(os.path.join(version_dir, 'metadata.json'), 'w') as f:
+        json.dump(metadata, f, indent=2)
+
+    latest_tmp = os.path.join(models_dir, 'LATEST.tmp')
+    with open(latest_tmp, 'w') as f:
+        f.write(version)
+    os.replace(latest_tmp, os.path.join(models_dir, 'LATEST'))
+    return metadata
+
+
+def load_model(models_dir=MODELS_DIR, version=None):
+    """Load a model version (LATEST by default), or None if none is trained"""
+    import joblib
+    import pandas as pd
+
+    if version is None:
+        try:
+            with open(os.path.join(models_dir, 'LATEST')) as f:
+                version = f.read().strip()
+        except FileNotFoundError:
+            return None
+
+    version_dir = os.path.join(models_dir, version)
+    with open(os.path.join(version_dir, 'metadata.json')) as f:
+        metadata = json.load(f)
+    pipeline = joblib.load(os.path.join(version_dir, 'model.joblib'), mmap_mode='r')
+
+    model = RiskModel(pipeline, metadata)
+    # Pay for the first-call overhead now rather than on a request
+    model.predict_risk(pd.DataFrame([{feature: 0.0 for feature in model.features}]))
+    return model
+
+
+class LazyRiskModel:
+    """
+    The latest risk model and its batcher, loaded on first use so that
+    scikit-learn and pandas stay out of server startup. preload() loads them
+    on a background thread; requests that need the model meanwhile wait for it.
+    """
+
+    def __init__(self, loader=load_model):
+        self.loader = loader
+        self.model = None
+        self.batcher = None
+        self.loaded = False
+        self._lock = threading.Lock()
+
+    def get(self):
+        if not self.loaded:
+            with self._lock:
+                if not self.loaded:
+                    try:
+                        self.model = self.loader()
+                    except Exception as e:
+                        print(f"Error loading risk model: {str(e)}")
+                    if self.model is None:
+                        print("No trained risk model; run `python risk_model.py train` to enable AI risk alerts")
+                    else:
+                        self.batcher = MicroBatcher(self.model)
+                    self.loaded = True
+        return self
+
+    def preload(self):
+        threading.Thread(target=self.get, name='risk-model-loader', daemon=True).start()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Health risk model tools')
+    subcommands = parser.add_subparsers(dest='command', required=True)
+    train_parser = subcommands.add_parser('train', help='train and store a new model version')
+    train_parser.add_argument('--data', default=DEFAULT_TRAINING_DATA)
+    train_parser.add_argument('--out', default=MODELS_DIR)
+    info_parser = subcommands.add_parser('info', help='show the current model version')
+    info_parser.add_argument('--dir', default=MODELS_DIR)
+    args = parser.parse_args()
+
+    if args.command == 'train':
+        print(json.dumps(train(args.data, args.out), indent=2))
+    else:
+        model = load_model(args.dir)
+        print(json.dumps(model.metadata, indent=2) if model else 'No trained model found')
@@ -0,0 +1,155 @@
+"""
+Per-user time-series rollups of health readings.
+
+Every ingested reading is folded into min/max/sum/count/last aggregates for
+1-minute, 1-hour and 1-day buckets, so charts read a bounded number of
+rollup rows instead of scanning raw history. Buckets older than their
+resolution's ROLLUP_RETENTION_DAYS are pruned, so the table stays bounded.
+"""
+import datetime
+
+from sqlalchemy import case, func
+from sqlalchemy.dialects.sqlite import insert
+
+from ai_config import ROLLUP_RETENTION_DAYS
+
+ROLLUP_METRICS = (
+    'heart_rate', 'oxygen_level', 'temperature', 'glucose_level',
+    'sleep_hours', 'pain_level', 'mood', 'health_score'
+)
+
+# resolution name -> bucket width in seconds, finest first
+RESOLUTIONS = {
+    '1m': 60,
+    '1h': 3600,
+    '1d': 86400
+}
+
+DEFAULT_MAX_POINTS = 500
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+
+def bucket_start(timestamp, seconds):
+    offset = int((timestamp - _EPOCH).total_seconds()) // seconds * seconds
+    return _EPOCH + datetime.timedelta(seconds=offset)
+
+
+def aggregate_readings(readings):
+    """
+    Fold reading dicts (with user_id and timestamp) into per-bucket partial
+    aggregates, so a batch touches each rollup row once.
+    """
+    buckets = {}
+    resolutions = list(RESOLUTIONS.items())
+    for reading in readings:
+        timestamp = reading['timestamp']
+        epoch_seconds = int((timestamp - _EPOCH).total_seconds())
+        starts = [(resolution, epoch_seconds // seconds * seconds) for resolution, seconds in resolutions]
+        user_id = reading['user_id']
+        for metric in ROLLUP_METRICS:
+            value = reading.get(metric)
+            if value is None:
+                continue
+            value = float(value)
+            for resolution, start in starts:
+                key = (user_id, metric, resolution, start)
+                agg = buckets.get(key)
+                if agg is None:
+                    buckets[key] = [1, value, value, value, value, timestamp]
+                    continue
+                agg[0] += 1
+                agg[1] += value
+                if value < agg[2]:
+                    agg[2] = value
+                if value > agg[3]:
+                    agg[3] = value
+                if timestamp >= agg[5]:
+                    agg[4], agg[5] = value, timestamp
+    return buckets
+
+
+def update_rollups(session, model, readings):
+    """Merge a batch of readings into the rollup table inside the caller's transaction"""
+    buckets = aggregate_readings(readings)
+    if not buckets:
+        return 0
+
+    rows = [{
+        'user_id': user_id,
+        'metric': metric,
+        'resolution': resolution,
+        'bucket_start': _EPOCH + datetime.timedelta(seconds=start),
+        'count': count,
+        'sum_value': total,
+        'min_value': minimum,
+        'max_value': maximum,
+        'last_value': last,
+        'last_timestamp': last_timestamp
+    } for (user_id, metric, resolution, start), (count, total, minimum, maximum, last, last_timestamp)
+        in buckets.items()]
+
+    statement = insert(model.__table__)
+    excluded = statement.excluded
+    table = model.__table__.c
+    statement = statement.on_conflict_do_update(
+        index_elements=['user_id', 'metric', 'resolution', 'bucket_start'],
+        set_={
+            'count': table.count + excluded.count,
+            'sum_value': table.sum_value + excluded.sum_value,
+            'min_value': func.min(table.min_value, excluded.min_value),
+            'max_value': func.max(table.max_value, excluded.max_value),
+            'last_value': case(
+                (excluded.last_timestamp >= table.last_timestamp, excluded.last_value),
+                else_=table.last_value
+            ),
+            'last_timestamp': func.max(table.last_timestamp, excluded.last_timestamp)
+        }
+    )
+    session.execute(statement, rows)
+    return len(rows)
+
+
+def retained_since(resolution, now=None):
+    """Oldest bucket start a resolution still keeps, or None if it keeps everything"""
+    days = ROLLUP_RETENTION_DAYS.get(resolution)
+    if days is None:
+        return None
+    return (now or datetime.datetime.utcnow()) - datetime.timedelta(days=days)
+
+
+def choose_resolution(since, until, max_points=DEFAULT_MAX_POINTS, now=None):
+    """
+    Finest resolution that covers the range in at most max_points buckets
+    and still keeps buckets as old as since
+    """
+    span = max((until - since).total_seconds(), 1)
+    for resolution, seconds in RESOLUTIONS.items():
+        oldest = retained_since(resolution, now)
+        if span / seconds <= max_points and (oldest is None or since >= oldest):
+            return resolution
+    return list(RESOLUTIONS)[-1]
+
+
+def prune_rollups(conn, batch_rows=50000, now=None):
+    """
+    Delete buckets older than their resolution's retention through a
+    sqlite3 connection, a batch per transaction; returns rows deleted per
+    resolution
+    """
+    deleted = {}
+    for resolution in RESOLUTIONS:
+        oldest = retained_since(resolution, now)
+        if oldest is None:
+            continue
+        deleted[resolution] = 0
+        while True:
+            cursor = conn.execute('''
+                DELETE FROM health_rollup WHERE id IN (
+                    SELECT id FROM health_rollup WHERE resolution = ? AND bucket_start < ? LIMIT ?)''',
+                (resolution, oldest.strftime('%Y-%m-%d %H:%M:%S'), batch_rows))
+            conn.commit()
+            deleted[resolution] += cursor.rowcount
+            if cursor.rowcount < batch_rows:
+                break
+    return deleted
@@ -0,0 +1,277 @@
+"""
+Streaming fall and inactivity detection over device safety events.
+
+Each device gets a small fixed-size state: its current movement activity
+and location, when it last moved, any open fall episode and the times of
+its recent falls. Events are folded into that state one at a time and
+alerts come out as soon as a rule fires, so nothing has to re-read the
+safety history. Time is taken from the events themselves; sweep() advances
+it for devices that have gone quiet.
+"""
+import collections
+import datetime
+import threading
+
+from ai_config import ALERT_THRESHOLDS
+
+# Activities that mean the resident isn't moving
+STILL_ACTIVITIES = {'lying', 'no movement'}
+
+# Post-fall inactivity the device reports that makes a fall critical
+LONG_LIE_SECONDS = 300
+# Two falls this close together are reported as a repeated-fall pattern
+REPEAT_FALL_WINDOW_SECONDS = 24 * 3600
+FALL_HISTORY = 4
+
+MAX_DEVICES = 50000
+# Devices silent for this long are dropped on sweep
+DEVICE_STATE_TTL_SECONDS = 24 * 3600
+
+IMPACT_LEVELS = {'low': 'Low', 'medium': 'Medium', 'high': 'High'}
+YES_VALUES = {'1', 'yes', 'true'}
+
+
+class DeviceState:
+    __slots__ = ('user_id', 'activity', 'location', 'last_seen', 'last_movement_at',
+                 'fall_at', 'falls', 'inactivity_level')
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.activity = None
+        self.location = None
+        self.last_seen = None
+        self.last_movement_at = None
+        self.fall_at = None
+        self.falls = collections.deque(maxlen=FALL_HISTORY)
+        # Highest inactivity threshold already alerted on for this still period
+        self.inactivity_level = 0
+
+    @property
+    def still(self):
+        return self.activity in STILL_ACTIVITIES
+
+    def summary(self):
+        return {
+            'user_id': self.user_id,
+            'activity': self.activity,
+            'location': self.location,
+            'last_seen': self.last_seen.isoformat() if self.last_seen else None,
+            'last_movement_at': self.last_movement_at.isoformat() if self.last_movement_at else None,
+            'open_fall': self.fall_at.isoformat() if self.fall_at else None
+        }
+
+
+def parse_event(raw, default_user_id=None, now=None):
+    """
+    Validate one device event dict into the normalized form the processor
+    and the safety_data table use. Raises ValueError for unusable events.
+    """
+    device_id = str(raw.get('device_id') or '').strip()
+    if not device_id:
+        raise ValueError('device_id is required')
+
+    user_id = raw.get('user_id', default_user_id)
+    if user_id is None:
+        raise ValueError('user_id is required')
+
+    timestamp = raw.get('timestamp')
+    if timestamp:
+        timestamp = datetime.datetime.fromisoformat(str(timestamp).replace('Z', '+00:00'))
+        if timestamp.tzinfo:
+            timestamp = timestamp.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    else:
+        timestamp = now or datetime.datetime.utcnow()
+
+    activity = str(raw.get('movement_activity') or '').strip()
+    if not activity:
+        raise ValueError('movement_activity is required')
+
+    impact = raw.get('impact_force_level')
+    impact = IMPACT_LEVELS.get(str(impact).strip().lower()) if impact is not None else None
+
+    return {
+        'device_id': device_id,
+        'user_id': int(user_id),
+        'timestamp': timestamp,
+        'movement_activity': activity,
+        'fall_detected': str(raw.get('fall_detected', '')).strip().lower() in YES_VALUES,
+        'impact_force_level': impact,
+        'inactivity_seconds': int(raw.get('inactivity_seconds') or 0),
+        'location': raw.get('location')
+    }
+
+
+def _alert(state, device_id, alert_type, priority, message, timestamp):
+    return {
+        'device_id': device_id,
+        'user_id': state.user_id,
+        'type': alert_type,
+        'priority': priority,
+        'message': message,
+        'event_timestamp': timestamp
+    }
+
+
+def _duration(seconds):
+    return f"{seconds} s" if seconds < 60 else f"{seconds // 60} min"
+
+
+def _where(state):
+    return f" in the {state.location.lower()}" if state.location else ''
+
+
+class SafetyProcessor:
+    def __init__(self, max_devices=MAX_DEVICES, thresholds=None):
+        self.max_devices = max_devices
+        thresholds = thresholds or ALERT_THRESHOLDS['inactivity_duration']
+        # (level, seconds, priority), lowest first
+        self.inactivity_levels = [
+            (1, thresholds['warning'], 'high'),
+            (2, thresholds['critical'], 'critical')
+        ]
+        self._devices = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.events = 0
+        self.alerts = 0
+        self.evicted = 0
+
+    def _state(self, device_id, user_id):
+        state = self._devices.get(device_id)
+        if state is None:
+            state = self._devices[device_id] = DeviceState(user_id)
+            while len(self._devices) > self.max_devices:
+                self._devices.popitem(last=False)
+                self.evicted += 1
+        else:
+            self._devices.move_to_end(device_id)
+            state.user_id = user_id
+        return state
+
+    def process(self, events):
+        """Fold parsed events into device state; returns the alerts they raise"""
+        alerts = []
+        with self._lock:
+            for event in events:
+                alerts.extend(self._process_one(event))
+            self.events += len(events)
+            self.alerts += len(alerts)
+        return alerts
+
+    def _process_one(self, event):
+        device_id = event['device_id']
+        state = self._state(device_id, event['user_id'])
+        timestamp = event['timestamp']
+        # Late events still update state, but never move the device's clock back
+        now = max(timestamp, state.last_seen) if state.last_seen else timestamp
+        state.last_seen = now
+        state.activity = event['movement_activity'].strip().lower()
+        if event.get('location'):
+            state.location = event['location']
+        inactive_for = event['inactivity_seconds']
+        alerts = []
+
+        if state.still:
+            still_since = timestamp - datetime.timedelta(seconds=inactive_for)
+            if state.last_movement_at is None or still_since < state.last_movement_at:
+                state.last_movement_at = still_since
+        else:
+            # Moving again: any fall episode is over
+            state.last_movement_at = timestamp
+            state.fall_at = None
+            state.inactivity_level = 0
+
+        if event['fall_detected']:
+            state.fall_at = timestamp - datetime.timedelta(seconds=inactive_for)
+            state.falls.append(state.fall_at)
+            impact = event['impact_force_level']
+            long_lie = inactive_for >= LONG_LIE_SECONDS
+            message = f"Fall detected{_where(state)}"
+            if impact:
+                message += f" ({impact.lower()} impact)"
+            if inactive_for:
+                message += f", no movement for {_duration(inactive_for)} since"
+            alerts.append(_alert(state, device_id, 'fall',
+                                 'critical' if impact == 'High' or long_lie else 'high',
+                                 message, timestamp))
+
+            recent = [fall for fall in state.falls
+                      if (state.fall_at - fall).total_seconds() <= REPEAT_FALL_WINDOW_SECONDS]
+            if len(recent) >= 2:
+                alerts.append(_alert(state, device_id, 'repeated_falls', 'high',
+                                     f"{len(recent)} falls within 24 hours{_where(state)}", timestamp))
+
+        alerts.extend(self._check_inactivity(device_id, state, now))
+        return alerts
+
+    def _check_inactivity(self, device_id, state, now):
+        if not state.still or state.last_movement_at is None:
+            return []
+        idle = (now - state.last_movement_at).total_seconds()
+        for level, seconds, priority in reversed(self.inactivity_levels):
+            if idle >= seconds:
+                if level <= state.inactivity_level:
+                    return []
+                state.inactivity_level = level
+                message = f"No movement for {int(idle // 60)} minutes{_where(state)}"
+                if state.fall_at:
+                    message += " since a fall"
+                return [_alert(state, device_id, 'inactivity', priority, message, now)]
+        return []
+
+    def sweep(self, now=None):
+        """
+        Check inactivity for devices that have stopped sending events, as of
+        now, and drop devices that have been silent too long.
+        """
+        now = now or datetime.datetime.utcnow()
+        alerts = []
+        with self._lock:
+            for device_id, state in list(self._devices.items()):
+                if (now - state.last_seen).total_seconds() > DEVICE_STATE_TTL_SECONDS:
+                    del self._devices[device_id]
+                    self.evicted += 1
+                    continue
+                alerts.extend(self._check_inactivity(device_id, state, now))
+            self.alerts += len(alerts)
+        return alerts
+
+    def device(self, device_id):
+        with self._lock:
+            state = self._devices.get(device_id)
+            return state.summary() if state else None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'devices': len(self._devices),
+                'events': self.events,
+                'alerts': self.alerts,
+                'evicted': self.evicted
+            }
+
+
+def read_safety_csv(path, user_id):
+    """Events from a safety_monitoring.csv export, oldest first"""
+    import pandas as pd
+    from data_loader import CSV_TIMESTAMP_FORMAT, parse_yes_no
+
+    df = pd.read_csv(path, dtype=str)
+    timestamps = pd.to_datetime(df['Timestamp'], format=CSV_TIMESTAMP_FORMAT, errors='coerce')
+    impact = df['Impact Force Level'].str.strip()
+    frame = pd.DataFrame({
+        'device_id': df['Device-ID/User-ID'].str.strip(),
+        'user_id': user_id,
+        'timestamp': timestamps,
+        'movement_activity': df['Movement Activity'].str.strip(),
+        'fall_detected': parse_yes_no(df['Fall Detected (Yes/No)']).fillna(0).astype(bool),
+        'impact_force_level': impact.where(impact != '-'),
+        'inactivity_seconds': pd.to_numeric(
+            df['Post-Fall Inactivity Duration (Seconds)'], errors='coerce').fillna(0).astype(int),
+        'location': df['Location'].str.strip()
+    }).dropna(subset=['device_id', 'timestamp', 'movement_activity'])
+    frame = frame.sort_values('timestamp', kind='stable')
+    frame = frame.astype(object).where(frame.notna(), None)
+    events = frame.to_dict(orient='records')
+    for event in events:
+        event['timestamp'] = event['timestamp'].to_pydatetime()
+    return events
@@ -0,0 +1,163 @@
+"""
+Per-user chat sessions for the assistant.
+
+Each session keeps the last few conversation turns and health alerts in
+fixed-size ring buffers, plus the `context` token array Ollama returned for
+the latest turn. A follow-up sends that array back so the model continues
+from where it stopped instead of re-reading the conversation. Sessions idle
+for longer than the TTL are evicted, the number held is capped, and with a
+database path configured sessions are written through to SQLite so they
+survive restarts and eviction.
+"""
+import collections
+import json
+import sqlite3
+import threading
+import time
+from array import array
+
+from ai_config import SESSION_CONFIG
+
+
+class Session:
+    def __init__(self, user_id, turns=(), alerts=(), ollama_context=None, max_turns=None, max_alerts=None,
+                 ollama_model=None):
+        self.user_id = user_id
+        self.turns = collections.deque(turns, maxlen=max_turns or SESSION_CONFIG["max_turns"])
+        self.alerts = collections.deque(alerts, maxlen=max_alerts or SESSION_CONFIG["max_alerts"])
+        self.ollama_context = ollama_context
+        # Model that produced the context; its tokens mean nothing to another model
+        self.ollama_model = ollama_model
+        # Vitals sent with the last turn; a follow-up repeats them only if they changed
+        self.last_vitals = None
+        self.last_active = time.monotonic()
+        # Turns of one user run one at a time so the context array stays consistent
+        self.lock = threading.Lock()
+
+    def add_turn(self, query, response, ollama_context=None, ollama_model=None):
+        self.turns.append({'timestamp': time.time(), 'query': query, 'response': response})
+        if ollama_context and len(ollama_context) <= SESSION_CONFIG["max_context_tokens"]:
+            self.ollama_context = list(ollama_context)
+            self.ollama_model = ollama_model
+        else:
+            # Too long to keep extending (or not returned): the next turn
+            # starts fresh from the recent turns instead
+            self.ollama_context = None
+            self.ollama_model = None
+
+    def add_alert(self, alert):
+        self.alerts.append(alert)
+
+    def summary(self):
+        return {
+            'user_id': self.user_id,
+            'turns': list(self.turns),
+            'alerts': list(self.alerts),
+            'context_tokens': len(self.ollama_context) if self.ollama_context else 0
+        }
+
+
+class SessionStore:
+    def __init__(self, path=None, idle_ttl=None, max_sessions=None):
+        self.idle_ttl = idle_ttl or SESSION_CONFIG["idle_ttl"]
+        self.max_sessions = max_sessions or SESSION_CONFIG["max_sessions"]
+        self._sessions = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.evicted = 0
+        self._db = None
+        self._db_lock = threading.Lock()
+        path = path if path is not None else SESSION_CONFIG["db_path"]
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute('''
+                CREATE TABLE IF NOT EXISTS chat_session (
+                    user_id INTEGER PRIMARY KEY,
+                    turns TEXT NOT NULL,
+                    alerts TEXT NOT NULL,
+                    ollama_context BLOB,
+                    updated_at REAL NOT NULL,
+                    ollama_model TEXT
+                )''')
+            columns = [row[1] for row in self._db.execute('PRAGMA table_info(chat_session)')]
+            if 'ollama_model' not in columns:
+                self._db.execute('ALTER TABLE chat_session ADD COLUMN ollama_model TEXT')
+            self._db.commit()
+
+    def get(self, user_id):
+        """The user's session, loaded from storage or created on first use"""
+        user_id = int(user_id)
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+            session = self._sessions.get(user_id)
+            if session is not None:
+                self._sessions.move_to_end(user_id)
+                session.last_active = now
+                return session
+
+        session = self._load(user_id) or Session(user_id)
+        with self._lock:
+            # Another request may have created it meanwhile
+            session = self._sessions.setdefault(user_id, session)
+            self._sessions.move_to_end(user_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evicted += 1
+        return session
+
+    def _evict_idle(self, now):
+        # The LRU order puts the longest idle sessions first
+        while self._sessions:
+            user_id, session = next(iter(self._sessions.items()))
+            if now - session.last_active < self.idle_ttl:
+                break
+            del self._sessions[user_id]
+            self.evicted += 1
+
+    def _load(self, user_id):
+        if self._db is None:
+            return None
+        with self._db_lock:
+            row = self._db.execute(
+                'SELECT turns, alerts, ollama_context, ollama_model FROM chat_session WHERE user_id = ?',
+                (user_id,)).fetchone()
+        if row is None:
+            return None
+        turns, alerts, packed, ollama_model = row
+        ollama_context = None
+        if packed:
+            ollama_context = array('i')
+            ollama_context.frombytes(packed)
+            ollama_context = ollama_context.tolist()
+        return Session(user_id, json.loads(turns), json.loads(alerts), ollama_context,
+                       ollama_model=ollama_model)
+
+    def save(self, session):
+        """Write a session through to storage, if persistence is enabled"""
+        if self._db is None:
+            return
+        packed = array('i', session.ollama_context).tobytes() if session.ollama_context else None
+        with self._db_lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO chat_session '
+                '(user_id, turns, alerts, ollama_context, updated_at, ollama_model) VALUES (?, ?, ?, ?, ?, ?)',
+                (session.user_id, json.dumps(list(session.turns)), json.dumps(list(session.alerts)),
+                 packed, time.time(), session.ollama_model))
+            self._db.commit()
+
+    def clear(self, user_id):
+        user_id = int(user_id)
+        with self._lock:
+            self._sessions.pop(user_id, None)
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute('DELETE FROM chat_session WHERE user_id = ?', (user_id,))
+                self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'sessions': len(self._sessions),
+                'evicted': self.evicted,
+                'persistent': self._db is not None
+            }
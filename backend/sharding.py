@@ -0,0 +1,232 @@
+"""
+Per-facility database shards.
+
+Every shard is a SQLite file of its own. It holds the per-resident tables:
+users, their readings with the rollups and baselines, reminders and alerts.
+Each shard has its own write lock and its own group-commit writer, so
+ingest from different shards never queues on one lock. Shard 0 is
+DATABASE_URL itself. It also keeps the user_shard directory, which records
+where each user lives, and the shared device-export tables. The directory
+allocates user ids, so they are unique across shards. Residents of one
+facility share a shard, and users without a facility are spread by id.
+
+db.session routes statements: one on a sharded table goes to the shard
+selected for the current app context, and anything else to shard 0. With
+SHARD_COUNT=1 there is nothing to look up and everything stays in shard 0.
+"""
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import sqlalchemy as sa
+from flask import g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql.util import find_tables
+
+import storage
+from ai_config import SHARD_CONFIG, STORAGE_CONFIG
+
+SHARDED_TABLES = frozenset({'user', 'health_data', 'health_rollup', 'health_baseline', 'reminder', 'alert'})
+
+
+def bind_key(shard):
+    # Shard 0 is the default bind
+    return f'shard{shard}' if shard else None
+
+
+def shard_url(uri, shard, template=None):
+    """URL of a shard: sqlite:///elderly_care.db has sqlite:///elderly_care.shard2.db as shard 2"""
+    template = template or SHARD_CONFIG["url_template"]
+    if not shard:
+        return uri
+    if template:
+        return template.format(n=shard)
+    base, dot, extension = uri.rpartition('.')
+    if not dot or '/' in extension:
+        return f'{uri}.shard{shard}'
+    return f'{base}.shard{shard}.{extension}'
+
+
+def binds(uri, count=None):
+    """SQLALCHEMY_BINDS for shards 1 and up"""
+    count = count or SHARD_CONFIG["count"]
+    return {bind_key(shard): shard_url(uri, shard) for shard in range(1, count)}
+
+
+def place(user_id, facility=None, count=None):
+    """The shard for a user: their facility's, or by user id if they have none"""
+    count = count or SHARD_CONFIG["count"]
+    if facility:
+        return zlib.crc32(facility.strip().lower().encode('utf-8')) % count
+    return user_id % count
+
+
+def current():
+    """The shard db.session sends sharded tables to in this app context"""
+    return g.get('shard', 0) if has_app_context() else 0
+
+
+def _is_sharded(mapper, clause):
+    if mapper is not None and sa.inspect(mapper).local_table.name in SHARDED_TABLES:
+        return True
+    return clause is not None and any(table.name in SHARDED_TABLES
+                                      for table in find_tables(clause, include_crud=True))
+
+
+class ShardedSession(Session):
+    """Flask-SQLAlchemy session that sends the sharded tables to the current shard"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            shard = current()
+            if shard and _is_sharded(mapper, clause):
+                return self._db.engines[bind_key(shard)]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class ShardRouter:
+    """
+    Finds each user's shard, switches db.session between shards, and owns
+    one WriteQueue per shard
+    """
+
+    def __init__(self, app, db, count=None):
+        self.app = app
+        self.db = db
+        self.count = count or SHARD_CONFIG["count"]
+        self._shards = {}
+        self._lock = threading.Lock()
+        self.writers = [storage.WriteQueue(lambda shard=shard: self.context(shard), lambda: db.session,
+                                           name=f'db-writer-{shard}')
+                        for shard in range(self.count)]
+        self._fan_out_pool = (ThreadPoolExecutor(max_workers=self.count, thread_name_prefix='shard-fan-out')
+                              if self.count > 1 else None)
+
+    def engine(self, shard):
+        return self.db.engines[bind_key(shard)]
+
+    def check_directory(self):
+        """Refuse to start with fewer shards than the directory has users on"""
+        with self.engine(0).connect() as conn:
+            highest = conn.execute(sa.text('SELECT MAX(shard) FROM user_shard')).scalar()
+        if highest is not None and highest >= self.count:
+            raise RuntimeError(f"Users live on shard {highest}, but SHARD_COUNT is {self.count}")
+
+    def shard_of(self, user_id):
+        """The user's shard; 0 for a user the directory doesn't know"""
+        if self.count == 1 or user_id is None:
+            return 0
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            return 0
+        shard = self._shards.get(user_id)
+        if shard is None:
+            with self.engine(0).connect() as conn:
+                shard = conn.execute(sa.text('SELECT shard FROM user_shard WHERE user_id = :user_id'),
+                                     {'user_id': user_id}).scalar()
+            if shard is None:
+                # Not cached: the user may still be registered
+                return 0
+            with self._lock:
+                self._shards[user_id] = shard
+        return shard
+
+    def find(self, username):
+        """(user_id, shard) for a username, or None"""
+        with self.engine(0).connect() as conn:
+            row = conn.execute(sa.text('SELECT user_id, shard FROM user_shard WHERE username = :username'),
+                               {'username': username}).first()
+        return tuple(row) if row else None
+
+    def register(self, username, facility=None):
+        """
+        Allocate a user id in the directory and place the user on a shard;
+        returns (user_id, shard). Raises IntegrityError if the username is taken.
+        """
+        with self.engine(0).begin() as conn:
+            user_id = conn.execute(sa.text(
+                'INSERT INTO user_shard (username, shard, facility) VALUES (:username, 0, :facility)'
+            ), {'username': username, 'facility': facility}).lastrowid
+            shard = place(user_id, facility, self.count)
+            if shard:
+                conn.execute(sa.text('UPDATE user_shard SET shard = :shard WHERE user_id = :user_id'),
+                             {'shard': shard, 'user_id': user_id})
+        with self._lock:
+            self._shards[user_id] = shard
+        return user_id, shard
+
+    def unregister(self, user_id):
+        """Give up an id from register() whose user couldn't be created"""
+        with self.engine(0).begin() as conn:
+            conn.execute(sa.text('DELETE FROM user_shard WHERE user_id = :user_id'), {'user_id': user_id})
+        with self._lock:
+            self._shards.pop(user_id, None)
+
+    @contextmanager
+    def use(self, shard):
+        """Send db.session's sharded statements to a shard inside the block"""
+        previous = g.get('shard', 0)
+        g.shard = shard
+        try:
+            yield
+        finally:
+            g.shard = previous
+
+    def use_user(self, user_id):
+        return self.use(self.shard_of(user_id))
+
+    def route(self, user_id):
+        """Send the rest of this request to the user's shard"""
+        g.shard = self.shard_of(user_id)
+
+    @contextmanager
+    def context(self, shard):
+        """A new app context routed to a shard, for background threads"""
+        with self.app.app_context():
+            g.shard = shard
+            yield
+
+    def writer(self, user_id):
+        """The WriteQueue of the user's shard"""
+        return self.writers[self.shard_of(user_id)]
+
+    def split(self, items, user_id):
+        """{shard: [items]}, user_id(item) giving each item's user"""
+        groups = {}
+        for item in items:
+            groups.setdefault(self.shard_of(user_id(item)), []).append(item)
+        return groups
+
+    def write_each(self, groups, job):
+        """
+        Commit job(shard, items) for every group from split() on its own
+        shard's writer, all at once; returns the jobs' results
+        """
+        futures = [self.writers[shard].submit(job(shard, items)) for shard, items in groups.items()]
+        return [future.result(STORAGE_CONFIG["write_timeout"]) for future in futures]
+
+    def fan_out(self, query):
+        """Run query(session) on every shard in parallel; returns [(shard, result)]"""
+        def run(shard):
+            with self.context(shard):
+                try:
+                    return query(self.db.session)
+                finally:
+                    self.db.session.remove()
+
+        if self._fan_out_pool is None:
+            return [(0, run(0))]
+        return list(enumerate(self._fan_out_pool.map(run, range(self.count))))
+
+    def flusher(self, name, flush):
+        for writer in self.writers:
+            writer.flusher(name, flush)
+
+    def start(self):
+        for writer in self.writers:
+            writer.start()
+
+    def stats(self):
+        return [dict(writer.stats(), shard=shard) for shard, writer in enumerate(self.writers)]
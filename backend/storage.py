@@ -0,0 +1,220 @@
+"""
+SQLite storage tuning: WAL, pragmas, a pooled engine and a group-commit writer.
+
+Connections run in WAL mode, so readers never wait for the writer and the
+writer never waits for readers. The engine keeps a pool of them, shared by
+the ORM and the raw-SQL routes. Writes from the request paths go through one
+writer thread instead of committing on their own. Writes that arrive while a
+commit is in progress, or within the short commit window, share the next
+transaction, so one fsync covers all of them. Rows the writes defer are sent
+as one bulk statement per kind for the whole batch. STORAGE_DURABILITY
+chooses what an acknowledged write survives.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from sqlalchemy import event
+
+from ai_config import STORAGE_CONFIG
+
+SYNCHRONOUS = {'full': 'FULL', 'normal': 'NORMAL', 'off': 'OFF'}
+
+
+def _is_file_sqlite(uri):
+    return uri.startswith('sqlite') and not (
+        uri in ('sqlite://', 'sqlite:///:memory:') or 'mode=memory' in uri)
+
+
+def engine_options(uri):
+    """SQLALCHEMY_ENGINE_OPTIONS for a database URI: a sized pool for SQLite files"""
+    if not _is_file_sqlite(uri):
+        return {}
+    return {
+        'pool_size': STORAGE_CONFIG["pool_size"],
+        'max_overflow': STORAGE_CONFIG["max_overflow"],
+        'connect_args': {
+            'check_same_thread': False,
+            'timeout': STORAGE_CONFIG["busy_timeout_ms"] / 1000
+        }
+    }
+
+
+def configure_connection(connection, durability=None):
+    """Apply the WAL and performance pragmas to a sqlite3 connection"""
+    durability = durability or STORAGE_CONFIG["durability"]
+    if durability not in SYNCHRONOUS:
+        raise ValueError(f"STORAGE_DURABILITY must be one of {', '.join(SYNCHRONOUS)}")
+    cursor = connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute(f'PRAGMA synchronous={SYNCHRONOUS[durability]}')
+    cursor.execute(f'PRAGMA busy_timeout={STORAGE_CONFIG["busy_timeout_ms"]}')
+    cursor.execute(f'PRAGMA cache_size=-{STORAGE_CONFIG["cache_size_kb"]}')
+    cursor.execute('PRAGMA temp_store=MEMORY')
+    cursor.execute(f'PRAGMA mmap_size={STORAGE_CONFIG["mmap_size"]}')
+    cursor.close()
+
+
+def tune_engine(engine):
+    """Configure every new connection of a SQLite file engine"""
+    if not _is_file_sqlite(str(engine.url)):
+        return
+
+    @event.listens_for(engine, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        configure_connection(dbapi_connection)
+
+
+def defer(session, name, rows):
+    """
+    From inside a write job: add rows to the bulk statement that the
+    flusher registered under name runs once per group commit, just before
+    it commits
+    """
+    session.info.setdefault('deferred', {}).setdefault(name, []).extend(rows)
+
+
+class _JobFailed(Exception):
+    def __init__(self, index, error):
+        super().__init__(str(error))
+        self.index = index
+        self.error = error
+
+
+class WriteQueue:
+    """
+    Single writer thread with group commit. A job is fn(session). It adds or
+    changes rows and returns plain data, since ORM objects expire once
+    committed. A job that raises is dropped and the rest of its batch is
+    retried without it, so one bad write never fails the others.
+    """
+
+    def __init__(self, app_context, get_session, window_ms=None, max_batch=None, name='db-writer'):
+        self.name = name
+        self._app_context = app_context
+        self._get_session = get_session
+        self._flushers = {}
+        self.window = (window_ms if window_ms is not None else STORAGE_CONFIG["commit_window_ms"]) / 1000
+        self.max_batch = max_batch or STORAGE_CONFIG["max_batch"]
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.commits = 0
+        self.jobs = 0
+        self.failed = 0
+        self.largest_batch = 0
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._queue.put(None)
+
+    def flusher(self, name, flush):
+        """Register flush(session, rows) for the rows jobs defer under name"""
+        self._flushers[name] = flush
+
+    def submit(self, fn):
+        """Queue fn(session) for the next group commit; returns a Future of its result"""
+        future = Future()
+        self._queue.put((fn, future))
+        return future
+
+    def write(self, fn, timeout=None):
+        """Run fn(session) in a group commit and wait until it's committed; returns its result"""
+        if threading.current_thread() is self._thread:
+            # A job can't wait for a later batch from inside the writer
+            raise RuntimeError("write() called from inside a write job")
+        return self.submit(fn).result(timeout or STORAGE_CONFIG["write_timeout"])
+
+    def _run(self):
+        with self._app_context():
+            while True:
+                job = self._queue.get()
+                if job is None:
+                    return
+                batch = [job]
+                stopping = False
+                deadline = time.perf_counter() + self.window
+                while len(batch) < self.max_batch:
+                    try:
+                        # Take what queued up during the last commit, then
+                        # wait out the window for more
+                        remaining = deadline - time.perf_counter()
+                        job = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if job is None:
+                        stopping = True
+                        break
+                    batch.append(job)
+                self._commit(batch)
+                if stopping:
+                    return
+
+    def _commit(self, batch):
+        session = self._get_session()
+        while batch:
+            try:
+                results = self._run_batch(session, batch)
+            except _JobFailed as failure:
+                _, future = batch.pop(failure.index)
+                future.set_exception(failure.error)
+                with self._lock:
+                    self.failed += 1
+                continue
+            except Exception as e:
+                if len(batch) > 1:
+                    # The bulk statements or the commit failed, so it isn't
+                    # known which write caused it: commit them one by one
+                    for job in batch:
+                        self._commit([job])
+                    return
+                batch[0][1].set_exception(e)
+                with self._lock:
+                    self.failed += 1
+                return
+
+            with self._lock:
+                self.commits += 1
+                self.jobs += len(batch)
+                self.largest_batch = max(self.largest_batch, len(batch))
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+            return
+
+    def _run_batch(self, session, batch):
+        try:
+            results = []
+            for index, (fn, _) in enumerate(batch):
+                try:
+                    results.append(fn(session))
+                    session.flush()
+                except Exception as e:
+                    raise _JobFailed(index, e) from e
+            for name, rows in session.info.pop('deferred', {}).items():
+                if rows:
+                    self._flushers[name](session, rows)
+            session.commit()
+            return results
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            # Nothing from this batch may leak into the next one
+            session.info.pop('deferred', None)
+            session.expunge_all()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'queued': self._queue.qsize(),
+                'commits': self.commits,
+                'writes': self.jobs,
+                'failed': self.failed,
+                'largest_batch': self.largest_batch,
+                'avg_batch': round(self.jobs / self.commits, 2) if self.commits else 0.0
+            }
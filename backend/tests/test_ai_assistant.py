@@ -0,0 +1,36 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai_assistant import ElderlyAIAssistant
+from response_cache import ResponseCache
+from session_store import SessionStore
+
+
+class FakeClient:
+    def __init__(self):
+        self.calls = []
+
+    def generate(self, prompt, system=None, context=None, model=None):
+        self.calls.append(context)
+        return {'response': f'answer {len(self.calls)}', 'context': [len(self.calls)] * 3, 'model': 'llama3'}
+
+
+def test_cache_does_not_drop_the_conversation_context():
+    client = FakeClient()
+    assistant = ElderlyAIAssistant(client=client, cache=ResponseCache(max_entries=10, ttl=60),
+                                   sessions=SessionStore())
+    user = {'user_id': 1, 'name': 'Ann'}
+    assistant.generate_response(user, 'Hello')
+
+    # An answer cached for exactly this conversation so far
+    session = assistant.sessions.get(1)
+    query = 'How can I sleep better?'
+    assistant.cache.set(assistant.cache.make_key(query, user, None, list(session.turns)), 'cached')
+    result = assistant.generate_response(user, query)
+
+    # The turn continues the Ollama context instead of answering from the cache and losing it
+    assert not result['cached']
+    assert client.calls == [None, [1, 1, 1]]
+    assert assistant.sessions.get(1).ollama_context == [2, 2, 2]
@@ -0,0 +1,41 @@
+import os
+import sqlite3
+import sys
+from types import SimpleNamespace
+
+from sqlalchemy import MetaData, Table, create_engine, select
+from sqlalchemy.orm import Session
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from baselines import BaselineStore, MetricStats, save_baselines
+from migrations import migrate
+
+
+def test_older_snapshot_does_not_overwrite_a_newer_one(tmp_path):
+    path = str(tmp_path / 'baselines.db')
+    conn = sqlite3.connect(path)
+    migrate(conn)
+    conn.execute("INSERT INTO user (id, username, password) VALUES (1, 'ann', 'x')")
+    conn.commit()
+    conn.close()
+    engine = create_engine(f'sqlite:///{path}')
+    baseline = SimpleNamespace(__table__=Table('health_baseline', MetaData(), autoload_with=engine))
+
+    store = BaselineStore(lambda user_id: [])
+    _, first = store.observe([{'user_id': 1, 'heart_rate': 70}])
+    _, second = store.observe([{'user_id': 1, 'heart_rate': 80}])
+
+    # Two ingests committing in the opposite order to their observations
+    for rows in (second, first):
+        with Session(engine) as session:
+            save_baselines(session, baseline, rows)
+            session.commit()
+
+    with engine.connect() as db:
+        [row] = db.execute(select(baseline.__table__)).mappings().all()
+    engine.dispose()
+    stats = MetricStats.from_row(row)
+    assert stats.count == 2
+    assert stats.mean == 75
+    assert list(stats.window) == [70, 80]
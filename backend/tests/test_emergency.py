@@ -0,0 +1,47 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from emergency import emergency_matcher
+
+
+@pytest.mark.parametrize('message, category', [
+    ("he is not moving and not breathing", 'breathing'),
+    ("she is not responding and not breathing", 'breathing'),
+    ("I cannot stop falling", 'fall'),
+    ("I can't get up", 'fall'),
+    ("I fell and can't get up", 'fall'),
+    ("I'm falling", 'fall'),
+    ("I have chest pain", 'cardiac'),
+    ("What should I do, I fell?", 'fall'),
+    ("Can you call 911?", 'general')
+])
+def test_emergencies_are_detected(message, category):
+    assert category in emergency_matcher.categories(message)
+    assert emergency_matcher.is_concern(message)
+
+
+@pytest.mark.parametrize('message', [
+    "I didn't fall",
+    "no chest pain today",
+    "I never had a fall",
+    "I fell asleep early"
+])
+def test_negated_and_excluded_phrases_are_not_emergencies(message):
+    assert emergency_matcher.categories(message) == []
+
+
+@pytest.mark.parametrize('message', [
+    "How can I prevent a fall at night?",
+    "I am afraid of falling",
+    "the leaves fall in autumn",
+    "Is chest pain a sign of a heart attack?",
+    "My chest pains are gone, no chest pain now"
+])
+def test_questions_and_resolved_symptoms_are_not_emergencies(message):
+    assert emergency_matcher.categories(message) == []
+    # Still worth following up in the conversation
+    assert emergency_matcher.is_concern(message)
@@ -0,0 +1,143 @@
+import os
+import random
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from health_analysis import ACTIVITY_SCORES, HEALTH_RANGES, analyze_health_records
+from risk_model import RISK_THRESHOLD
+
+
+class FakeRiskModel:
+    def predict_risk(self, df):
+        return pd.to_numeric(df['heart_rate']).to_numpy(dtype=float) / 150
+
+
+def analyze_one(data, risk_model):
+    """The per-record analysis the vectorized one replaced, one reading at a time"""
+    ranges = HEALTH_RANGES
+    alerts = []
+    alert_level = 'normal'
+    health_score = 100
+    try:
+        hr = float(data['heart_rate'])
+        if hr < ranges['heart_rate']['normal'][0] or hr > ranges['heart_rate']['normal'][1]:
+            if hr < ranges['heart_rate']['warning'][0] or hr > ranges['heart_rate']['warning'][1]:
+                alerts.append(f"CRITICAL: Heart rate at {hr} BPM is severely abnormal")
+                alert_level = 'danger'
+                health_score -= 30
+            else:
+                alerts.append(f"WARNING: Heart rate at {hr} BPM is outside normal range")
+                alert_level = 'warning'
+                health_score -= 15
+
+        o2 = float(data['oxygen_level'])
+        if o2 < ranges['oxygen_level']['normal'][0]:
+            if o2 < ranges['oxygen_level']['warning'][0]:
+                alerts.append(f"CRITICAL: Oxygen level at {o2}% is dangerously low")
+                alert_level = 'danger'
+                health_score -= 40
+            else:
+                alerts.append(f"WARNING: Oxygen level at {o2}% is below normal")
+                alert_level = 'warning'
+                health_score -= 20
+
+        temp = float(data['temperature'])
+        if temp < ranges['temperature']['normal'][0] or temp > ranges['temperature']['normal'][1]:
+            if temp < ranges['temperature']['warning'][0] or temp > ranges['temperature']['warning'][1]:
+                alerts.append(f"CRITICAL: Temperature at {temp}°F requires immediate attention")
+                alert_level = 'danger'
+                health_score -= 25
+            else:
+                alerts.append(f"WARNING: Temperature at {temp}°F is outside normal range")
+                alert_level = 'warning'
+                health_score -= 10
+
+        glucose = float(data['glucose_level'])
+        if glucose < ranges['glucose_level']['normal'][0] or glucose > ranges['glucose_level']['normal'][1]:
+            if glucose < ranges['glucose_level']['warning'][0] or glucose > ranges['glucose_level']['warning'][1]:
+                alerts.append(f"CRITICAL: Glucose level at {glucose} mg/dL requires immediate attention")
+                alert_level = 'danger'
+                health_score -= 25
+            else:
+                alerts.append(f"WARNING: Glucose level at {glucose} mg/dL is outside normal range")
+                alert_level = 'warning'
+                health_score -= 10
+
+        sleep = float(data['sleep_hours'])
+        if sleep < ranges['sleep_hours']['normal'][0] or sleep > ranges['sleep_hours']['normal'][1]:
+            alerts.append(f"NOTE: Sleep duration of {sleep} hours is outside recommended range")
+            health_score -= 5
+
+        health_score += ACTIVITY_SCORES.get(data['activity_level'], 0)
+
+        if not data['medication_adherence']:
+            alerts.append("WARNING: Missed medications today")
+            health_score -= 15
+
+        pain = int(data['pain_level'])
+        if pain >= 7:
+            alerts.append(f"ALERT: High pain level reported ({pain}/10)")
+            alert_level = 'warning'
+            health_score -= 20
+        elif pain >= 4:
+            alerts.append(f"NOTE: Moderate pain level reported ({pain}/10)")
+            health_score -= 10
+
+        mood = int(data['mood'])
+        if mood <= 2:
+            alerts.append("NOTE: Low mood reported - may need attention")
+            health_score -= 10
+
+        health_score = max(0, min(100, health_score))
+
+        if risk_model.predict_risk(pd.DataFrame([data]))[0] > RISK_THRESHOLD:
+            alerts.append("AI ALERT: High risk pattern detected - Consider medical consultation")
+            if alert_level != 'danger':
+                alert_level = 'warning'
+
+        return {'alerts': alerts, 'alert_level': alert_level, 'health_score': health_score}
+    except Exception:
+        return {'alerts': ["Error analyzing health data"], 'alert_level': 'error', 'health_score': 0}
+
+
+def random_reading(rng):
+    return {
+        'heart_rate': rng.choice([35, 45, 55, 72, 110, 125, 140]) + rng.random(),
+        'oxygen_level': rng.choice([85, 92, 97, 99]),
+        'temperature': rng.choice([94.5, 96.5, 98.2, 99.5, 101.0, 104.0]),
+        'glucose_level': rng.choice([45, 65, 100, 160, 220]),
+        'sleep_hours': rng.choice([3, 6, 8, 9.5, 11]),
+        'activity_level': rng.choice(list(ACTIVITY_SCORES) + ['unknown']),
+        'medication_adherence': rng.choice([True, False]),
+        'pain_level': rng.randint(0, 10),
+        'mood': rng.randint(1, 5)
+    }
+
+
+def check_matches(records):
+    model = FakeRiskModel()
+    results = analyze_health_records(records, model)
+    for record, result in zip(records, results):
+        expected = analyze_one(record, model)
+        assert {key: result[key] for key in expected} == expected, record
+
+
+def test_vectorized_analysis_matches_per_record_analysis():
+    rng = random.Random(7)
+    check_matches([random_reading(rng) for _ in range(500)])
+
+
+def test_unconvertible_readings_match_per_record_analysis():
+    rng = random.Random(11)
+    records = [random_reading(rng) for _ in range(8)]
+    # Form fields arrive as strings; bad ones error only their own reading
+    records[0].update(heart_rate='88', pain_level='8', mood='2')
+    records[1]['heart_rate'] = 'fast'
+    records[2]['mood'] = None
+    records[3]['pain_level'] = '4.5'
+    records[4]['pain_level'] = 7.9
+    del records[5]['sleep_hours']
+    check_matches(records)
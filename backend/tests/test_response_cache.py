@@ -0,0 +1,40 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from response_cache import ResponseCache
+
+USER = {'user_id': 1, 'name': 'Ann', 'age': 80, 'medical_history': 'Hypertension',
+        'mood_history': [{'timestamp': '2026-10-17T09:00:00', 'mood': 4, 'notes': ''}]}
+VITALS = {'heart_rate': 72, 'blood_pressure': '120/80', 'oxygen_level': 97,
+          'temperature': 98.2, 'pain_level': 1, 'mood': 4, 'notes': 'Slept well'}
+QUERY = 'How can I sleep better?'
+
+
+def cache_with_answer():
+    cache = ResponseCache(max_entries=10, ttl=60)
+    cache.set(cache.make_key(QUERY, USER, VITALS), 'Keep a regular bedtime.')
+    return cache
+
+
+def test_same_prompt_context_hits():
+    cache = cache_with_answer()
+    assert cache.get(cache.make_key('how can i sleep better', dict(USER), dict(VITALS))) is not None
+
+
+def test_changed_notes_miss():
+    cache = cache_with_answer()
+    assert cache.get(cache.make_key(QUERY, USER, dict(VITALS, notes='Woke up at 3am'))) is None
+
+
+def test_new_mood_entry_misses():
+    cache = cache_with_answer()
+    moods = USER['mood_history'] + [{'timestamp': '2026-10-17T15:00:00', 'mood': 2, 'notes': 'lonely'}]
+    assert cache.get(cache.make_key(QUERY, dict(USER, mood_history=moods), VITALS)) is None
+
+
+def test_more_conversation_misses():
+    cache = cache_with_answer()
+    turns = [{'timestamp': 0, 'query': 'Hello', 'response': 'Hello Ann!'}]
+    assert cache.get(cache.make_key(QUERY, USER, VITALS, turns)) is None
@@ -0,0 +1,38 @@
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from risk_model import MicroBatcher
+
+
+class FakeModel:
+    version = 'test'
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def predict_risk(self, df):
+        self.batch_sizes.append(len(df))
+        return df['heart_rate'].to_numpy() / 100
+
+
+def test_micro_batcher_counts_every_request_and_batch():
+    model = FakeModel()
+    batcher = MicroBatcher(model, max_batch=16, max_wait=0.01)
+
+    def predict(n):
+        return batcher.predict_risk(pd.DataFrame({'heart_rate': [float(n)]}))
+
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        results = list(pool.map(predict, range(200)))
+
+    # Each caller gets its own row back out of the shared batch
+    assert [float(risk[0]) for risk in results] == [n / 100 for n in range(200)]
+    stats = batcher.stats()
+    assert stats['requests'] == sum(model.batch_sizes) == 200
+    assert stats['batches'] == len(model.batch_sizes)
+    assert stats['avg_batch_size'] == round(200 / len(model.batch_sizes), 2)
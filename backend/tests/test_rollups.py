@@ -0,0 +1,89 @@
+import datetime
+import os
+import sqlite3
+import sys
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import MetaData, Table, create_engine, select
+from sqlalchemy.orm import Session
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from migrations import migrate
+from rollups import choose_resolution, prune_rollups, update_rollups
+
+NOW = datetime.datetime(2026, 3, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = str(tmp_path / 'rollups.db')
+    conn = sqlite3.connect(path)
+    migrate(conn)
+    conn.execute("INSERT INTO user (id, username, password) VALUES (1, 'ann', 'x')")
+    conn.commit()
+    engine = create_engine(f'sqlite:///{path}')
+    rollup = SimpleNamespace(__table__=Table('health_rollup', MetaData(), autoload_with=engine))
+    yield conn, engine, rollup
+    engine.dispose()
+    conn.close()
+
+
+def reading(timestamp, heart_rate):
+    return {'user_id': 1, 'timestamp': timestamp, 'heart_rate': heart_rate}
+
+
+def buckets(engine, rollup, resolution):
+    table = rollup.__table__
+    with engine.connect() as conn:
+        return conn.execute(
+            select(table).where(table.c.resolution == resolution).order_by(table.c.bucket_start)
+        ).mappings().all()
+
+
+def test_update_rollups_merges_into_existing_buckets(database):
+    _, engine, rollup = database
+    with Session(engine) as session:
+        update_rollups(session, rollup, [reading(NOW, 70), reading(NOW + datetime.timedelta(seconds=30), 90)])
+        session.commit()
+    # A later batch holding an older reading must not replace the last value
+    with Session(engine) as session:
+        update_rollups(session, rollup, [reading(NOW + datetime.timedelta(seconds=10), 60)])
+        session.commit()
+
+    for resolution in ('1m', '1h', '1d'):
+        [row] = buckets(engine, rollup, resolution)
+        assert row['count'] == 3
+        assert row['sum_value'] == 220
+        assert (row['min_value'], row['max_value']) == (60, 90)
+        assert row['last_value'] == 90
+        assert row['last_timestamp'] == NOW + datetime.timedelta(seconds=30)
+
+
+def test_prune_rollups_applies_each_resolution_retention(database):
+    conn, engine, rollup = database
+    old = NOW - datetime.timedelta(days=30)
+    with Session(engine) as session:
+        update_rollups(session, rollup, [
+            reading(old, 70),
+            reading(old + datetime.timedelta(minutes=5), 72),
+            reading(NOW - datetime.timedelta(hours=2), 80)
+        ])
+        session.commit()
+
+    # One row per batch, so the loop has to run until nothing is left
+    assert prune_rollups(conn, batch_rows=1, now=NOW) == {'1m': 2, '1h': 0}
+
+    assert [row['last_value'] for row in buckets(engine, rollup, '1m')] == [80]
+    assert len(buckets(engine, rollup, '1h')) == 2
+    assert len(buckets(engine, rollup, '1d')) == 2
+
+
+def test_choose_resolution_skips_pruned_resolutions():
+    assert choose_resolution(NOW - datetime.timedelta(hours=2), NOW, now=NOW) == '1m'
+    # A day fits in 500 hourly points but not minute ones
+    assert choose_resolution(NOW - datetime.timedelta(days=1), NOW, now=NOW) == '1h'
+    # A short range older than the minute retention falls back to hours
+    since = NOW - datetime.timedelta(days=10)
+    assert choose_resolution(since, since + datetime.timedelta(hours=1), now=NOW) == '1h'
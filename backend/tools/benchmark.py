@@ -0,0 +1,349 @@
+"""
+Offline benchmark suite for the ingestion, analysis, query and chat paths.
+
+Runs the Flask app on a threaded local server against a temporary SQLite
+database, synthetic CSVs from tools/synth_data.py and the stand-in Ollama,
+so nothing leaves the machine. Measures:
+
+- analyze: analyze_health_records rows/sec at several batch sizes
+- health_add: /api/health/add throughput and latency under concurrent clients
+- health_query: /api/health/<user_id> latency against history size
+- chat: /api/chat latency for first turns and follow-ups, and streaming
+  time to first token
+- load_data: /api/load-data time, rows/sec and peak memory
+
+Results are written as JSON with the git revision, so two runs can be
+compared with --compare.
+
+Usage:
+    python tools/benchmark.py [--quick] [--output bench-results/run.json]
+    python tools/benchmark.py --compare bench-results/before.json bench-results/after.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import requests
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, "tools"))
+
+from stub_ollama import start_stub_server  # noqa: E402
+from load_test import percentile, start_backend  # noqa: E402
+import synth_data  # noqa: E402
+
+RESULTS_DIR = os.path.join(BACKEND_DIR, "bench-results")
+
+
+def summarize(latencies):
+    if not latencies:
+        return {"count": 0}
+    return {
+        "count": len(latencies),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3),
+        "p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "max_ms": round(max(latencies) * 1000, 3)
+    }
+
+
+def max_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def bench_analyze(backend, readings, batch_sizes):
+    from health_analysis import analyze_health_records
+
+    model = backend.risk_models.get().model
+    results = {"model": model.version if model else None}
+    for batch_size in batch_sizes:
+        rows = readings[:max(batch_size, min(len(readings), batch_size * 200))]
+        analyze_health_records(rows[:batch_size], model)  # warm up
+        start = time.perf_counter()
+        for offset in range(0, len(rows), batch_size):
+            analyze_health_records(rows[offset:offset + batch_size], model)
+        elapsed = time.perf_counter() - start
+        results[f"batch_{batch_size}"] = {
+            "rows": len(rows),
+            "seconds": round(elapsed, 4),
+            "rows_per_second": round(len(rows) / elapsed, 1)
+        }
+    return results
+
+
+def bench_health_add(base_url, readings, total, concurrency):
+    latencies, failures, lock = [], [0], threading.Lock()
+    per_client = total // concurrency
+
+    def client(offset):
+        session = requests.Session()
+        for i in range(per_client):
+            reading = readings[(offset + i) % len(readings)]
+            start = time.perf_counter()
+            response = session.post(f"{base_url}/api/health/add", json=reading, timeout=60)
+            elapsed = time.perf_counter() - start
+            with lock:
+                if response.ok:
+                    latencies.append(elapsed)
+                else:
+                    failures[0] += 1
+
+    threads = [threading.Thread(target=client, args=(n * per_client,)) for n in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return {
+        "concurrency": concurrency,
+        "requests": per_client * concurrency,
+        "failed": failures[0],
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "latency": summarize(latencies)
+    }
+
+
+def seed_history(backend, size, readings):
+    """A new user with size readings, one a minute up to now, inserted directly"""
+    with backend.app.app_context():
+        user_id = backend.create_user(f"bench-{size}-{time.time_ns()}", "-", name="Benchmark")
+        now = datetime.datetime.utcnow()
+        analysis = {"alert_level": "normal", "health_score": 90}
+        with backend.shards.use_user(user_id):
+            for offset in range(0, size, 10000):
+                rows = [backend.health_row(dict(readings[i % len(readings)], user_id=user_id), analysis,
+                                           now - datetime.timedelta(minutes=i))
+                        for i in range(offset, min(size, offset + 10000))]
+                backend.db.session.execute(backend.db.insert(backend.HealthData.__table__), rows)
+            backend.db.session.commit()
+        return user_id
+
+
+def bench_health_query(backend, base_url, readings, sizes, samples):
+    session = requests.Session()
+    results = {}
+    for size in sizes:
+        user_id = seed_history(backend, size, readings)
+        queries = {
+            "latest_page": f"{base_url}/api/health/{user_id}?limit=50",
+            "large_page": f"{base_url}/api/health/{user_id}?limit=500",
+            "projected_page": f"{base_url}/api/health/{user_id}?limit=500&fields=heart_rate,oxygen_level",
+            "last_day": f"{base_url}/api/health/{user_id}?limit=500&since="
+                        f"{(datetime.datetime.utcnow() - datetime.timedelta(days=1)).isoformat()}"
+        }
+        results[f"history_{size}"] = {}
+        for name, url in queries.items():
+            session.get(url, timeout=60).raise_for_status()  # warm up
+            latencies = []
+            for _ in range(samples):
+                start = time.perf_counter()
+                session.get(url, timeout=60).raise_for_status()
+                latencies.append(time.perf_counter() - start)
+            results[f"history_{size}"][name] = summarize(latencies)
+    return results
+
+
+def bench_chat(base_url, total):
+    session = requests.Session()
+    first_turns, follow_ups, first_tokens = [], [], []
+    for i in range(total):
+        # New conversation and a unique question, so neither the session
+        # nor the response cache helps
+        session.delete(f"{base_url}/api/chat/1/session", timeout=10)
+        start = time.perf_counter()
+        session.post(f"{base_url}/api/chat", json={"user_id": 1, "query": f"Question {i}: how am I doing?"},
+                     timeout=120).raise_for_status()
+        first_turns.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        session.post(f"{base_url}/api/chat", json={"user_id": 1, "query": f"Follow-up {i}: and tomorrow?"},
+                     timeout=120).raise_for_status()
+        follow_ups.append(time.perf_counter() - start)
+
+        session.delete(f"{base_url}/api/chat/1/session", timeout=10)
+        start = time.perf_counter()
+        with session.post(f"{base_url}/api/chat/stream", json={"user_id": 1, "query": f"Stream {i}: any advice?"},
+                          timeout=120, stream=True) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if line.startswith(b"event: token"):
+                    first_tokens.append(time.perf_counter() - start)
+                    break
+            for _ in response.iter_lines():
+                pass
+    return {
+        "first_turn": summarize(first_turns),
+        "follow_up": summarize(follow_ups),
+        "stream_first_token": summarize(first_tokens)
+    }
+
+
+def clear_datasets(backend):
+    from data_loader import DATASETS
+
+    with backend.app.app_context():
+        raw = backend.db.engine.raw_connection()
+        try:
+            for table in DATASETS:
+                raw.driver_connection.execute(f'DELETE FROM "{table}"')
+            raw.driver_connection.execute('DELETE FROM data_load_state')
+            raw.driver_connection.commit()
+        finally:
+            raw.close()
+
+
+def bench_load_data(backend, base_url, rows):
+    def load():
+        start = time.perf_counter()
+        response = requests.post(f"{base_url}/api/load-data?force=1", timeout=600)
+        response.raise_for_status()
+        return time.perf_counter() - start, response.json()
+
+    rss_before = max_rss_mb()
+    elapsed, summary = load()
+    rss_after = max_rss_mb()
+
+    # A second, traced run for the peak Python heap; tracing slows it down,
+    # so it isn't timed
+    clear_datasets(backend)
+    tracemalloc.start()
+    load()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    inserted = summary["health_records"] + summary["safety_records"] + summary["reminder_records"]
+    return {
+        "rows_per_file": rows,
+        "rows_inserted": inserted,
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(inserted / elapsed, 1),
+        "peak_traced_mb": round(peak / 2 ** 20, 1),
+        "max_rss_growth_mb": round(rss_after - rss_before, 1)
+    }
+
+
+def run(args):
+    work_dir = tempfile.mkdtemp(prefix="elderly-bench-")
+    data_dir = os.path.join(work_dir, "data")
+    print(f"Generating {args.rows} synthetic rows per CSV in {data_dir}...")
+    synth_data.generate(data_dir, rows=args.rows, seed=args.seed)
+    readings = synth_data.readings(args.readings, seed=args.seed)
+
+    _, ollama_url = start_stub_server(latency=args.llm_latency)
+    os.environ["OLLAMA_HOST"] = ollama_url
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(work_dir, 'bench.db')}"
+    os.environ["DATA_DIR"] = data_dir
+    start = time.perf_counter()
+    _, base_url = start_backend()
+    startup = time.perf_counter() - start
+    import app as backend
+
+    results = {"startup": {"seconds": round(startup, 3), "max_rss_mb": max_rss_mb()}}
+    print("Benchmarking health analysis...")
+    results["analyze"] = bench_analyze(backend, readings, args.batch_sizes)
+    print("Benchmarking /api/health/add...")
+    results["health_add"] = bench_health_add(base_url, readings, args.add_requests, args.concurrency)
+    print("Benchmarking /api/health/<user_id> against history size...")
+    results["health_query"] = bench_health_query(backend, base_url, readings, args.history_sizes,
+                                                 args.query_samples)
+    print("Benchmarking /api/chat...")
+    results["chat"] = bench_chat(base_url, args.chat_requests)
+    print("Benchmarking /api/load-data...")
+    results["load_data"] = bench_load_data(backend, base_url, args.rows)
+
+    return {
+        "meta": {
+            "revision": git_revision(),
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "parameters": {key: value for key, value in vars(args).items() if key not in ("compare", "output")}
+        },
+        "results": results
+    }
+
+
+def flatten(tree, prefix=""):
+    values = {}
+    for key, value in tree.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            values.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[name] = value
+    return values
+
+
+def compare(before_path, after_path):
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    old, new = flatten(before["results"]), flatten(after["results"])
+    print(f"{'metric':<60} {before['meta']['revision']:>12} {after['meta']['revision']:>12} {'change':>9}")
+    for name in sorted(old.keys() & new.keys()):
+        change = f"{(new[name] - old[name]) / old[name] * 100:+.1f}%" if old[name] else ""
+        print(f"{name:<60} {old[name]:>12} {new[name]:>12} {change:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000, help="rows per synthetic CSV for /api/load-data")
+    parser.add_argument("--readings", type=int, default=20000, help="synthetic readings for analysis and ingest")
+    parser.add_argument("--batch-sizes", type=lambda s: [int(n) for n in s.split(",")], default=[1, 100, 1000])
+    parser.add_argument("--add-requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--history-sizes", type=lambda s: [int(n) for n in s.split(",")],
+                        default=[100, 1000, 10000, 100000])
+    parser.add_argument("--query-samples", type=int, default=50)
+    parser.add_argument("--chat-requests", type=int, default=20)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="stub Ollama delay per request, seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--quick", action="store_true", help="small sizes, for a smoke run")
+    parser.add_argument("--output", help="where to write the JSON results")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two result files")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    if args.quick:
+        args.rows, args.readings, args.add_requests = 2000, 2000, 200
+        args.history_sizes, args.query_samples, args.chat_requests = [100, 10000], 20, 5
+
+    report = run(args)
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{report['meta']['timestamp'].replace(':', '')}-{report['meta']['revision']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report["results"], indent=2))
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Mixed-traffic load test: saturate /api/chat while measuring /api/health/add.
+
+Runs the Flask app on a threaded local server against a temporary SQLite
+database and a slow stand-in Ollama, then reports latency percentiles for
+vitals ingestion and the status mix (200 / 429) for chat.
+
+Usage:
+    python tools/load_test.py --chat-clients 20 --duration 10 --llm-latency 2
+"""
+import argparse
+import itertools
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+import requests
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, "tools"))
+
+from stub_ollama import start_stub_server  # noqa: E402
+
+HEALTH_READING = {
+    "user_id": 1,
+    "heart_rate": 72,
+    "blood_pressure": "120/80",
+    "oxygen_level": 97,
+    "temperature": 98.4,
+    "glucose_level": 110,
+    "sleep_hours": 7.5,
+    "activity_level": "light",
+    "medication_adherence": True,
+    "pain_level": 1,
+    "mood": 4
+}
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def start_backend():
+    from werkzeug.serving import make_server
+    import app as backend
+
+    server = make_server("127.0.0.1", 0, backend.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def chat_client(base_url, stop, statuses, lock, question_ids):
+    session = requests.Session()
+    while not stop.is_set():
+        # Unique questions so the response cache doesn't absorb the load
+        query = f"Question {next(question_ids)}: when is my next pill?"
+        try:
+            response = session.post(f"{base_url}/api/chat",
+                                    json={"user_id": 1, "query": query},
+                                    timeout=120)
+            status = response.status_code
+            if status == 429:
+                # Back off a little instead of hammering the queue
+                time.sleep(min(float(response.headers.get("Retry-After", 1)), 1.0))
+        except requests.RequestException:
+            status = "error"
+        with lock:
+            statuses[status] += 1
+
+
+def health_client(base_url, stop, latencies, lock, interval):
+    session = requests.Session()
+    while not stop.is_set():
+        start = time.perf_counter()
+        response = session.post(f"{base_url}/api/health/add", json=HEALTH_READING, timeout=30)
+        elapsed = time.perf_counter() - start
+        if response.ok:
+            with lock:
+                latencies.append(elapsed)
+        time.sleep(interval)
+
+
+def measure_health(base_url, stop_after, interval):
+    latencies, lock, stop = [], threading.Lock(), threading.Event()
+    thread = threading.Thread(target=health_client, args=(base_url, stop, latencies, lock, interval))
+    thread.start()
+    time.sleep(stop_after)
+    stop.set()
+    thread.join()
+    return latencies
+
+
+def summarize(latencies):
+    if not latencies:
+        return {"count": 0}
+    return {
+        "count": len(latencies),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "max_ms": round(max(latencies) * 1000, 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--chat-clients", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--llm-latency", type=float, default=2.0)
+    parser.add_argument("--health-interval", type=float, default=0.02)
+    args = parser.parse_args()
+
+    _, ollama_url = start_stub_server(latency=args.llm_latency)
+    db_dir = tempfile.mkdtemp(prefix="elderly-load-")
+    os.environ["OLLAMA_HOST"] = ollama_url
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(db_dir, 'load.db')}"
+    _, base_url = start_backend()
+
+    print("Measuring /api/health/add with no chat traffic...")
+    baseline = measure_health(base_url, args.duration / 2, args.health_interval)
+
+    print(f"Measuring /api/health/add with {args.chat_clients} saturating chat clients...")
+    statuses, lock, stop = Counter(), threading.Lock(), threading.Event()
+    question_ids = itertools.count()
+    chat_threads = [
+        threading.Thread(target=chat_client, args=(base_url, stop, statuses, lock, question_ids),
+                         daemon=True)
+        for _ in range(args.chat_clients)
+    ]
+    for thread in chat_threads:
+        thread.start()
+    time.sleep(1)  # let the chat queue fill up
+    loaded = measure_health(base_url, args.duration, args.health_interval)
+    stop.set()
+
+    report = {
+        "health_add_idle": summarize(baseline),
+        "health_add_under_chat_load": summarize(loaded),
+        "chat_status_counts": {str(k): v for k, v in statuses.items()},
+        "chat_status": requests.get(f"{base_url}/api/chat/status", timeout=5).json()
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Replay data/safety_monitoring.csv through the fall-detection processor.
+
+By default the events run through an in-process SafetyProcessor and the
+report shows throughput and the alerts raised. With --url they are posted
+in batches to a running backend's /api/safety/events instead, so storage
+and alert delivery are included.
+
+Usage:
+    python tools/replay_safety.py [--csv data/safety_monitoring.csv] [--repeat 5]
+    python tools/replay_safety.py --url http://localhost:5000 --batch-size 500
+"""
+import argparse
+import datetime
+import json
+import os
+import sys
+import time
+from collections import Counter
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from safety_stream import SafetyProcessor, read_safety_csv  # noqa: E402
+
+
+def shifted(events, days):
+    """Copy of the events moved forward in time, so repeats look like new days"""
+    delta = datetime.timedelta(days=days)
+    return [dict(event, timestamp=event['timestamp'] + delta) for event in events]
+
+
+def replay_local(events, repeat):
+    processor = SafetyProcessor()
+    alerts = Counter()
+    start = time.perf_counter()
+    for round_number in range(repeat):
+        batch = shifted(events, round_number) if round_number else events
+        for alert in processor.process(batch):
+            alerts[(alert['type'], alert['priority'])] += 1
+    elapsed = time.perf_counter() - start
+    total = len(events) * repeat
+    return {
+        'mode': 'local',
+        'events': total,
+        'seconds': round(elapsed, 3),
+        'events_per_second': round(total / elapsed),
+        'alerts': {f'{kind}/{priority}': count for (kind, priority), count in sorted(alerts.items())},
+        'processor': processor.stats()
+    }
+
+
+def replay_http(events, repeat, url, batch_size):
+    import requests
+
+    session = requests.Session()
+    alerts = Counter()
+    failed = 0
+    start = time.perf_counter()
+    for round_number in range(repeat):
+        batch_events = shifted(events, round_number) if round_number else events
+        for offset in range(0, len(batch_events), batch_size):
+            payload = [dict(event, timestamp=event['timestamp'].isoformat())
+                       for event in batch_events[offset:offset + batch_size]]
+            response = session.post(f'{url}/api/safety/events', json=payload, timeout=60)
+            response.raise_for_status()
+            result = response.json()
+            failed += result['failed']
+            for alert in result['alerts']:
+                alerts[(alert['type'], alert['priority'])] += 1
+    elapsed = time.perf_counter() - start
+    total = len(events) * repeat
+    return {
+        'mode': 'http',
+        'url': url,
+        'events': total,
+        'failed': failed,
+        'seconds': round(elapsed, 3),
+        'events_per_second': round(total / elapsed),
+        'alerts': {f'{kind}/{priority}': count for (kind, priority), count in sorted(alerts.items())}
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--csv', default=os.path.join(BACKEND_DIR, 'data', 'safety_monitoring.csv'))
+    parser.add_argument('--user-id', type=int, default=1, help='resident the devices belong to')
+    parser.add_argument('--repeat', type=int, default=1, help='replay the file this many times, a day apart')
+    parser.add_argument('--url', help='post to a running backend instead of processing in-process')
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+
+    events = read_safety_csv(args.csv, args.user_id)
+    if args.url:
+        report = replay_http(events, args.repeat, args.url.rstrip('/'), args.batch_size)
+    else:
+        report = replay_local(events, args.repeat)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
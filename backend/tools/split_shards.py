@@ -0,0 +1,179 @@
+"""
+Split an existing database into shards, or rebalance existing shards.
+
+Every user in the user_shard directory is placed the way the backend places
+new users: with their facility's shard if they have one, otherwise by user
+id. Users whose shard changes have their rows copied to the new shard, and
+the directory is updated before the rows are deleted from the old one. A
+run that is interrupted can simply be started again. Stop the backend
+first, and start it afterwards with SHARD_COUNT set to the new count.
+
+Usage:
+    python tools/split_shards.py --shards 4
+    python tools/split_shards.py --shards 4 --facilities residents.csv --dry-run
+    python tools/split_shards.py --shards 4 --database-url sqlite:////srv/elderly_care.db
+
+--facilities takes a CSV with username and facility columns. It sets the
+facilities of those users before they are placed.
+"""
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import sys
+from collections import Counter
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from migrations import migrate  # noqa: E402
+from sharding import place, shard_url  # noqa: E402
+
+# (table, column holding the user id), in an order that keeps foreign keys satisfied
+SHARDED_COLUMNS = [
+    ('user', 'id'),
+    ('health_data', 'user_id'),
+    ('health_rollup', 'user_id'),
+    ('health_baseline', 'user_id'),
+    ('reminder', 'user_id'),
+    ('alert', 'user_id')
+]
+BATCH_USERS = 500
+
+
+def sqlite_path(url):
+    """The file behind a sqlite:/// URL; relative paths are in instance/, as in Flask-SQLAlchemy"""
+    if not url.startswith('sqlite:///'):
+        raise ValueError(f"Only SQLite file URLs can be split, not {url}")
+    path = url[len('sqlite:///'):].split('?', 1)[0]
+    return path if os.path.isabs(path) else os.path.join(BACKEND_DIR, 'instance', path)
+
+
+def connect(path):
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute('PRAGMA journal_mode=WAL')
+    migrate(conn)
+    return conn
+
+
+def read_facilities(path):
+    with open(path, newline='', encoding='utf-8') as handle:
+        return {row['username']: row['facility'].strip() or None for row in csv.DictReader(handle)}
+
+
+def plan(directory, count, facilities):
+    """{(from shard, to shard): [user ids]} for the users that have to move"""
+    moves = {}
+    for user_id, username, shard, facility in directory:
+        facility = facilities.get(username, facility)
+        target = place(user_id, facility, count)
+        if target != shard:
+            moves.setdefault((shard, target), []).append(user_id)
+    return moves
+
+
+def columns(conn, schema, table):
+    return [row[1] for row in conn.execute(f'PRAGMA {schema}.table_info("{table}")')]
+
+
+def move_users(source, target_path, user_ids):
+    """Copy the users' rows into the attached target shard; returns rows copied per table"""
+    copied = Counter()
+    source.execute('ATTACH DATABASE ? AS target', (target_path,))
+    try:
+        source.execute('BEGIN IMMEDIATE')
+        try:
+            for start in range(0, len(user_ids), BATCH_USERS):
+                batch = user_ids[start:start + BATCH_USERS]
+                marks = ', '.join('?' * len(batch))
+                for table, user_column in SHARDED_COLUMNS:
+                    # By name: older databases added some columns in a different order
+                    shared = [column for column in columns(source, 'main', table)
+                              if column in columns(source, 'target', table)]
+                    column_list = ', '.join(f'"{column}"' for column in shared)
+                    # REPLACE, so a run that stopped after copying can copy again
+                    cursor = source.execute(
+                        f'INSERT OR REPLACE INTO target."{table}" ({column_list}) '
+                        f'SELECT {column_list} FROM main."{table}" WHERE "{user_column}" IN ({marks})', batch)
+                    copied[table] += cursor.rowcount
+            source.execute('COMMIT')
+        except Exception:
+            source.execute('ROLLBACK')
+            raise
+    finally:
+        source.execute('DETACH DATABASE target')
+    return copied
+
+
+def delete_users(conn, user_ids):
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        for start in range(0, len(user_ids), BATCH_USERS):
+            batch = user_ids[start:start + BATCH_USERS]
+            marks = ', '.join('?' * len(batch))
+            for table, user_column in reversed(SHARDED_COLUMNS):
+                conn.execute(f'DELETE FROM "{table}" WHERE "{user_column}" IN ({marks})', batch)
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--shards', type=int, required=True, help='shard count to split into')
+    parser.add_argument('--database-url', default=os.getenv('DATABASE_URL', 'sqlite:///elderly_care.db'),
+                        help='URL of shard 0 (default: DATABASE_URL)')
+    parser.add_argument('--facilities', help='CSV of username,facility to place users by')
+    parser.add_argument('--dry-run', action='store_true', help='only print which users would move')
+    args = parser.parse_args()
+    if args.shards < 1:
+        parser.error('--shards must be at least 1')
+
+    paths = {}
+
+    def path(shard):
+        if shard not in paths:
+            paths[shard] = sqlite_path(shard_url(args.database_url, shard))
+        return paths[shard]
+
+    primary = connect(path(0))
+    facilities = read_facilities(args.facilities) if args.facilities else {}
+    directory = primary.execute('SELECT user_id, username, shard, facility FROM user_shard').fetchall()
+    moves = plan(directory, args.shards, facilities)
+    summary = {
+        'users': len(directory),
+        'moving': sum(len(user_ids) for user_ids in moves.values()),
+        'moves': {f'{source}->{target}': len(user_ids) for (source, target), user_ids in sorted(moves.items())},
+        'copied': Counter()
+    }
+    if args.dry_run:
+        del summary['copied']
+        print(json.dumps(summary, indent=2))
+        return
+
+    if facilities:
+        primary.executemany('UPDATE user_shard SET facility = ? WHERE username = ?',
+                            [(facility, username) for username, facility in facilities.items()])
+    for (source_shard, target_shard), user_ids in sorted(moves.items()):
+        source = primary if source_shard == 0 else connect(path(source_shard))
+        if target_shard != 0:
+            # Creates the shard and brings its schema up to date
+            connect(path(target_shard)).close()
+        summary['copied'].update(move_users(source, path(target_shard), user_ids))
+        # From here on the backend reads these users from their new shard
+        primary.executemany('UPDATE user_shard SET shard = ? WHERE user_id = ?',
+                            [(target_shard, user_id) for user_id in user_ids])
+        delete_users(source, user_ids)
+        if source is not primary:
+            source.close()
+        print(f"Moved {len(user_ids)} users from shard {source_shard} to shard {target_shard}")
+
+    primary.close()
+    print(json.dumps(summary, indent=2))
+    print(f"Start the backend with SHARD_COUNT={args.shards}")
+
+
+if __name__ == '__main__':
+    main()
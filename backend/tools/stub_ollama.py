@@ -0,0 +1,137 @@
+"""
+Local stand-in for the Ollama HTTP API, for testing without a real model.
+
+Usage:
+    python tools/stub_ollama.py --port 11435 --latency 0.5 --token-delay 0.02
+
+Then point the backend at it with OLLAMA_HOST=http://localhost:11435
+"""
+import argparse
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_REPLY = ("Hello! I'm here to help. Please remember to drink some water "
+                 "and take your medication on time.")
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+class StubOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self._send_json({"models": [{"name": f"{self.server.model}:latest"}]})
+        else:
+            self._send_json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        with self.server.lock:
+            self.server.request_count += 1
+
+        if self.path not in ("/api/generate", "/api/chat"):
+            self._send_json({"error": "not found"}, 404)
+            return
+
+        # A bare generate call only loads the model
+        if self.path == "/api/generate" and "prompt" not in payload:
+            self._send_json({"model": payload.get("model"), "created_at": _now(),
+                             "response": "", "done": True})
+            return
+
+        time.sleep(self.server.latency)
+        tokens = [word + " " for word in self.server.reply.split()]
+        is_chat = self.path == "/api/chat"
+
+        def frame(text, done):
+            data = {"model": payload.get("model"), "created_at": _now(), "done": done}
+            if is_chat:
+                data["message"] = {"role": "assistant", "content": text}
+            else:
+                data["response"] = text
+            if done:
+                # Like Ollama: the returned context extends the one sent, and
+                # only the new prompt is evaluated when a context is given
+                prompt_tokens = len(str(payload.get("prompt", ""))) // 4
+                if not payload.get("context"):
+                    prompt_tokens += len(str(payload.get("system", ""))) // 4
+                data.update({
+                    "context": list(payload.get("context") or []) + list(range(prompt_tokens + len(tokens))),
+                    "prompt_eval_count": prompt_tokens,
+                    "eval_count": len(tokens),
+                    "eval_duration": int(self.server.token_delay * len(tokens) * 1e9)
+                })
+            return data
+
+        if not payload.get("stream", True):
+            time.sleep(self.server.token_delay * len(tokens))
+            self._send_json(frame("".join(tokens), True))
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for token in tokens:
+            time.sleep(self.server.token_delay)
+            self._write_chunk(frame(token, False))
+        self._write_chunk(frame("", True))
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _write_chunk(self, data):
+        line = (json.dumps(data) + "\n").encode()
+        self.wfile.write(f"{len(line):X}\r\n".encode() + line + b"\r\n")
+        self.wfile.flush()
+
+
+def start_stub_server(port=0, latency=0.0, token_delay=0.0, reply=DEFAULT_REPLY,
+                      model="llama3", verbose=False):
+    """Start the stub in a daemon thread and return (server, base_url)"""
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubOllamaHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.token_delay = token_delay
+    server.reply = reply
+    server.model = model
+    server.verbose = verbose
+    server.lock = threading.Lock()
+    server.request_count = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--latency", type=float, default=0.2,
+                        help="seconds before the first token")
+    parser.add_argument("--token-delay", type=float, default=0.02,
+                        help="seconds between streamed tokens")
+    args = parser.parse_args()
+
+    server, url = start_stub_server(args.port, args.latency, args.token_delay, verbose=True)
+    print(f"Stub Ollama listening on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,166 @@
+"""
+Generate synthetic device exports shaped like the CSVs in data/.
+
+The three files have the same headers, value formats and roughly the same
+distributions as the originals (threshold flags derived from the values,
+falls about 5% of safety events), but any number of rows spread over a
+chosen number of devices. The output is deterministic for a given seed.
+
+Usage:
+    python tools/synth_data.py --rows 100000 --devices 500 --out /tmp/synth
+"""
+import argparse
+import datetime
+import os
+
+import numpy as np
+import pandas as pd
+
+HEALTH_FILE = 'health_monitoring.csv'
+SAFETY_FILE = 'safety_monitoring.csv'
+REMINDER_FILE = 'daily_reminder.csv'
+
+ACTIVITIES = ['Walking', 'Sitting', 'Lying', 'No Movement']
+LOCATIONS = ['Bedroom', 'Bathroom', 'Living Room', 'Kitchen']
+IMPACTS = ['Low', 'Medium', 'High']
+REMINDER_TYPES = ['Medication', 'Exercise', 'Hydration', 'Appointment']
+SCHEDULED_TIMES = [f'{hour:02d}:{minute:02d}:00' for hour in range(7, 24) for minute in (0, 30)]
+
+START = datetime.datetime(2025, 1, 1)
+
+
+def yes_no(flags):
+    return np.where(flags, 'Yes', 'No')
+
+
+def device_ids(rng, rows, devices):
+    return np.char.add('D', (1000 + rng.integers(0, devices, rows)).astype(str))
+
+
+def timestamps(rng, rows, days):
+    """M/D/YYYY H:MM strings, minute resolution, like the exports"""
+    minutes = rng.integers(0, days * 24 * 60, rows)
+    stamps = pd.Timestamp(START) + pd.to_timedelta(minutes, unit='min')
+    return (stamps.month.astype(str) + '/' + stamps.day.astype(str) + '/' + stamps.year.astype(str) + ' '
+            + stamps.hour.astype(str) + ':' + stamps.strftime('%M'))
+
+
+def health_frame(rng, rows, devices, days):
+    heart_rate = rng.integers(60, 121, rows)
+    systolic = rng.integers(100, 141, rows)
+    diastolic = rng.integers(60, 91, rows)
+    glucose = rng.integers(70, 151, rows)
+    oxygen = rng.integers(90, 101, rows)
+    flags = {
+        'heart_rate': heart_rate > 100,
+        'blood_pressure': (systolic > 130) | (diastolic > 85),
+        'glucose': glucose > 130,
+        'oxygen': oxygen < 92
+    }
+    alert = flags['heart_rate'] | flags['blood_pressure'] | flags['glucose'] | flags['oxygen']
+    return pd.DataFrame({
+        'Device-ID/User-ID': device_ids(rng, rows, devices),
+        'Timestamp': timestamps(rng, rows, days),
+        'Heart Rate': heart_rate,
+        'Heart Rate Below/Above Threshold (Yes/No)': yes_no(flags['heart_rate']),
+        'Blood Pressure': np.char.add(np.char.add(systolic.astype(str), '/'),
+                                      np.char.add(diastolic.astype(str), ' mmHg')),
+        'Blood Pressure Below/Above Threshold (Yes/No)': yes_no(flags['blood_pressure']),
+        'Glucose Levels': glucose,
+        'Glucose Levels Below/Above Threshold (Yes/No)': yes_no(flags['glucose']),
+        'Oxygen Saturation (SpO₂%)': oxygen,
+        'SpO₂ Below Threshold (Yes/No)': yes_no(flags['oxygen']),
+        'Alert Triggered (Yes/No)': yes_no(alert),
+        'Caregiver Notified (Yes/No)': yes_no(alert)
+    })
+
+
+def safety_frame(rng, rows, devices, days):
+    fall = rng.random(rows) < 0.05
+    inactivity = np.where(fall, rng.integers(0, 600, rows), 0)
+    alert = fall & (inactivity >= 180)
+    return pd.DataFrame({
+        'Device-ID/User-ID': device_ids(rng, rows, devices),
+        'Timestamp': timestamps(rng, rows, days),
+        'Movement Activity': rng.choice(ACTIVITIES, rows),
+        'Fall Detected (Yes/No)': yes_no(fall),
+        'Impact Force Level': np.where(fall, rng.choice(IMPACTS, rows), '-'),
+        'Post-Fall Inactivity Duration (Seconds)': inactivity,
+        'Location': rng.choice(LOCATIONS, rows),
+        'Alert Triggered (Yes/No)': yes_no(alert),
+        'Caregiver Notified (Yes/No)': yes_no(alert),
+        '': ''
+    })
+
+
+def reminder_frame(rng, rows, devices, days):
+    sent = rng.random(rows) < 0.5
+    return pd.DataFrame({
+        'Device-ID/User-ID': device_ids(rng, rows, devices),
+        'Timestamp': timestamps(rng, rows, days),
+        'Reminder Type': rng.choice(REMINDER_TYPES, rows),
+        'Scheduled Time': rng.choice(SCHEDULED_TIMES, rows),
+        'Reminder Sent (Yes/No)': yes_no(sent),
+        'Acknowledged (Yes/No)': yes_no(sent & (rng.random(rows) < 0.8)),
+        '': ''
+    })
+
+
+def generate(out_dir, rows=10000, devices=None, days=30, seed=0):
+    """Write the three CSVs into out_dir and return their paths"""
+    rng = np.random.default_rng(seed)
+    devices = devices or rows
+    os.makedirs(out_dir, exist_ok=True)
+    paths = {}
+    for filename, build in ((HEALTH_FILE, health_frame), (SAFETY_FILE, safety_frame),
+                            (REMINDER_FILE, reminder_frame)):
+        path = os.path.join(out_dir, filename)
+        build(rng, rows, devices, days).to_csv(path, index=False)
+        paths[filename] = path
+    return paths
+
+
+def readings(rows, user_id=1, seed=0):
+    """Synthetic readings in the /api/health/add format, with the same vitals distributions"""
+    rng = np.random.default_rng(seed)
+    frame = health_frame(rng, rows, 1, 1)
+    heart_rate = frame['Heart Rate'].to_numpy()
+    blood_pressure = frame['Blood Pressure'].str.replace(' mmHg', '', regex=False).to_numpy()
+    oxygen = frame['Oxygen Saturation (SpO₂%)'].to_numpy()
+    glucose = frame['Glucose Levels'].to_numpy()
+    temperature = np.round(rng.normal(98.4, 0.6, rows), 1)
+    sleep = np.round(rng.uniform(4, 9, rows), 1)
+    activity = rng.choice(['sedentary', 'light', 'moderate', 'active'], rows)
+    adherence = rng.random(rows) < 0.9
+    pain = rng.integers(0, 8, rows)
+    mood = rng.integers(1, 6, rows)
+    return [{
+        'user_id': user_id,
+        'heart_rate': int(heart_rate[i]),
+        'blood_pressure': str(blood_pressure[i]),
+        'oxygen_level': int(oxygen[i]),
+        'temperature': float(temperature[i]),
+        'glucose_level': float(glucose[i]),
+        'sleep_hours': float(sleep[i]),
+        'activity_level': str(activity[i]),
+        'medication_adherence': bool(adherence[i]),
+        'pain_level': int(pain[i]),
+        'mood': int(mood[i])
+    } for i in range(rows)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10000, help='rows per file')
+    parser.add_argument('--devices', type=int, help='distinct devices (default: one per row, like the exports)')
+    parser.add_argument('--days', type=int, default=30, help='time span the timestamps cover')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', required=True, help='directory to write the CSVs to')
+    args = parser.parse_args()
+
+    for path in generate(args.out, args.rows, args.devices, args.days, args.seed).values():
+        print(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Per-user context for the assistant: profile, latest vitals, mood history and
+open reminders, assembled from one reminder query and cached until the
+user's reminders or health data change.
+"""
+import threading
+import time
+
+CONTEXT_TTL_SECONDS = 300
+MOOD_HISTORY_LENGTH = 7
+
+
+def partition_reminders(reminders):
+    """Group reminders (already ordered by due date) by reminder_type"""
+    by_type = {}
+    for reminder in reminders:
+        by_type.setdefault(reminder.reminder_type, []).append(reminder)
+    return by_type
+
+
+def format_medications(reminders):
+    return [{
+        'name': med.title,
+        'description': med.description,
+        'next_dose': med.due_date.isoformat(),
+        'priority': med.priority
+    } for med in reminders]
+
+
+def format_routines(reminders):
+    return [{
+        'activity': routine.title,
+        'time': routine.due_date.strftime('%H:%M'),
+        'description': routine.description,
+        'completed': routine.completed
+    } for routine in reminders]
+
+
+def format_appointments(reminders):
+    return [{
+        'title': apt.title,
+        'datetime': apt.due_date.isoformat(),
+        'description': apt.description,
+        'priority': apt.priority
+    } for apt in reminders]
+
+
+def format_mood_history(readings):
+    return [{
+        'mood': entry.mood,
+        'timestamp': entry.timestamp.isoformat(),
+        'notes': entry.notes
+    } for entry in readings]
+
+
+class UserContextCache:
+    def __init__(self, ttl=CONTEXT_TTL_SECONDS):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id, build):
+        """Return the cached context for user_id, calling build(user_id) on a miss"""
+        user_id = int(user_id)
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and entry[0] > time.monotonic():
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        context = build(user_id)
+        if context is not None:
+            with self._lock:
+                self._entries[user_id] = (time.monotonic() + self.ttl, context)
+        return context
+
+    def invalidate(self, *user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                self._entries.pop(int(user_id), None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
@@ -33,7 +33,6 @@ const AIChat = ({ userId }) => {
   const [input, setInput] = useState('');
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState(null);
-  const [currentModel] = useState('llama3:latest');
   const [suggestions] = useState([
     'How do I take my medications?',
     'What are my vital signs?',
@@ -53,29 +52,32 @@ const AIChat = ({ userId }) => {
   }, [messages]);
 
   useEffect(() => {
-    // Check Ollama connection
+    // Greet once; the connection check below must not reset the conversation
+    setMessages([
+      {
+        text: "Hello! I'm your AI Health Assistant. I'm here to help you with your health-related questions. How can I assist you today?",
+        sender: 'bot',
+        timestamp: new Date(),
+        icon: <BotIcon color="primary" />
+      }
+    ]);
+  }, []);
+
+  useEffect(() => {
+    // The backend probes Ollama in the background; this only reads its cached status
     const checkOllamaConnection = async () => {
       try {
-        const response = await fetch('http://localhost:11434/api/tags');
-        if (response.ok) {
-          setIsOllamaConnected(true);
-          setError(null);
-          // Add initial greeting
-          setMessages([
-            {
-              text: "Hello! I'm your AI Health Assistant. I'm here to help you with your health-related questions. How can I assist you today?",
-              sender: 'bot',
-              timestamp: new Date(),
-              icon: <BotIcon color="primary" />
-            }
-          ]);
-        } else {
-          throw new Error('Ollama service not responding properly');
+        const response = await fetch('http://localhost:5000/api/llm/status');
+        if (!response.ok) {
+          throw new Error('Assistant status not available');
         }
+        const status = await response.json();
+        setIsOllamaConnected(status.connected);
+        setError(status.connected ? null : 'Unable to connect to Ollama. Please make sure Ollama is running on your computer.');
       } catch (err) {
         setIsOllamaConnected(false);
-        setError('Unable to connect to Ollama. Please make sure Ollama is running on your computer.');
-        console.error('Ollama connection error:', err);
+        setError('Unable to reach the ElderCare server. Please make sure the backend is running.');
+        console.error('Assistant status error:', err);
       }
     };
 
@@ -85,79 +87,63 @@ const AIChat = ({ userId }) => {
     return () => clearInterval(intervalId);
   }, []);
 
+  useEffect(() => {
+    if (!userId) return undefined;
+    // Emergencies are answered from a checklist at once; the assistant's
+    // fuller guidance arrives later as an alert
+    const openedAt = Date.now();
+    const events = new EventSource(`http://localhost:5000/api/alerts/stream/${userId}`);
+    events.addEventListener('alert', (event) => {
+      const alert = JSON.parse(event.data);
+      // Skip guidance from earlier conversations replayed on connect
+      if (alert.type !== 'emergency_guidance' || new Date(alert.timestamp) < openedAt) return;
+      setMessages(prev => prev.some(message => message.alertId === alert.id) ? prev : [...prev, {
+        text: alert.message,
+        sender: 'bot',
+        timestamp: new Date(alert.timestamp),
+        icon: <LocalHospital color="error" />,
+        alertId: alert.id
+      }]);
+    });
+    return () => events.close();
+  }, [userId]);
+
   const generateResponse = async (userInput) => {
     try {
-      const healthData = JSON.parse(localStorage.getItem('healthData') || '[]');
-      const userHealth = healthData.filter(data => data.userId === userId);
-      const latestHealth = userHealth.length > 0 ? userHealth[userHealth.length - 1] : null;
-
-      const llama3Prompt = `[INST]<<SYS>>
-You are ElderCare AI, a highly advanced and compassionate health assistant powered by Llama 3. Your primary role is to help elderly users with their health-related questions and concerns.
-
-Current Context:
-Time: ${new Date().toLocaleTimeString()}
-Date: ${new Date().toLocaleDateString()}
-
-${latestHealth ? `User's Current Health Status:
-❤️ Heart Rate: ${latestHealth.heartRate} BPM
-🩺 Blood Pressure: ${latestHealth.bloodPressure}
-🫁 Oxygen Level: ${latestHealth.oxygenLevel}%
-🌡️ Temperature: ${latestHealth.temperature}°F` : 'No health data available yet'}
-
-Your responses should be:
-1. Clear and easy to understand for elderly users
-2. Empathetic and patient
-3. Include relevant emojis to make the conversation friendly
-4. Medically accurate while using simple language
-5. Brief but informative (2-3 short paragraphs maximum)
-6. Include gentle reminders to consult healthcare providers when appropriate
-
-If discussing health metrics:
-- Explain what the numbers mean in simple terms
-- Highlight any concerning values
-- Suggest simple actions when appropriate
-<</SYS>>
-
-${userInput}[/INST]`;
-
-      const response = await fetch('http://localhost:11434/api/chat', {
+      // The backend adds the user's profile and latest vitals to the prompt
+      const response = await fetch('http://localhost:5000/api/chat', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
         },
         body: JSON.stringify({
-          model: currentModel,
-          messages: [
-            {
-              role: "system",
-              content: llama3Prompt
-            }
-          ],
-          stream: false,
-          options: {
-            temperature: 0.7,
-            top_p: 0.9,
-            top_k: 40,
-            repeat_penalty: 1.1
-          }
+          user_id: userId,
+          query: userInput
         })
       });
 
+      if (response.status === 429) {
+        throw new Error('The assistant is busy, please try again in a moment');
+      }
       if (!response.ok) {
         throw new Error('Failed to get response from AI');
       }
 
       const data = await response.json();
-      let aiResponse = data.message?.content || data.response;
+      let aiResponse = data.response || data.fallback_response;
 
       if (!aiResponse) {
         throw new Error('Empty response from AI');
       }
 
-      aiResponse = aiResponse
-        .replace(/\[\/INST\]/g, '')
-        .replace(/\[INST\]/g, '')
-        .trim();
+      aiResponse = aiResponse.trim();
+
+      if (data.emergency) {
+        return {
+          text: aiResponse,
+          icon: <LocalHospital color="error" />
+        };
+      }
 
       if (!aiResponse.includes('❤️') && aiResponse.toLowerCase().includes('heart')) {
         aiResponse = aiResponse.replace(/heart/i, '❤️ heart');
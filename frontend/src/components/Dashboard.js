@@ -43,6 +43,7 @@ const Dashboard = ({ userId }) => {
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
   const [healthData, setHealthData] = useState([]);
+  const [alerts, setAlerts] = useState([]);
 
   useEffect(() => {
     const fetchData = async () => {
@@ -61,10 +62,37 @@ const Dashboard = ({ userId }) => {
     };
 
     fetchData();
-    const interval = setInterval(fetchData, 300000); // Refresh every 5 minutes
-    return () => clearInterval(interval);
+
+    // Alerts are pushed by the server as they happen instead of polling
+    const events = new EventSource(`http://localhost:5000/api/alerts/stream/${userId}`);
+    events.addEventListener('alert', (event) => {
+      const alert = JSON.parse(event.data);
+      setAlerts(prev => [alert, ...prev.filter(a => a.id !== alert.id)].slice(0, 5));
+      fetchData();
+    });
+    return () => events.close();
   }, [userId]);
 
+  const renderAlerts = () => {
+    const active = alerts.filter(alert => !alert.acknowledged);
+    if (active.length === 0) return null;
+
+    return (
+      <Box sx={{ mb: 3 }}>
+        {active.map(alert => (
+          <Alert
+            key={alert.id}
+            severity={alert.priority === 'critical' ? 'error' : 'warning'}
+            sx={{ mb: 1 }}
+            onClose={() => setAlerts(prev => prev.filter(a => a.id !== alert.id))}
+          >
+            <strong>{new Date(alert.timestamp).toLocaleString()}</strong> - {alert.message}
+          </Alert>
+        ))}
+      </Box>
+    );
+  };
+
   const renderVitalSigns = () => {
     if (healthData.length === 0) return null;
     const latest = healthData[healthData.length - 1];
@@ -219,6 +247,7 @@ const Dashboard = ({ userId }) => {
 
   return (
     <Box sx={{ p: 3 }}>
+      {renderAlerts()}
       {renderVitalSigns()}
       {renderHealthTrends()}
     </Box>